@@ -0,0 +1,324 @@
+"""Asyncio equivalents of `algox.operations`
+
+`AsyncAlgodClient` talks to algod over a shared aiohttp session, so one event
+loop can drive many deployments, quotes and swaps at once. Transactions are
+built with the same helpers as the synchronous API.
+"""
+import asyncio
+import base64
+import threading
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from algosdk import encoding, error
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+
+from . import artifacts
+from .account import Account
+from .cache import CompileCache
+from .constants import POOL_CREATION_FEE, SHARD_CREATION_FEE, TEAL_VERSION
+from .operations import compile_cache
+from .params import get_params_provider, observe_round
+from .registry import PoolRegistry, check_shard_capacity, registered_pool
+from .state import MasterState
+from .utils import PendingTxnResponse
+
+
+class AsyncAlgodClient:
+    """Non-blocking subset of `AlgodClient` used by the operations"""
+
+    def __init__(self, algod_token: str, algod_address: str, headers: Optional[Dict[str, str]] = None,
+                 session: Optional[aiohttp.ClientSession] = None) -> None:
+        self.algod_address = algod_address.rstrip("/")
+        self.headers = {"X-Algo-API-Token": algod_token}
+        if headers:
+            self.headers.update(headers)
+        self._session = session
+
+    async def __aenter__(self) -> "AsyncAlgodClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(headers=self.headers)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def algod_request(self, method: str, path: str, data: Any = None,
+                            content_type: Optional[str] = None, raw: bool = False) -> Any:
+        headers = {"Content-Type": content_type} if content_type else None
+        async with self.session.request(method, self.algod_address + "/v2" + path,
+                                        data=data, headers=headers) as resp:
+            if resp.status != 200:
+                body = await resp.text()
+                try:
+                    msg = (await resp.json(content_type=None))["message"]
+                except Exception:
+                    msg = body
+                raise error.AlgodHTTPError(msg, resp.status)
+            if raw:
+                return await resp.read()
+            return await resp.json(content_type=None)
+
+    async def status(self) -> Dict[str, Any]:
+        return await self.algod_request("GET", "/status")
+
+    async def status_after_block(self, block_num: int) -> Dict[str, Any]:
+        return await self.algod_request("GET", "/status/wait-for-block-after/{}".format(block_num))
+
+    async def suggested_params(self) -> transaction.SuggestedParams:
+        res = await self.algod_request("GET", "/transactions/params")
+        return transaction.SuggestedParams(
+            res["fee"],
+            res["last-round"],
+            res["last-round"] + 1000,
+            res["genesis-hash"],
+            res["genesis-id"],
+            False,
+            res["consensus-version"],
+            res["min-fee"],
+        )
+
+    async def send_transactions(self, txns: List[transaction.SignedTransaction]) -> str:
+        serialized = b"".join(base64.b64decode(encoding.msgpack_encode(txn)) for txn in txns)
+        res = await self.algod_request("POST", "/transactions", data=serialized,
+                                       content_type="application/x-binary")
+        return res["txId"]
+
+    async def send_transaction(self, txn: transaction.SignedTransaction) -> str:
+        return await self.send_transactions([txn])
+
+    async def pending_transaction_info(self, txid: str) -> Dict[str, Any]:
+        return await self.algod_request("GET", "/transactions/pending/{}".format(txid))
+
+    async def account_info(self, address: str) -> Dict[str, Any]:
+        return await self.algod_request("GET", "/accounts/{}".format(address))
+
+    async def application_info(self, app_id: int) -> Dict[str, Any]:
+        return await self.algod_request("GET", "/applications/{}".format(app_id))
+
+    async def compile(self, source: str) -> Dict[str, Any]:
+        return await self.algod_request("POST", "/teal/compile", data=source.encode(),
+                                        content_type="text/plain")
+
+
+async def wait_for_transaction(client: AsyncAlgodClient, tx_id: str) -> PendingTxnResponse:
+    return PendingTxnResponse(await wait_for_confirmation(client, tx_id))
+
+
+async def wait_for_confirmation(client: AsyncAlgodClient, tx_id: str, wait_rounds: int = 4) -> Dict[str, Any]:
+    last_round = (await client.status())["last-round"]
+    start_round = last_round
+    while True:
+        pending_txn = await client.pending_transaction_info(tx_id)
+        if pending_txn.get("confirmed-round", 0) > 0:
+            observe_round(client, pending_txn["confirmed-round"])
+            print("Transaction {} confirmed in round {}.".format(
+                tx_id, pending_txn.get("confirmed-round")))
+            return pending_txn
+        if pending_txn.get("pool-error"):
+            raise Exception("pool error: {}".format(pending_txn["pool-error"]))
+        if last_round >= start_round + wait_rounds:
+            raise Exception("Transaction {} not confirmed after {} rounds".format(tx_id, wait_rounds))
+        last_round += 1
+        await client.status_after_block(last_round)
+
+
+async def send(client: AsyncAlgodClient, name: str, signed_group) -> Dict[str, Any]:
+    print("Sending Transaction for {}".format(name))
+    txid = await client.send_transactions(signed_group)
+    return await wait_for_confirmation(client, txid, 4)
+
+
+async def fund_if_needed(client: AsyncAlgodClient, funder: str, pk: str, app: str):
+    fund = False
+    try:
+        ai = await client.account_info(app)
+        fund = ai["amount"] < 1e7
+    except error.AlgodHTTPError:
+        fund = True
+
+    if fund:
+        sp = await get_params_provider(client).aget()
+        txn_group = [transaction.PaymentTxn(funder, sp, app, 10000000)]
+        return await send(client, "seed", [txn.sign(pk) for txn in txn_group])
+
+
+async def print_balances(client: AsyncAlgodClient, app: str, addr: str, pool: int, a: int, b: int):
+    appbal, addrbal = await asyncio.gather(client.account_info(app), client.account_info(addr))
+    for title, info in (("App: ", appbal), ("Participant: ", addrbal)):
+        print(title)
+        for asset in info["assets"]:
+            if asset["asset-id"] == pool:
+                print("\tPool Balance {}".format(asset["amount"]))
+            if asset["asset-id"] == a:
+                print("\tAssetA Balance {}".format(asset["amount"]))
+            if asset["asset-id"] == b:
+                print("\tAssetB Balance {}".format(asset["amount"]))
+
+
+# PyTeal keeps global counters while building, so builds run one at a time
+_build_lock = threading.Lock()
+
+
+def _build(contract, name: str, cache: Optional[CompileCache]):
+    """Cached program, or the TEAL and any cached program for it; blocking"""
+    if cache is not None:
+        program = cache.cached_program(contract, name, TEAL_VERSION)
+        if program is not None:
+            return None, program
+    with _build_lock:
+        teal = CompileCache.build(contract, name, TEAL_VERSION)
+    return teal, cache.get(cache.key(teal, TEAL_VERSION)) if cache is not None else None
+
+
+async def compile_program(client: AsyncAlgodClient, contract, name: str,
+                          cache: Optional[CompileCache] = compile_cache) -> bytes:
+    """Like `operations.compile_program`; the PyTeal build and the cache's
+    disk I/O run in the loop's default executor"""
+    loop = asyncio.get_running_loop()
+    teal, program = await loop.run_in_executor(None, _build, contract, name, cache)
+    if teal is None:
+        return program
+
+    if program is None:
+        program = base64.b64decode((await client.compile(teal))["result"])
+    if cache is not None:
+        await loop.run_in_executor(None, cache.remember, contract, name, TEAL_VERSION, teal, program)
+    return program
+
+
+async def _create_app(client: AsyncAlgodClient, sender: Account, artifact: str, contract_factory,
+                      foreign_apps=None, build: str = "default") -> int:
+    programs = await asyncio.get_running_loop().run_in_executor(None, artifacts.load, artifact, build)
+    if programs is None:
+        contract = contract_factory()
+        programs = await asyncio.gather(
+            compile_program(client, contract, "approval_program"),
+            compile_program(client, contract, "clear_program"),
+        )
+    approval_program, clear_program = programs
+    schema = artifacts.schema(artifact, build)
+    sp = await get_params_provider(client).aget()
+
+    txn = transaction.ApplicationCreateTxn(
+        sender=sender.get_address(),
+        sp=sp,
+        on_complete=transaction.OnComplete.NoOpOC,
+        approval_program=approval_program,
+        clear_program=clear_program,
+        global_schema=transaction.StateSchema(*schema["global"]),
+        local_schema=transaction.StateSchema(*schema["local"]),
+        foreign_apps=foreign_apps
+    )
+    tx_id = await client.send_transaction(txn.sign(sender.get_private_key()))
+
+    response = await wait_for_transaction(client, tx_id)
+    assert response.application_index is not None and response.application_index > 0
+    return response.application_index
+
+
+async def create_master_app(client: AsyncAlgodClient, sender: Account, template_pool_id: int,
+                            shard_template_id: Optional[int] = None) -> int:
+    sharded = shard_template_id is not None
+
+    def contract():
+        # Only imported when no bundle applies, so deploying never loads PyTeal
+        from .contracts.master import MasterContract
+
+        return MasterContract(sharded=sharded)
+
+    if sharded:
+        return await _create_app(client, sender, "master", contract, [template_pool_id, shard_template_id], "sharded")
+    return await _create_app(client, sender, "master", contract, [template_pool_id])
+
+
+async def create_shard_template_app(client: AsyncAlgodClient, sender: Account) -> int:
+    def contract():
+        from .contracts.registry import RegistryShard
+
+        return RegistryShard()
+
+    return await _create_app(client, sender, "registry", contract)
+
+
+async def create_pool_app(client: AsyncAlgodClient, sender: Account) -> int:
+    def contract():
+        from .contracts.pool import PoolContract
+
+        return PoolContract()
+
+    return await _create_app(client, sender, "pool", contract)
+
+
+async def create_pool(client: AsyncAlgodClient, sender: Account, master_app_id: int, template_pool_id: int, asset_a: int, asset_b: int,
+                      registry: Optional[PoolRegistry] = None, shard_template_id: Optional[int] = None) -> Optional[int]:
+    assert asset_a < asset_b
+    amount = POOL_CREATION_FEE
+    foreign_apps = [template_pool_id]
+    if shard_template_id is not None:
+        if registry is not None:
+            shard_id = registry.shard(asset_a, asset_b)
+        else:
+            info = await client.application_info(master_app_id)
+            shard_id = MasterState(info["params"].get("global-state", [])).shard(asset_a, asset_b)
+        foreign_apps.append(shard_template_id)
+        if shard_id is None:
+            amount += SHARD_CREATION_FEE
+        else:
+            if registry is not None:
+                pools = registry.shard_size(asset_a, asset_b)
+            else:
+                pools = len((await client.application_info(shard_id))["params"].get("global-state", []))
+            check_shard_capacity(pools, asset_a, asset_b)
+            foreign_apps.append(shard_id)
+
+    sp = await get_params_provider(client).aget()
+    txn = transaction.PaymentTxn(
+        sender=sender.get_address(),
+        sp=sp,
+        receiver=get_application_address(master_app_id),
+        amt=amount
+    )
+
+    txn2 = transaction.ApplicationCallTxn(
+        sender=sender.get_address(),
+        sp=sp,
+        index=master_app_id,
+        on_complete=transaction.OnComplete.NoOpOC,
+        app_args=[b"new_pool"],
+        foreign_assets=[asset_a, asset_b],
+        foreign_apps=foreign_apps
+    )
+    txn_group = transaction.assign_group_id([txn, txn2])
+    await client.send_transactions([t.sign(sender.get_private_key()) for t in txn_group])
+    response = await wait_for_transaction(client, txn_group[1].get_txid())
+    if registry is not None:
+        registry.apply(response)
+    return registered_pool(response, asset_a, asset_b)
+
+
+async def create_asset(client: AsyncAlgodClient, sender: Account, unitname: str) -> int:
+    txn = transaction.AssetCreateTxn(
+        sender=sender.get_address(),
+        sp=await get_params_provider(client).aget(),
+        total=1_000_000,
+        decimals=0,
+        default_frozen=False,
+        asset_name="asset",
+        unit_name=unitname
+    )
+    tx_id = await client.send_transaction(txn.sign(sender.get_private_key()))
+
+    response = await wait_for_transaction(client, tx_id)
+    assert response.asset_index is not None and response.asset_index > 0
+    return response.asset_index
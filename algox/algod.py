@@ -0,0 +1,192 @@
+import http.client
+import json
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib import parse
+
+from algosdk import constants, error
+from algosdk.v2client.algod import AlgodClient, api_version_path_prefix
+
+# A reused connection the server already closed fails with one of these
+_STALE = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# Long poll that algod holds open for up to about a minute
+_WAIT_PATH = "/status/wait-for-block-after/"
+
+# Path segments that identify an object rather than an endpoint
+_ID_SEGMENT = re.compile(r"^(\d+|[A-Z2-7]{52}|[A-Z2-7]{58})$")
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def __repr__(self) -> str:
+        return "EndpointStats(count={}, errors={}, mean={:.4f}, max={:.4f})".format(
+            self.count, self.errors, self.mean, self.max)
+
+
+def endpoint(method: str, requrl: str) -> str:
+    """Stats key for a request, e.g. `GET /accounts/{}`"""
+    path = requrl.split("?", 1)[0]
+    return "{} {}".format(method, "/".join("{}" if _ID_SEGMENT.match(s) else s for s in path.split("/")))
+
+
+class PooledAlgodClient(AlgodClient):
+    """AlgodClient that reuses keep-alive connections
+
+    Up to `pool_size` HTTP/1.1 connections to the node are kept open and
+    shared between threads; a request waits for a free one once all are busy.
+    Latency and error counts are kept per endpoint, see `stats`.
+
+    Requests time out after `timeout` seconds, except `status_after_block`,
+    which algod holds open for about a minute and which gets `wait_timeout`.
+    """
+
+    def __init__(self, algod_token: str, algod_address: str, headers: Optional[Dict[str, str]] = None,
+                 pool_size: int = 8, timeout: float = 30.0, wait_timeout: float = 90.0) -> None:
+        super().__init__(algod_token, algod_address, headers)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.wait_timeout = wait_timeout
+
+        url = parse.urlsplit(algod_address)
+        self._https = url.scheme == "https"
+        self._host = url.netloc
+        self._base = url.path.rstrip("/")
+
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointStats] = {}
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._https:
+            return http.client.HTTPSConnection(self._host, timeout=self.timeout)
+        return http.client.HTTPConnection(self._host, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection, reuse: bool):
+        if reuse:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+
+    def _send(self, method: str, url: str, data: Optional[bytes], header: Dict[str, str], timeout: float):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        reused = conn is not None
+        if conn is None:
+            conn = self._connect()
+        # Idle connections are shared by requests with different timeouts
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request(method, url, body=data, headers=header)
+            resp = conn.getresponse()
+            body = resp.read()
+        except _STALE:
+            conn.close()
+            if not reused:
+                raise
+            # Idle connection timed out on the node's side, retry on a new one
+            conn = self._connect()
+            conn.timeout = timeout
+            try:
+                conn.request(method, url, body=data, headers=header)
+                resp = conn.getresponse()
+                body = resp.read()
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn, not resp.will_close)
+        return resp.status, body
+
+    def algod_request(self, method, requrl, params=None, data=None, headers=None, response_format="json"):
+        header = {"User-Agent": "py-algorand-sdk"}
+        if self.headers:
+            header.update(self.headers)
+        if headers:
+            header.update(headers)
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        key = endpoint(method, requrl)
+        timeout = self.wait_timeout if requrl.startswith(_WAIT_PATH) else self.timeout
+        if requrl not in constants.unversioned_paths:
+            requrl = api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + "?" + parse.urlencode(params)
+
+        with self._slots:
+            # Timed from here, so waiting for a free connection is not counted
+            start = time.perf_counter()
+            try:
+                status, body = self._send(method, self._base + requrl, data, header, timeout)
+            except Exception:
+                self._record(key, time.perf_counter() - start, False)
+                raise
+        self._record(key, time.perf_counter() - start, status < 400)
+
+        if status >= 400:
+            message = body.decode("utf-8")
+            try:
+                message = json.loads(message)["message"]
+            except Exception:
+                pass
+            raise error.AlgodHTTPError(message, status)
+
+        if response_format == "json":
+            try:
+                return json.loads(body)
+            except Exception as e:
+                raise error.AlgodResponseError("Failed to parse JSON response from algod") from e
+        return body
+
+    def _record(self, key: str, elapsed: float, ok: bool):
+        with self._lock:
+            s = self._stats.get(key)
+            if s is None:
+                s = self._stats[key] = EndpointStats()
+            s.count += 1
+            s.total += elapsed
+            s.max = max(s.max, elapsed)
+            if not ok:
+                s.errors += 1
+
+    def stats(self) -> Dict[str, EndpointStats]:
+        """Latency in seconds and error count per endpoint since the last reset"""
+        with self._lock:
+            snapshot = {}
+            for key, s in self._stats.items():
+                copy = snapshot[key] = EndpointStats()
+                copy.count, copy.errors, copy.total, copy.max = s.count, s.errors, s.total, s.max
+            return snapshot
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def print_stats(self):
+        print("{:<40} {:>6} {:>6} {:>9} {:>9}".format("endpoint", "calls", "errors", "mean ms", "max ms"))
+        for key, s in sorted(self.stats().items()):
+            print("{:<40} {:>6} {:>6} {:>9.1f} {:>9.1f}".format(key, s.count, s.errors, s.mean * 1000, s.max * 1000))
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
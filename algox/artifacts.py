@@ -0,0 +1,291 @@
+"""Versioned bytecode bundles shipped in `algox/artifacts/`
+
+Every contract version is one `<contract>.v<N>.json` bundle holding the
+approval and clear bytecode of each build, the hash of the contract source
+and of the package modules it imports, the TEAL version, and the state
+schema and opcode cost of every build.
+Deploying from a bundle needs neither PyTeal nor algod's compile endpoint.
+The newest bundle is only used implicitly while its source hash matches.
+Otherwise callers fall back to compiling.
+
+    python -m algox.artifacts            # rebuild every contract with ALGOD_URL
+    python -m algox.artifacts pool
+    python -m algox.artifacts --check    # fail if a newest bundle is stale
+"""
+import argparse
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from algosdk.future import transaction
+
+from .cache import hash_sources
+from .constants import (
+    MASTER_SCHEMA, POOL_SCHEMA, POOL_TEMPLATE, SHARD_SCHEMA, SHARDED_MASTER_SCHEMA, TEAL_VERSION,
+)
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARTIFACTS_DIR = os.path.join(PACKAGE_DIR, "artifacts")
+
+# Contract -> build name -> constructor arguments
+BUILDS: Dict[str, Dict[str, Dict[str, bool]]] = {
+    "pool": {
+        "default": {},
+        "optimized": {"optimized": True},
+        "templated": {"templated": True},
+    },
+    "master": {
+        "default": {},
+        "sharded": {"sharded": True},
+    },
+    "registry": {"default": {}},
+}
+
+
+def schema(contract: str, build: str = "default") -> Dict[str, Tuple[int, int]]:
+    """Global and local `(uints, byte slices)` the apps of a build are created with"""
+    if contract == "registry":
+        global_schema = SHARD_SCHEMA
+    elif contract == "master":
+        global_schema = SHARDED_MASTER_SCHEMA if build == "sharded" else MASTER_SCHEMA
+    else:
+        global_schema = POOL_SCHEMA
+    return {"global": global_schema, "local": (0, 0)}
+
+
+def pool_build(optimized: bool = False, templated: bool = False) -> Optional[str]:
+    """Bundle build name of a pool configuration, None if it is not prebuilt"""
+    if optimized and templated:
+        return None
+    if templated:
+        return "templated"
+    return "optimized" if optimized else "default"
+
+
+def source_hash(contract: str) -> Optional[str]:
+    """Hash of everything a bundle is built from, None without the contract source
+
+    Covers the contract module and every package module it imports, e.g.
+    `constants.py` for the master's fees and shard layout.
+    """
+    path = os.path.join(PACKAGE_DIR, "contracts", contract + ".py")
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    hash_sources(h, path)
+    h.update("|teal={}|builds={}".format(TEAL_VERSION, sorted(BUILDS[contract].items())).encode())
+    if contract == "pool":
+        h.update(repr(sorted(POOL_TEMPLATE.items())).encode())
+    return h.hexdigest()
+
+
+class Bundle:
+    """One version of a contract's compiled builds"""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        self.data = data
+        self.contract: str = data["contract"]
+        self.version: int = data["version"]
+        self.source_hash: str = data["source_hash"]
+        self.teal_version: int = data["teal_version"]
+
+    @classmethod
+    def read(cls, path: str) -> "Bundle":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def write(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the bundle was built from the contract source on disk"""
+        current = source_hash(self.contract)
+        return current is None or current == self.source_hash
+
+    @property
+    def builds(self) -> List[str]:
+        return sorted(self.data["builds"])
+
+    def programs(self, build: str = "default") -> Tuple[bytes, bytes]:
+        """`(approval, clear)` bytecode of a build"""
+        b = self.data["builds"][build]
+        return base64.b64decode(b["approval"]), base64.b64decode(b["clear"])
+
+    def costs(self, build: str = "default") -> Dict[str, int]:
+        """Opcode cost of every branch, e.g. `swap_a_b`, measured on the local AVM"""
+        return dict(self.data["builds"][build]["costs"])
+
+    def schema(self, build: str = "default") -> Dict[str, Any]:
+        # Bundles written before schemas were kept per build have one for all
+        return self.data["builds"][build].get("schema") or self.data["schema"]
+
+    def global_schema(self, build: str = "default") -> transaction.StateSchema:
+        return transaction.StateSchema(*self.schema(build)["global"])
+
+    def local_schema(self, build: str = "default") -> transaction.StateSchema:
+        return transaction.StateSchema(*self.schema(build)["local"])
+
+
+def bundle_path(contract: str, version: int) -> str:
+    return os.path.join(ARTIFACTS_DIR, "{}.v{}.json".format(contract, version))
+
+
+def versions(contract: str) -> List[int]:
+    pattern = re.compile(r"^{}\.v(\d+)\.json$".format(re.escape(contract)))
+    try:
+        names = os.listdir(ARTIFACTS_DIR)
+    except OSError:
+        return []
+    return sorted(int(m.group(1)) for m in map(pattern.match, names) if m)
+
+
+def load_bundle(contract: str, version: Optional[int] = None) -> Optional[Bundle]:
+    """A bundle by version, or the newest one; None if there is none"""
+    if version is None:
+        available = versions(contract)
+        if not available:
+            return None
+        version = available[-1]
+    try:
+        return Bundle.read(bundle_path(contract, version))
+    except (OSError, ValueError):
+        return None
+
+
+def load(contract: str, build: str = "default") -> Optional[Tuple[bytes, bytes]]:
+    """Programs of a build from the newest bundle, None if missing or stale"""
+    bundle = load_bundle(contract)
+    if bundle is None or not bundle.fresh or build not in bundle.data["builds"]:
+        return None
+    return bundle.programs(build)
+
+
+def build(contract: str, client) -> Bundle:
+    """Compile, benchmark and write a bundle for the current contract source
+
+    The bytecode is assembled by `client`, which must be a real algod: the
+    local AVM's assembler only backs the bench, whose costs are measured
+    locally either way. Published bundles are never rewritten: if the
+    newest bundle holds the same source and builds it is returned as is,
+    otherwise a new version is written.
+    """
+    from .avm import LocalAlgod
+    from .bench import benchmark_programs
+    from .cache import CompileCache
+    from .contracts.master import MasterContract
+    from .contracts.pool import PoolContract
+    from .contracts.registry import RegistryShard
+    from .utils import fully_compile_contract
+
+    if client is None or isinstance(client, LocalAlgod):
+        raise Exception("Bundles are assembled by algod's compile endpoint, pass an AlgodClient")
+    classes = {"pool": PoolContract, "master": MasterContract, "registry": RegistryShard}
+
+    def compile_build(name: str, kwargs: Dict[str, bool]) -> Tuple[bytes, bytes]:
+        instance = classes[name](**kwargs)
+        template = POOL_TEMPLATE if kwargs.get("templated") else None
+        return (
+            fully_compile_contract(client, CompileCache.build(instance, "approval_program", TEAL_VERSION, template)),
+            fully_compile_contract(client, CompileCache.build(instance, "clear_program", TEAL_VERSION)),
+        )
+
+    # Branch costs come from the bench, which needs every contract
+    default_pool = compile_build("pool", {})
+    default_master = compile_build("master", {})
+    sharded_master = compile_build("master", {"sharded": True})
+    default_registry = compile_build("registry", {})
+
+    builds = {}
+    for name, kwargs in BUILDS[contract].items():
+        programs = compile_build(contract, kwargs)
+        if contract == "pool":
+            results = benchmark_programs(programs, default_master, kwargs.get("templated", False))
+        elif contract == "registry":
+            results = benchmark_programs(default_pool, sharded_master, registry_programs=programs)
+        elif kwargs.get("sharded"):
+            results = benchmark_programs(default_pool, programs, registry_programs=default_registry)
+        else:
+            results = benchmark_programs(default_pool, programs)
+        prefix = contract + "."
+        builds[name] = {
+            "approval": base64.b64encode(programs[0]).decode(),
+            "clear": base64.b64encode(programs[1]).decode(),
+            "schema": schema(contract, name),
+            "costs": {k[len(prefix):]: r["cost"] for k, r in results.items() if k.startswith(prefix)},
+        }
+
+    current = source_hash(contract)
+    latest = load_bundle(contract)
+    if latest is not None and latest.source_hash == current and latest.data["builds"] == json.loads(json.dumps(builds)):
+        print("{} is up to date".format(bundle_path(contract, latest.version)))
+        return latest
+    version = 1 if latest is None else latest.version + 1
+
+    bundle = Bundle({
+        "contract": contract,
+        "version": version,
+        "source_hash": current,
+        "teal_version": TEAL_VERSION,
+        "builds": builds,
+    })
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    bundle.write(bundle_path(contract, version))
+    print("Wrote {}".format(bundle_path(contract, version)))
+    return bundle
+
+
+def stale(contracts: Optional[List[str]] = None) -> List[str]:
+    """Contracts whose newest bundle is missing or no longer matches the source"""
+    result = []
+    for contract in contracts or list(BUILDS):
+        bundle = load_bundle(contract)
+        if bundle is None or not bundle.fresh or sorted(bundle.data["builds"]) != sorted(BUILDS[contract]):
+            result.append(contract)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("contracts", nargs="*", help="contracts to build, default all of {}".format(", ".join(BUILDS)))
+    parser.add_argument("--check", action="store_true", help="only check that the newest bundles are fresh")
+    args = parser.parse_args(argv)
+    unknown = set(args.contracts) - set(BUILDS)
+    if unknown:
+        parser.error("unknown contract {}".format(", ".join(sorted(unknown))))
+
+    if args.check:
+        outdated = stale(args.contracts)
+        for contract in outdated:
+            print("STALE {}: rebuild with python -m algox.artifacts {}".format(contract, contract))
+        if not outdated:
+            print("Every bundle is fresh")
+        return 1 if outdated else 0
+
+    import dotenv
+
+    from .utils import get_algod_client
+
+    dotenv.load_dotenv(".env")
+    if not os.environ.get("ALGOD_URL"):
+        parser.error("set ALGOD_URL and ALGOD_API_KEY to the algod node that assembles the bundles")
+    client = get_algod_client(os.environ["ALGOD_URL"], os.environ.get("ALGOD_API_KEY"))
+
+    for contract in args.contracts or list(BUILDS):
+        # Keep compile progress out of the output
+        with contextlib.redirect_stdout(io.StringIO()):
+            bundle = build(contract, client)
+        print("{} v{}: {}".format(contract, bundle.version, bundle_path(contract, bundle.version)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
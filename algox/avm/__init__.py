@@ -0,0 +1,10 @@
+"""In-process TEAL v6 assembler and evaluator
+
+Runs the compiled pool and master programs against an in-memory ledger, so
+contract behaviour and opcode costs can be checked without an algod node.
+"""
+from .assembler import AssemblyError, assemble, decode, disassemble, patch_intcblock, program_hash
+from .client import LocalAlgod
+from .evaluator import AVM, AVMError, GroupResult, TxnResult
+from .ledger import Ledger, app_address
+
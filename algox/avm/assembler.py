@@ -0,0 +1,402 @@
+"""Offline TEAL assembler and bytecode decoder
+
+`assemble` turns the TEAL emitted by `compileTeal` into bytecode without a
+node, so contract tests can run in offline CI. `int`/`byte` constants used
+more than once are hoisted into `intcblock`/`bytecblock` as goal does, the
+rest become `pushint`/`pushbytes`; the result is valid bytecode but is not
+guaranteed to be byte-identical to algod's output.
+"""
+import base64
+import hashlib
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from algosdk import encoding
+
+from .spec import (
+    BYTECBLOCK, BYTES, FIELD_NAMES, INTCBLOCK, LABEL, NAMED_INTS, OPS_BY_CODE,
+    OPS_BY_NAME, U8, VARUINT, OpSpec,
+)
+
+
+class AssemblyError(Exception):
+    pass
+
+
+def encode_uvarint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def decode_uvarint(data: bytes, pos: int) -> Tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise AssemblyError("truncated varuint")
+        b = data[pos]
+        n |= (b & 0x7f) << shift
+        pos += 1
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _tokenize(line: str) -> List[str]:
+    tokens = []
+    i = 0
+    while i < len(line):
+        c = line[i]
+        if c.isspace():
+            i += 1
+        elif line.startswith("//", i):
+            break
+        elif c == '"':
+            j = i + 1
+            while j < len(line) and line[j] != '"':
+                j += 2 if line[j] == "\\" else 1
+            tokens.append(line[i:j + 1])
+            i = j + 1
+        else:
+            j = i
+            while j < len(line) and not line[j].isspace():
+                j += 1
+            tokens.append(line[i:j])
+            i = j
+    return tokens
+
+
+def _parse_string(tok: str) -> bytes:
+    body = tok[1:-1]
+    out = bytearray()
+    i = 0
+    escapes = {"n": b"\n", "r": b"\r", "t": b"\t", '"': b'"', "\\": b"\\"}
+    while i < len(body):
+        c = body[i]
+        if c == "\\":
+            nxt = body[i + 1]
+            if nxt == "x":
+                out += bytes([int(body[i + 2:i + 4], 16)])
+                i += 4
+                continue
+            out += escapes[nxt]
+            i += 2
+            continue
+        out += c.encode()
+        i += 1
+    return bytes(out)
+
+
+def parse_bytes(args: List[str]) -> bytes:
+    """Parse the arguments of a `byte` pseudo-op"""
+    if not args:
+        raise AssemblyError("byte needs an argument")
+    first = args[0]
+    if first.startswith('"'):
+        return _parse_string(first)
+    if first.startswith("0x"):
+        return bytes.fromhex(first[2:])
+    for prefix in ("base64", "b64", "base32", "b32"):
+        if first in (prefix,) and len(args) > 1:
+            val = args[1]
+        elif first.startswith(prefix + "(") and first.endswith(")"):
+            val = first[len(prefix) + 1:-1]
+        else:
+            continue
+        if prefix.endswith("64"):
+            return base64.b64decode(val)
+        return base64.b32decode(val + "=" * (-len(val) % 8))
+    raise AssemblyError("cannot parse byte constant {}".format(" ".join(args)))
+
+
+def _parse_int(tok: str, template: Dict[str, int]) -> int:
+    if tok in NAMED_INTS:
+        return NAMED_INTS[tok]
+    if tok in template:
+        return template[tok]
+    if tok.startswith("TMPL_"):
+        raise AssemblyError("no value for template variable {}".format(tok))
+    return int(tok, 0)
+
+
+def _method_selector(sig: str) -> bytes:
+    h = hashlib.new("sha512_256")
+    h.update(sig.encode())
+    return h.digest()[:4]
+
+
+class _Line(NamedTuple):
+    lineno: int
+    op: str
+    args: List[str]
+
+
+def assemble(teal: str, template: Optional[Dict[str, int]] = None) -> bytes:
+    """Assemble TEAL source, substituting `TMPL_*` ints from `template`"""
+    template = template or {}
+    version = 1
+    lines: List[_Line] = []
+    for lineno, raw in enumerate(teal.splitlines(), 1):
+        stripped = raw.strip()
+        if stripped.startswith("#pragma"):
+            parts = stripped.split()
+            if len(parts) == 3 and parts[1] == "version":
+                version = int(parts[2])
+            continue
+        toks = _tokenize(raw)
+        if not toks:
+            continue
+        if len(toks) == 1 and toks[0].endswith(":"):
+            lines.append(_Line(lineno, ":", [toks[0][:-1]]))
+            continue
+        lines.append(_Line(lineno, toks[0], toks[1:]))
+
+    # Resolve pseudo-op constants
+    explicit_blocks = any(ln.op in ("intcblock", "bytecblock") for ln in lines)
+    ints: Counter = Counter()
+    byts: Counter = Counter()
+    resolved: List[Tuple[_Line, Any]] = []
+    for ln in lines:
+        try:
+            if ln.op == "int":
+                val = _parse_int(ln.args[0], template)
+                ints[val] += 1
+            elif ln.op == "byte":
+                val = parse_bytes(ln.args)
+                byts[val] += 1
+            elif ln.op == "addr":
+                val = encoding.decode_address(ln.args[0])
+                byts[val] += 1
+            elif ln.op == "method":
+                val = _method_selector(_parse_string(ln.args[0]).decode())
+                byts[val] += 1
+            else:
+                val = None
+        except (AssemblyError, ValueError, IndexError, KeyError) as e:
+            raise AssemblyError("line {}: {}".format(ln.lineno, e))
+        resolved.append((ln, val))
+
+    intc: List[int] = []
+    bytec: List[bytes] = []
+    if not explicit_blocks:
+        intc = [v for v, n in ints.most_common() if n > 1][:255]
+        bytec = [v for v, n in byts.most_common() if n > 1][:255]
+
+    # First pass: encode everything but branch targets
+    chunks: List[Tuple[bytes, Optional[str], int]] = []
+    labels: Dict[str, int] = {}
+    pc = len(encode_uvarint(version))
+    if intc:
+        block = _encode_op("intcblock", [str(v) for v in intc], template)
+        chunks.append((block, None, 0))
+        pc += len(block)
+    if bytec:
+        block = bytes([OPS_BY_NAME["bytecblock"].opcode]) + encode_uvarint(len(bytec))
+        for v in bytec:
+            block += encode_uvarint(len(v)) + v
+        chunks.append((block, None, 0))
+        pc += len(block)
+
+    for ln, val in resolved:
+        try:
+            if ln.op == ":":
+                if ln.args[0] in labels:
+                    raise AssemblyError("duplicate label {}".format(ln.args[0]))
+                labels[ln.args[0]] = pc
+                continue
+            if ln.op == "int":
+                code = _encode_intc(intc.index(val)) if val in intc else \
+                    bytes([OPS_BY_NAME["pushint"].opcode]) + encode_uvarint(val)
+            elif ln.op in ("byte", "addr", "method"):
+                code = _encode_bytec(bytec.index(val)) if val in bytec else \
+                    bytes([OPS_BY_NAME["pushbytes"].opcode]) + encode_uvarint(len(val)) + val
+            else:
+                spec = OPS_BY_NAME.get(ln.op)
+                if spec is None:
+                    raise AssemblyError("unknown opcode {}".format(ln.op))
+                if LABEL in spec.immediates:
+                    chunks.append((bytes([spec.opcode]), ln.args[0], pc + 3))
+                    pc += 3
+                    continue
+                code = _encode_op(ln.op, ln.args, template)
+        except (AssemblyError, ValueError, IndexError) as e:
+            raise AssemblyError("line {}: {}".format(ln.lineno, e))
+        chunks.append((code, None, 0))
+        pc += len(code)
+
+    # Second pass: patch branch offsets
+    out = bytearray(encode_uvarint(version))
+    for code, label, after in chunks:
+        out += code
+        if label is not None:
+            if label not in labels:
+                raise AssemblyError("unknown label {}".format(label))
+            offset = labels[label] - after
+            if not -0x8000 <= offset <= 0x7fff:
+                raise AssemblyError("branch to {} too far".format(label))
+            out += offset.to_bytes(2, "big", signed=True)
+    return bytes(out)
+
+
+def _encode_intc(i: int) -> bytes:
+    if i < 4:
+        return bytes([OPS_BY_NAME["intc_{}".format(i)].opcode])
+    return bytes([OPS_BY_NAME["intc"].opcode, i])
+
+
+def _encode_bytec(i: int) -> bytes:
+    if i < 4:
+        return bytes([OPS_BY_NAME["bytec_{}".format(i)].opcode])
+    return bytes([OPS_BY_NAME["bytec"].opcode, i])
+
+
+def _encode_op(name: str, args: List[str], template: Dict[str, int]) -> bytes:
+    spec = OPS_BY_NAME[name]
+    out = bytearray([spec.opcode])
+    if spec.immediates == (INTCBLOCK,):
+        out += encode_uvarint(len(args))
+        for a in args:
+            out += encode_uvarint(_parse_int(a, template))
+        return bytes(out)
+    if spec.immediates == (BYTECBLOCK,):
+        out += encode_uvarint(len(args))
+        for a in args:
+            v = parse_bytes([a])
+            out += encode_uvarint(len(v)) + v
+        return bytes(out)
+    if spec.immediates == (BYTES,):
+        v = parse_bytes(args)
+        return bytes(out + encode_uvarint(len(v)) + v)
+
+    if len(args) != len(spec.immediates):
+        raise AssemblyError("{} expects {} immediates".format(name, len(spec.immediates)))
+    for kind, a in zip(spec.immediates, args):
+        if kind == U8:
+            out.append(int(a, 0))
+        elif kind == VARUINT:
+            out += encode_uvarint(_parse_int(a, template))
+        else:
+            names = FIELD_NAMES[kind]
+            if a not in names:
+                raise AssemblyError("unknown field {} for {}".format(a, name))
+            out.append(names.index(a))
+    return bytes(out)
+
+
+class Instr(NamedTuple):
+    offset: int
+    size: int
+    spec: OpSpec
+    args: Tuple[Any, ...]
+
+
+def decode(program: bytes) -> Tuple[int, List[Instr]]:
+    """Split bytecode into `(version, instructions)`
+
+    Branch immediates are resolved to absolute target offsets.
+    """
+    version, pc = decode_uvarint(program, 0)
+    instrs: List[Instr] = []
+    while pc < len(program):
+        start = pc
+        spec = OPS_BY_CODE.get(program[pc])
+        if spec is None:
+            raise AssemblyError("invalid opcode 0x{:02x} at {}".format(program[pc], pc))
+        pc += 1
+        args: List[Any] = []
+        for kind in spec.immediates:
+            if kind == INTCBLOCK:
+                n, pc = decode_uvarint(program, pc)
+                vals = []
+                for _ in range(n):
+                    v, pc = decode_uvarint(program, pc)
+                    vals.append(v)
+                args.append(tuple(vals))
+            elif kind == BYTECBLOCK:
+                n, pc = decode_uvarint(program, pc)
+                vals = []
+                for _ in range(n):
+                    ln, pc = decode_uvarint(program, pc)
+                    vals.append(program[pc:pc + ln])
+                    pc += ln
+                args.append(tuple(vals))
+            elif kind == BYTES:
+                ln, pc = decode_uvarint(program, pc)
+                args.append(program[pc:pc + ln])
+                pc += ln
+            elif kind == VARUINT:
+                v, pc = decode_uvarint(program, pc)
+                args.append(v)
+            elif kind == LABEL:
+                rel = int.from_bytes(program[pc:pc + 2], "big", signed=True)
+                pc += 2
+                args.append(pc + rel)
+            else:
+                args.append(program[pc])
+                pc += 1
+        if pc > len(program):
+            raise AssemblyError("truncated immediates at {}".format(start))
+        instrs.append(Instr(start, pc - start, spec, tuple(args)))
+    return version, instrs
+
+
+def disassemble(program: bytes) -> str:
+    version, instrs = decode(program)
+    targets = {i.args[0] for i in instrs if LABEL in i.spec.immediates}
+    out = ["#pragma version {}".format(version)]
+    for ins in instrs:
+        if ins.offset in targets:
+            out.append("label{}:".format(ins.offset))
+        parts = [ins.spec.name]
+        for kind, a in zip(ins.spec.immediates, ins.args):
+            if kind == LABEL:
+                parts.append("label{}".format(a))
+            elif kind == INTCBLOCK:
+                parts.extend(str(v) for v in a)
+            elif kind == BYTECBLOCK:
+                parts.extend("0x" + v.hex() for v in a)
+            elif kind == BYTES:
+                parts.append("0x" + a.hex())
+            elif kind in FIELD_NAMES:
+                parts.append(FIELD_NAMES[kind][a])
+            else:
+                parts.append(str(a))
+        out.append(" ".join(parts))
+    return "\n".join(out) + "\n"
+
+
+def patch_intcblock(program: bytes, values: Dict[int, int]) -> bytes:
+    """Replace constants of the program's leading `intcblock`
+
+    Only the block is re-encoded. Branch offsets are relative and no branch
+    crosses the block, so the rest of the program is copied unchanged.
+    """
+    _, pc = decode_uvarint(program, 0)
+    if pc >= len(program) or program[pc] != OPS_BY_NAME["intcblock"].opcode:
+        raise AssemblyError("program does not start with an intcblock")
+    start = pc
+    n, pc = decode_uvarint(program, pc + 1)
+    consts = []
+    for _ in range(n):
+        v, pc = decode_uvarint(program, pc)
+        consts.append(v)
+
+    missing = set(values) - set(consts)
+    if missing:
+        raise AssemblyError("intcblock has no constant {}".format(", ".join(str(v) for v in sorted(missing))))
+
+    block = bytearray([program[start]]) + encode_uvarint(n)
+    for v in consts:
+        block += encode_uvarint(values.get(v, v))
+    return program[:start] + bytes(block) + program[pc:]
+
+
+def program_hash(program: bytes) -> str:
+    """Address of a program, as returned by algod's compile endpoint"""
+    h = hashlib.new("sha512_256")
+    h.update(b"Program" + program)
+    return encoding.encode_address(h.digest())
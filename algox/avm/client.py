@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+import msgpack
+from algosdk import encoding
+from algosdk.error import AlgodHTTPError
+from algosdk.future.transaction import SuggestedParams
+
+from .assembler import assemble, program_hash
+from .evaluator import AVM, GroupResult, TxnResult, txid
+from .ledger import Ledger, app_address, raw_address
+
+GENESIS_ID = "algox-local"
+GENESIS_HASH = base64.b64encode(hashlib.sha256(GENESIS_ID.encode()).digest()).decode()
+
+
+def _block_txn(res: TxnResult) -> Dict[str, Any]:
+    """A result as a `SignedTxnInBlock` with its apply data"""
+    dt: Dict[str, Any] = {}
+    if res.global_delta:
+        gd = {}
+        for k, v in res.global_delta.items():
+            if v is None:
+                gd[k] = {"at": 3}
+            elif isinstance(v, int):
+                gd[k] = {"at": 2, "ui": v}
+            else:
+                gd[k] = {"at": 1, "bs": v}
+        dt["gd"] = gd
+    if res.logs:
+        dt["lg"] = list(res.logs)
+    if res.inner_txns:
+        dt["itx"] = [_block_txn(t) for t in res.inner_txns]
+    stxn: Dict[str, Any] = {"txn": res.txn}
+    if dt:
+        stxn["dt"] = dt
+    if res.created_asset_id:
+        stxn["caid"] = res.created_asset_id
+    if res.created_app_id:
+        stxn["apid"] = res.created_app_id
+    return stxn
+
+
+class LocalAlgod:
+    """Just enough of `AlgodClient` to run algox operations on a local `AVM`
+
+    Every accepted group is confirmed in its own round. Signatures are not
+    checked.
+    """
+
+    def __init__(self, avm: Optional[AVM] = None) -> None:
+        self.avm = avm if avm is not None else AVM()
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.blocks: Dict[int, List[TxnResult]] = {}
+        self.last_result: Optional[GroupResult] = None
+        self._new_round = threading.Condition()
+
+    @property
+    def ledger(self) -> Ledger:
+        return self.avm.ledger
+
+    def compile(self, source: str) -> Dict[str, str]:
+        program = assemble(source)
+        return {"hash": program_hash(program), "result": base64.b64encode(program).decode()}
+
+    def status(self) -> Dict[str, Any]:
+        return {"last-round": self.ledger.round}
+
+    def status_after_block(self, round_num: int, timeout: float = 1.0) -> Dict[str, Any]:
+        with self._new_round:
+            self._new_round.wait_for(lambda: self.ledger.round > round_num, timeout)
+        return self.status()
+
+    def block_info(self, block: Optional[int] = None, response_format: str = "json",
+                   round_num: Optional[int] = None) -> Any:
+        round_num = round_num if round_num is not None else block
+        if round_num not in self.blocks and round_num != self.ledger.round:
+            raise AlgodHTTPError("failed to retrieve information from the ledger", 404)
+        txns = [_block_txn(res) for res in self.blocks.get(round_num, [])]
+        body = {"block": {"rnd": round_num, "ts": self.ledger.timestamp, "txns": txns}}
+        if response_format != "msgpack":
+            raise AlgodHTTPError("only msgpack blocks are supported", 400)
+        return msgpack.packb(body, use_bin_type=True)
+
+    def suggested_params(self) -> SuggestedParams:
+        led = self.ledger
+        return SuggestedParams(0, led.round, led.round + 1000, GENESIS_HASH, GENESIS_ID,
+                               flat_fee=False, min_fee=led.min_fee)
+
+    def send_transaction(self, txn: Any) -> str:
+        return self.send_transactions([txn])
+
+    def send_transactions(self, txns: List[Any]) -> str:
+        result = self.avm.evaluate(txns)
+        self.last_result = result
+        if not result.approved:
+            raise AlgodHTTPError("TransactionPool.Remember: {}".format(result.error), 400)
+
+        led = self.ledger
+        with self._new_round:
+            led.round += 1
+            self.blocks[led.round] = result.txns
+            self._new_round.notify_all()
+        ids = []
+        for txn, res in zip(txns, result.txns):
+            tx_id = txn.get_txid() if hasattr(txn, "get_txid") else base64.b32encode(txid(res.txn)).decode().rstrip("=")
+            self.pending[tx_id] = res.to_response(led.round)
+            ids.append(tx_id)
+        return ids[0]
+
+    def send_raw_transaction(self, txn: str) -> str:
+        """Send a base64 concatenation of msgpack signed transactions"""
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(base64.b64decode(txn))
+        return self.send_transactions([encoding.future_msgpack_decode(stxn) for stxn in unpacker])
+
+    def pending_transaction_info(self, tx_id: str) -> Dict[str, Any]:
+        if tx_id not in self.pending:
+            raise AlgodHTTPError("txn does not exist", 404)
+        return self.pending[tx_id]
+
+    def account_info(self, address: str) -> Dict[str, Any]:
+        raw = raw_address(address)
+        led = self.ledger
+        acct = led.account(raw)
+        return {
+            "address": encoding.encode_address(raw),
+            "round": led.round,
+            "amount": acct.algos,
+            "min-balance": led.min_balance(raw),
+            "assets": [
+                {"asset-id": aid, "amount": amt, "is-frozen": aid in acct.frozen}
+                for aid, amt in sorted(acct.assets.items())
+            ],
+            "created-apps": [{"id": app_id} for app_id in sorted(acct.created_apps)],
+            "created-assets": [{"index": aid} for aid in sorted(acct.created_assets)],
+            "apps-local-state": [{"id": app_id} for app_id in sorted(acct.opted_apps)],
+        }
+
+    def application_info(self, app_id: int) -> Dict[str, Any]:
+        app = self.ledger.apps.get(app_id)
+        if app is None:
+            raise AlgodHTTPError("application does not exist", 404)
+        state = []
+        for key, value in app.global_state.items():
+            if isinstance(value, int):
+                v = {"type": 2, "uint": value, "bytes": ""}
+            else:
+                v = {"type": 1, "uint": 0, "bytes": base64.b64encode(value).decode()}
+            state.append({"key": base64.b64encode(key).decode(), "value": v})
+        return {
+            "id": app_id,
+            "params": {
+                "creator": encoding.encode_address(app.creator),
+                "approval-program": base64.b64encode(app.approval).decode(),
+                "clear-state-program": base64.b64encode(app.clear).decode(),
+                "global-state": state,
+                "global-state-schema": {"num-uint": app.global_schema[0], "num-byte-slice": app.global_schema[1]},
+                "local-state-schema": {"num-uint": app.local_schema[0], "num-byte-slice": app.local_schema[1]},
+                "extra-program-pages": app.extra_pages,
+            },
+            "address": encoding.encode_address(app_address(app_id)),
+        }
+
+    def asset_info(self, asset_id: int) -> Dict[str, Any]:
+        asset = self.ledger.assets.get(asset_id)
+        if asset is None:
+            raise AlgodHTTPError("asset does not exist", 404)
+        return {
+            "index": asset_id,
+            "params": {
+                "creator": encoding.encode_address(asset.creator),
+                "total": asset.total,
+                "decimals": asset.decimals,
+                "default-frozen": asset.default_frozen,
+                "unit-name": asset.unit_name.decode(errors="replace"),
+                "name": asset.name.decode(errors="replace"),
+                "manager": encoding.encode_address(asset.manager),
+            },
+        }
@@ -0,0 +1,1666 @@
+import base64
+import hashlib
+from math import isqrt
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import msgpack
+from algosdk import encoding
+
+from .assembler import AssemblyError, decode
+from .ledger import ZERO_ADDRESS, AppState, AssetState, Ledger, app_address
+from .spec import (
+    ACCT_PARAMS_FIELDS, APP_CALL_BUDGET, APP_PARAMS_FIELDS, ARRAY_TXN_FIELDS,
+    ASSET_HOLDING_FIELDS, ASSET_PARAMS_FIELDS, GLOBAL_FIELDS, LABEL,
+    MAX_BYTES_LEN, MAX_CALL_DEPTH, MAX_INNER_TXNS, MAX_KEY_LEN,
+    MAX_KEY_VALUE_LEN, MAX_LOG_SIZE, MAX_LOGS, MAX_STACK_DEPTH, ON_COMPLETION,
+    TXN_FIELDS, TYPE_ENUM,
+)
+
+UINT64_MAX = 2**64 - 1
+
+Value = Union[int, bytes]
+
+
+class AVMError(Exception):
+    pass
+
+
+# Txn field name -> (msgpack key, nested key, kind); kind is "int", "bytes" or "addr"
+TXN_FIELD_KEYS: Dict[str, Tuple[str, Optional[str], str]] = {
+    "Sender": ("snd", None, "addr"),
+    "Fee": ("fee", None, "int"),
+    "FirstValid": ("fv", None, "int"),
+    "LastValid": ("lv", None, "int"),
+    "Note": ("note", None, "bytes"),
+    "Lease": ("lx", None, "bytes"),
+    "Receiver": ("rcv", None, "addr"),
+    "Amount": ("amt", None, "int"),
+    "CloseRemainderTo": ("close", None, "addr"),
+    "XferAsset": ("xaid", None, "int"),
+    "AssetAmount": ("aamt", None, "int"),
+    "AssetSender": ("asnd", None, "addr"),
+    "AssetReceiver": ("arcv", None, "addr"),
+    "AssetCloseTo": ("aclose", None, "addr"),
+    "ApplicationID": ("apid", None, "int"),
+    "OnCompletion": ("apan", None, "int"),
+    "ApprovalProgram": ("apap", None, "bytes"),
+    "ClearStateProgram": ("apsu", None, "bytes"),
+    "RekeyTo": ("rekey", None, "addr"),
+    "ConfigAsset": ("caid", None, "int"),
+    "ConfigAssetTotal": ("apar", "t", "int"),
+    "ConfigAssetDecimals": ("apar", "dc", "int"),
+    "ConfigAssetDefaultFrozen": ("apar", "df", "int"),
+    "ConfigAssetUnitName": ("apar", "un", "bytes"),
+    "ConfigAssetName": ("apar", "an", "bytes"),
+    "ConfigAssetURL": ("apar", "au", "bytes"),
+    "ConfigAssetMetadataHash": ("apar", "am", "bytes"),
+    "ConfigAssetManager": ("apar", "m", "addr"),
+    "ConfigAssetReserve": ("apar", "r", "addr"),
+    "ConfigAssetFreeze": ("apar", "f", "addr"),
+    "ConfigAssetClawback": ("apar", "c", "addr"),
+    "FreezeAsset": ("faid", None, "int"),
+    "FreezeAssetAccount": ("fadd", None, "addr"),
+    "FreezeAssetFrozen": ("afrz", None, "int"),
+    "GlobalNumUint": ("apgs", "nui", "int"),
+    "GlobalNumByteSlice": ("apgs", "nbs", "int"),
+    "LocalNumUint": ("apls", "nui", "int"),
+    "LocalNumByteSlice": ("apls", "nbs", "int"),
+    "ExtraProgramPages": ("apep", None, "int"),
+    "ApplicationArgs": ("apaa", None, "bytes"),
+    "Accounts": ("apat", None, "addr"),
+    "Assets": ("apas", None, "int"),
+    "Applications": ("apfa", None, "int"),
+}
+
+_ADDR_KEYS = {"snd", "rcv", "close", "asnd", "arcv", "aclose", "rekey", "fadd", "m", "r", "f", "c"}
+
+
+def normalize_txn(txn: Any) -> Dict[str, Any]:
+    """Plain msgpack-keyed dict for an algosdk txn, signed txn or dict"""
+    if hasattr(txn, "transaction"):
+        txn = txn.transaction
+    if hasattr(txn, "dictify"):
+        txn = txn.dictify()
+    txn = dict(txn)
+    for key in ("snd", "rcv", "close", "asnd", "arcv", "aclose", "rekey", "fadd"):
+        if isinstance(txn.get(key), str):
+            txn[key] = encoding.decode_address(txn[key])
+    if "apat" in txn:
+        txn["apat"] = [encoding.decode_address(a) if isinstance(a, str) else a for a in txn["apat"]]
+    if "apaa" in txn:
+        txn["apaa"] = [a.encode() if isinstance(a, str) else a for a in txn["apaa"]]
+    if "apar" in txn:
+        apar = dict(txn["apar"])
+        for k in ("un", "an", "au"):
+            if isinstance(apar.get(k), str):
+                apar[k] = apar[k].encode()
+        for k in ("m", "r", "f", "c"):
+            if isinstance(apar.get(k), str):
+                apar[k] = encoding.decode_address(apar[k])
+        txn["apar"] = apar
+    for key in ("apgs", "apls"):
+        if key in txn and hasattr(txn[key], "dictify"):
+            txn[key] = txn[key].dictify()
+    return txn
+
+
+def _canonical(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {k: _canonical(obj[k]) for k in sorted(obj) if obj[k] not in (0, b"", "", None, [], {}, False)}
+    if isinstance(obj, list):
+        return [_canonical(v) for v in obj]
+    return obj
+
+
+def txid(txn: Dict[str, Any]) -> bytes:
+    h = hashlib.new("sha512_256")
+    h.update(b"TX" + msgpack.packb(_canonical(txn), use_bin_type=True))
+    return h.digest()
+
+
+def _jsonify(obj: Any, key: str = "") -> Any:
+    if isinstance(obj, dict):
+        return {k: _jsonify(v, k) for k, v in obj.items()}
+    if isinstance(obj, list):
+        if key == "apat":
+            return [encoding.encode_address(v) for v in obj]
+        return [_jsonify(v) for v in obj]
+    if isinstance(obj, bytes):
+        if key in _ADDR_KEYS and len(obj) == 32:
+            return encoding.encode_address(obj)
+        return base64.b64encode(obj).decode()
+    return obj
+
+
+class TxnResult:
+    """Outcome of one (outer or inner) transaction"""
+
+    def __init__(self, txn: Dict[str, Any]) -> None:
+        self.txn = txn
+        self.cost = 0
+        self.logs: List[bytes] = []
+        self.inner_txns: List["TxnResult"] = []
+        self.created_asset_id = 0
+        self.created_app_id = 0
+        self.global_delta: Dict[bytes, Optional[Value]] = {}
+        self.scratch: Optional[List[Value]] = None
+
+    def to_response(self, round: int = 0) -> Dict[str, Any]:
+        """This result shaped like algod's `pending_transaction_info`"""
+        resp: Dict[str, Any] = {
+            "pool-error": "",
+            "txn": {"txn": _jsonify(self.txn)},
+            "confirmed-round": round,
+        }
+        if self.created_app_id:
+            resp["application-index"] = self.created_app_id
+        if self.created_asset_id:
+            resp["asset-index"] = self.created_asset_id
+        if self.logs:
+            resp["logs"] = [base64.b64encode(ll).decode() for ll in self.logs]
+        if self.inner_txns:
+            resp["inner-txns"] = [t.to_response(round) for t in self.inner_txns]
+        if self.global_delta:
+            delta = []
+            for k, v in self.global_delta.items():
+                if v is None:
+                    value = {"action": 3}
+                elif isinstance(v, int):
+                    value = {"action": 2, "uint": v}
+                else:
+                    value = {"action": 1, "bytes": base64.b64encode(v).decode()}
+                delta.append({"key": base64.b64encode(k).decode(), "value": value})
+            resp["global-state-delta"] = delta
+        return resp
+
+
+class GroupResult:
+    def __init__(self, txns: List[TxnResult], approved: bool, error: Optional[str], budget: int) -> None:
+        self.txns = txns
+        self.approved = approved
+        self.error = error
+        self.budget = budget
+
+    @property
+    def cost(self) -> int:
+        return sum(t.cost for t in self.txns)
+
+    def __repr__(self) -> str:
+        return "GroupResult(approved={}, cost={}, error={!r})".format(self.approved, self.cost, self.error)
+
+
+class _Program:
+    __slots__ = ("version", "ops", "index")
+
+    def __init__(self, program: bytes) -> None:
+        self.version, instrs = decode(program)
+        self.index = {ins.offset: i for i, ins in enumerate(instrs)}
+        self.index[len(program)] = len(instrs)
+        self.ops = []
+        for i, ins in enumerate(instrs):
+            handler = _HANDLERS.get(ins.spec.name)
+            args = ins.args
+            if LABEL in ins.spec.immediates:
+                if args[0] not in self.index:
+                    raise AVMError("branch into the middle of an instruction at {}".format(ins.offset))
+                # Branch targets become instruction indexes; callsub also keeps its return index
+                args = (self.index[args[0]], i + 1)
+            self.ops.append((handler, args, ins.spec.cost, ins.spec.name))
+
+
+class _Group:
+    """State shared by all programs evaluated for one outer group"""
+
+    def __init__(self, ledger: Ledger, txns: List[Dict[str, Any]]) -> None:
+        self.ledger = ledger
+        self.txns = txns
+        self.results: List[TxnResult] = []
+        self.budget = APP_CALL_BUDGET * sum(1 for t in txns if t.get("type") == "appl")
+        self.used = 0
+        self.fees = sum(t.get("fee", 0) for t in txns)
+        self.txn_count = len(txns)
+        self.fee_credit = self.fees - ledger.min_fee * len(txns)
+        self.created_assets: set = set()
+        self.created_apps: set = set()
+        self.touched: set = set()
+
+
+class _Frame:
+    """One program execution"""
+
+    __slots__ = ("g", "txn", "gi", "group", "results", "app", "caller", "depth", "stack",
+                 "scratch", "intc", "bytec", "callstack", "pending", "last_inner", "result",
+                 "inner_count")
+
+    def __init__(self, g: _Group, txn, gi, group, results, app, caller, depth, result) -> None:
+        self.g = g
+        self.txn = txn
+        self.gi = gi
+        self.group = group
+        self.results = results
+        self.app: AppState = app
+        self.caller = caller
+        self.depth = depth
+        self.result: TxnResult = result
+        self.stack: List[Value] = []
+        self.scratch: List[Value] = [0] * 256
+        self.intc: Tuple[int, ...] = ()
+        self.bytec: Tuple[bytes, ...] = ()
+        self.callstack: List[int] = []
+        self.pending: Optional[List[Dict[str, Any]]] = None
+        self.last_inner: List[TxnResult] = []
+        self.inner_count = 0
+
+
+class AVM:
+    """Evaluate transaction groups against an in-memory `Ledger`
+
+    App calls run the real bytecode through a TEAL v6 interpreter with pooled
+    opcode budget, inner transactions and global state; payments, asset
+    transfers and asset configs are applied directly. A failed group leaves
+    the ledger untouched.
+    """
+
+    def __init__(self, ledger: Optional[Ledger] = None) -> None:
+        self.ledger = ledger if ledger is not None else Ledger()
+        self._programs: Dict[bytes, _Program] = {}
+
+    def program(self, program: bytes) -> _Program:
+        prog = self._programs.get(program)
+        if prog is None:
+            prog = self._programs[program] = _Program(program)
+        return prog
+
+    def evaluate(self, group: List[Any], commit: bool = True) -> GroupResult:
+        txns = [normalize_txn(t) for t in group]
+        work = self.ledger.copy()
+        g = _Group(work, txns)
+        try:
+            for gi, txn in enumerate(txns):
+                g.results.append(TxnResult(txn))
+                self._apply(g, txn, gi, txns, g.results, 0, 0, g.results[gi])
+            if g.fees < work.min_fee * g.txn_count:
+                raise AVMError("fee too small: {} < {}".format(g.fees, work.min_fee * g.txn_count))
+            for addr in g.touched:
+                acct = work.accounts.get(addr)
+                if acct is None or (acct.algos == 0 and not acct.assets and not acct.created_apps):
+                    continue
+                if acct.algos < work.min_balance(addr):
+                    raise AVMError("account {} below min balance".format(encoding.encode_address(addr)))
+        except (AVMError, AssemblyError) as e:
+            return GroupResult(g.results, False, str(e), g.budget)
+
+        if commit:
+            self.ledger.restore(work)
+        return GroupResult(g.results, True, None, g.budget)
+
+    # Transaction effects
+
+    def _apply(self, g: _Group, txn, gi, group, results, caller, depth, result: TxnResult):
+        led = g.ledger
+        snd = txn.get("snd", ZERO_ADDRESS)
+        sender = led.account(snd)
+        fee = txn.get("fee", 0)
+        if sender.algos < fee:
+            raise AVMError("overspend: fee")
+        sender.algos -= fee
+        g.touched.add(snd)
+
+        kind = txn.get("type")
+        if kind == "pay":
+            self._pay(g, snd, txn.get("rcv", ZERO_ADDRESS), txn.get("amt", 0))
+            close = txn.get("close")
+            if close:
+                self._pay(g, snd, close, sender.algos)
+        elif kind == "axfer":
+            self._axfer(g, txn, snd)
+        elif kind == "acfg":
+            self._acfg(g, txn, snd, result)
+        elif kind == "appl":
+            self._appl(g, txn, gi, group, results, caller, depth, result)
+        else:
+            raise AVMError("unsupported txn type {}".format(kind))
+
+    def _pay(self, g: _Group, snd: bytes, rcv: bytes, amt: int):
+        led = g.ledger
+        sender = led.account(snd)
+        if sender.algos < amt:
+            raise AVMError("overspend: {} < {}".format(sender.algos, amt))
+        sender.algos -= amt
+        led.account(rcv).algos += amt
+        g.touched.add(rcv)
+
+    def _axfer(self, g: _Group, txn, snd: bytes):
+        led = g.ledger
+        aid = txn.get("xaid", 0)
+        if aid not in led.assets:
+            raise AVMError("asset {} does not exist".format(aid))
+        amt = txn.get("aamt", 0)
+        rcv = txn.get("arcv", ZERO_ADDRESS)
+        src = txn.get("asnd") or snd
+        if txn.get("asnd") and led.assets[aid].clawback != snd:
+            raise AVMError("only clawback may set AssetSender")
+
+        if src == rcv and amt == 0 and not txn.get("aclose"):
+            # Opt in
+            led.account(rcv).assets.setdefault(aid, 0)
+            g.touched.add(rcv)
+            return
+
+        source = led.account(src)
+        if aid not in source.assets:
+            raise AVMError("asset {} missing from sender".format(aid))
+        receiver = led.accounts.get(rcv)
+        if receiver is None or aid not in receiver.assets:
+            raise AVMError("asset {} missing from receiver".format(aid))
+        if source.assets[aid] < amt:
+            raise AVMError("underflow on asset {}: {} < {}".format(aid, source.assets[aid], amt))
+        source.assets[aid] -= amt
+        receiver.assets[aid] += amt
+
+        close = txn.get("aclose")
+        if close:
+            closer = led.accounts.get(close)
+            if closer is None or aid not in closer.assets:
+                raise AVMError("asset {} missing from close-to".format(aid))
+            closer.assets[aid] += source.assets.pop(aid)
+            g.touched.add(close)
+
+    def _acfg(self, g: _Group, txn, snd: bytes, result: TxnResult):
+        led = g.ledger
+        caid = txn.get("caid", 0)
+        apar = txn.get("apar", {})
+        if caid == 0:
+            aid = led.allocate_id()
+            led.assets[aid] = AssetState(
+                aid, snd, apar.get("t", 0), apar.get("dc", 0), bool(apar.get("df", False)),
+                apar.get("un", b""), apar.get("an", b""), apar.get("au", b""), apar.get("am", b""),
+                apar.get("m", ZERO_ADDRESS), apar.get("r", ZERO_ADDRESS),
+                apar.get("f", ZERO_ADDRESS), apar.get("c", ZERO_ADDRESS),
+            )
+            creator = led.account(snd)
+            creator.created_assets.add(aid)
+            creator.assets[aid] = apar.get("t", 0)
+            result.created_asset_id = aid
+            g.created_assets.add(aid)
+            return
+
+        asset = led.assets.get(caid)
+        if asset is None:
+            raise AVMError("asset {} does not exist".format(caid))
+        if asset.manager != snd:
+            raise AVMError("only the manager may reconfigure asset {}".format(caid))
+        if not apar:
+            creator = led.account(asset.creator)
+            if creator.assets.get(caid) != asset.total:
+                raise AVMError("cannot destroy asset {} while units are outstanding".format(caid))
+            del creator.assets[caid]
+            creator.created_assets.discard(caid)
+            del led.assets[caid]
+            return
+        led.assets[caid] = AssetState(
+            caid, asset.creator, asset.total, asset.decimals, asset.default_frozen,
+            asset.unit_name, asset.name, asset.url, asset.metadata_hash,
+            apar.get("m", ZERO_ADDRESS), apar.get("r", ZERO_ADDRESS),
+            apar.get("f", ZERO_ADDRESS), apar.get("c", ZERO_ADDRESS),
+        )
+
+    def _appl(self, g: _Group, txn, gi, group, results, caller, depth, result: TxnResult):
+        led = g.ledger
+        snd = txn.get("snd", ZERO_ADDRESS)
+        app_id = txn.get("apid", 0)
+        oc = txn.get("apan", 0)
+
+        if app_id == 0:
+            app_id = led.allocate_id()
+            gs, ls = txn.get("apgs", {}), txn.get("apls", {})
+            led.apps[app_id] = AppState(
+                app_id, snd, txn.get("apap", b""), txn.get("apsu", b""),
+                (gs.get("nui", 0), gs.get("nbs", 0)), (ls.get("nui", 0), ls.get("nbs", 0)),
+                txn.get("apep", 0),
+            )
+            led.account(snd).created_apps.add(app_id)
+            result.created_app_id = app_id
+            g.created_apps.add(app_id)
+            creating = True
+        else:
+            creating = False
+            if app_id not in led.apps:
+                raise AVMError("app {} does not exist".format(app_id))
+
+        app = led.apps[app_id]
+        before = dict(app.global_state)
+        program = app.clear if oc == ON_COMPLETION["ClearState"] else app.approval
+        approved = self._run(g, program, txn, gi, group, results, app, caller, depth, result, creating)
+
+        result.global_delta = {
+            k: app.global_state.get(k)
+            for k in set(before) | set(app.global_state)
+            if before.get(k) != app.global_state.get(k)
+        }
+
+        if oc == ON_COMPLETION["ClearState"]:
+            led.account(snd).opted_apps.discard(app_id)
+            return
+        if not approved:
+            raise AVMError("transaction rejected by app {}".format(app_id))
+
+        if oc == ON_COMPLETION["OptIn"]:
+            led.account(snd).opted_apps.add(app_id)
+        elif oc == ON_COMPLETION["CloseOut"]:
+            led.account(snd).opted_apps.discard(app_id)
+        elif oc == ON_COMPLETION["UpdateApplication"]:
+            app.approval = txn.get("apap", b"")
+            app.clear = txn.get("apsu", b"")
+        elif oc == ON_COMPLETION["DeleteApplication"]:
+            led.account(app.creator).created_apps.discard(app_id)
+            del led.apps[app_id]
+
+    def _run(self, g: _Group, program: bytes, txn, gi, group, results, app, caller, depth,
+             result: TxnResult, creating: bool = False) -> bool:
+        if depth > MAX_CALL_DEPTH:
+            raise AVMError("inner app call depth exceeded")
+        prog = self.program(program)
+        f = _Frame(g, txn, gi, group, results, app, caller, depth, result)
+        f.result.scratch = f.scratch
+        ops = prog.ops
+        n = len(ops)
+        pc = 0
+        start = g.used
+        try:
+            while pc < n:
+                handler, args, cost, name = ops[pc]
+                g.used += cost
+                if g.used > g.budget:
+                    raise AVMError("dynamic cost budget exceeded, executing {}".format(name))
+                if handler is None:
+                    raise AVMError("unsupported opcode {}".format(name))
+                nxt = handler(self, f, args)
+                if nxt is None:
+                    pc += 1
+                elif nxt < 0:
+                    break
+                else:
+                    pc = nxt
+                if len(f.stack) > MAX_STACK_DEPTH:
+                    raise AVMError("stack overflow")
+        except AVMError as e:
+            raise AVMError("app {} pc {} ({}): {}".format(
+                app.app_id, pc, ops[pc][3] if pc < n else "end", e))
+        finally:
+            result.cost += g.used - start
+
+        if len(f.stack) != 1:
+            raise AVMError("app {}: stack must hold exactly one value at the end".format(app.app_id))
+        top = f.stack[0]
+        if not isinstance(top, int):
+            raise AVMError("app {}: program ended with bytes on the stack".format(app.app_id))
+        return top != 0
+
+
+# Helpers for handlers
+
+def _u(v: Value) -> int:
+    if type(v) is not int:
+        raise AVMError("expected uint64, got bytes")
+    return v
+
+
+def _b(v: Value) -> bytes:
+    if type(v) is not bytes:
+        raise AVMError("expected bytes, got uint64")
+    return v
+
+
+def _pop2(f: _Frame) -> Tuple[Value, Value]:
+    st = f.stack
+    if len(st) < 2:
+        raise AVMError("stack underflow")
+    b = st.pop()
+    a = st.pop()
+    return a, b
+
+
+def _pop(f: _Frame) -> Value:
+    if not f.stack:
+        raise AVMError("stack underflow")
+    return f.stack.pop()
+
+
+def _check_len(v: bytes) -> bytes:
+    if len(v) > MAX_BYTES_LEN:
+        raise AVMError("byte string exceeds {} bytes".format(MAX_BYTES_LEN))
+    return v
+
+
+def _accounts(f: _Frame, txn=None) -> List[bytes]:
+    txn = txn if txn is not None else f.txn
+    return [txn.get("snd", ZERO_ADDRESS)] + list(txn.get("apat", []))
+
+
+def _account_ref(f: _Frame, v: Value) -> bytes:
+    accts = _accounts(f)
+    if isinstance(v, int):
+        if v >= len(accts):
+            raise AVMError("invalid Accounts index {}".format(v))
+        return accts[v]
+    if len(v) != 32:
+        raise AVMError("invalid address")
+    if v in accts or v == app_address(f.app.app_id):
+        return v
+    for app_id in f.txn.get("apfa", []):
+        if v == app_address(app_id):
+            return v
+    raise AVMError("unavailable account {}".format(encoding.encode_address(v)))
+
+
+def _asset_ref(f: _Frame, v: Value) -> int:
+    v = _u(v)
+    foreign = f.txn.get("apas", [])
+    if v in foreign or v in f.g.created_assets:
+        return v
+    if v < len(foreign):
+        return foreign[v]
+    raise AVMError("unavailable asset {}".format(v))
+
+
+def _app_ref(f: _Frame, v: Value) -> int:
+    v = _u(v)
+    foreign = f.txn.get("apfa", [])
+    if v == 0:
+        return f.app.app_id
+    if v == f.app.app_id or v in foreign or v in f.g.created_apps:
+        return v
+    if v <= len(foreign):
+        return foreign[v - 1]
+    raise AVMError("unavailable app {}".format(v))
+
+
+def _txn_field(f: _Frame, txn, res: Optional[TxnResult], gi: int, field: int, index: Optional[int]) -> Value:
+    name = TXN_FIELDS[field]
+    if name in ARRAY_TXN_FIELDS:
+        if index is None:
+            raise AVMError("{} needs an array index".format(name))
+        if name == "Accounts":
+            arr = _accounts(f, txn)
+        elif name == "Applications":
+            arr = [txn.get("apid", 0)] + list(txn.get("apfa", []))
+        elif name == "Logs":
+            arr = res.logs if res is not None else []
+        else:
+            arr = txn.get(TXN_FIELD_KEYS[name][0], [])
+        if index >= len(arr):
+            raise AVMError("invalid {} index {}".format(name, index))
+        return arr[index]
+
+    spec = TXN_FIELD_KEYS.get(name)
+    if spec is not None:
+        key, sub, kind = spec
+        v = txn.get(key)
+        if sub is not None:
+            v = (v or {}).get(sub)
+        if v is None:
+            return 0 if kind == "int" else (ZERO_ADDRESS if kind == "addr" else b"")
+        if kind == "int":
+            return int(v)
+        return v
+
+    if name == "Type":
+        return txn.get("type", "").encode()
+    if name == "TypeEnum":
+        return TYPE_ENUM.get(txn.get("type", ""), 0)
+    if name == "GroupIndex":
+        return gi
+    if name == "TxID":
+        return txid(txn)
+    if name == "NumAppArgs":
+        return len(txn.get("apaa", []))
+    if name == "NumAccounts":
+        return len(txn.get("apat", []))
+    if name == "NumAssets":
+        return len(txn.get("apas", []))
+    if name == "NumApplications":
+        return len(txn.get("apfa", []))
+    if name == "NumLogs":
+        return len(res.logs) if res is not None else 0
+    if name == "LastLog":
+        return res.logs[-1] if res is not None and res.logs else b""
+    if name == "CreatedAssetID":
+        return res.created_asset_id if res is not None else 0
+    if name == "CreatedApplicationID":
+        return res.created_app_id if res is not None else 0
+    if name == "FirstValidTime":
+        raise AVMError("FirstValidTime is not available")
+    return 0
+
+
+# Handlers. Each returns None to fall through, a new pc, or -1 to stop.
+
+_HANDLERS: Dict[str, Callable[[AVM, _Frame, Tuple[Any, ...]], Optional[int]]] = {}
+
+
+def _op(*names):
+    def register(fn):
+        for n in names:
+            _HANDLERS[n] = fn
+        return fn
+    return register
+
+
+def _binop(name, fn):
+    def handler(vm, f, args):
+        a, b = _pop2(f)
+        f.stack.append(fn(_u(a), _u(b)))
+    _HANDLERS[name] = handler
+
+
+def _add(a, b):
+    r = a + b
+    if r > UINT64_MAX:
+        raise AVMError("+ overflowed")
+    return r
+
+
+def _sub(a, b):
+    if a < b:
+        raise AVMError("- would result negative")
+    return a - b
+
+
+def _div(a, b):
+    if b == 0:
+        raise AVMError("/ 0")
+    return a // b
+
+
+def _mul(a, b):
+    r = a * b
+    if r > UINT64_MAX:
+        raise AVMError("* overflowed")
+    return r
+
+
+def _mod(a, b):
+    if b == 0:
+        raise AVMError("% 0")
+    return a % b
+
+
+def _exp(a, b):
+    if a == 0 and b == 0:
+        raise AVMError("0^0 is undefined")
+    if a > 1 and b > 64:
+        raise AVMError("exp overflowed")
+    r = a ** b
+    if r > UINT64_MAX:
+        raise AVMError("exp overflowed")
+    return r
+
+
+def _shl(a, b):
+    if b > 63:
+        raise AVMError("shl arg too big")
+    return (a << b) & UINT64_MAX
+
+
+def _shr(a, b):
+    if b > 63:
+        raise AVMError("shr arg too big")
+    return a >> b
+
+
+_binop("+", _add)
+_binop("-", _sub)
+_binop("/", _div)
+_binop("*", _mul)
+_binop("%", _mod)
+_binop("exp", _exp)
+_binop("shl", _shl)
+_binop("shr", _shr)
+_binop("<", lambda a, b: int(a < b))
+_binop(">", lambda a, b: int(a > b))
+_binop("<=", lambda a, b: int(a <= b))
+_binop(">=", lambda a, b: int(a >= b))
+_binop("&&", lambda a, b: int(a != 0 and b != 0))
+_binop("||", lambda a, b: int(a != 0 or b != 0))
+_binop("|", lambda a, b: a | b)
+_binop("&", lambda a, b: a & b)
+_binop("^", lambda a, b: a ^ b)
+
+
+@_op("==")
+def _op_eq(vm, f, args):
+    a, b = _pop2(f)
+    if type(a) is not type(b):
+        raise AVMError("cannot compare uint64 to bytes")
+    f.stack.append(int(a == b))
+
+
+@_op("!=")
+def _op_ne(vm, f, args):
+    a, b = _pop2(f)
+    if type(a) is not type(b):
+        raise AVMError("cannot compare uint64 to bytes")
+    f.stack.append(int(a != b))
+
+
+@_op("!")
+def _op_not(vm, f, args):
+    f.stack.append(int(_u(_pop(f)) == 0))
+
+
+@_op("~")
+def _op_bitnot(vm, f, args):
+    f.stack.append(_u(_pop(f)) ^ UINT64_MAX)
+
+
+@_op("len")
+def _op_len(vm, f, args):
+    f.stack.append(len(_b(_pop(f))))
+
+
+@_op("itob")
+def _op_itob(vm, f, args):
+    f.stack.append(_u(_pop(f)).to_bytes(8, "big"))
+
+
+@_op("btoi")
+def _op_btoi(vm, f, args):
+    v = _b(_pop(f))
+    if len(v) > 8:
+        raise AVMError("btoi arg too long")
+    f.stack.append(int.from_bytes(v, "big"))
+
+
+@_op("mulw")
+def _op_mulw(vm, f, args):
+    a, b = _pop2(f)
+    r = _u(a) * _u(b)
+    f.stack.extend((r >> 64, r & UINT64_MAX))
+
+
+@_op("addw")
+def _op_addw(vm, f, args):
+    a, b = _pop2(f)
+    r = _u(a) + _u(b)
+    f.stack.extend((r >> 64, r & UINT64_MAX))
+
+
+@_op("divmodw")
+def _op_divmodw(vm, f, args):
+    bh, bl = _pop2(f)
+    ah, al = _pop2(f)
+    a = (_u(ah) << 64) | _u(al)
+    b = (_u(bh) << 64) | _u(bl)
+    if b == 0:
+        raise AVMError("/ 0")
+    q, r = divmod(a, b)
+    f.stack.extend((q >> 64, q & UINT64_MAX, r >> 64, r & UINT64_MAX))
+
+
+@_op("divw")
+def _op_divw(vm, f, args):
+    c = _u(_pop(f))
+    ah, al = _pop2(f)
+    if c == 0:
+        raise AVMError("/ 0")
+    q = ((_u(ah) << 64) | _u(al)) // c
+    if q > UINT64_MAX:
+        raise AVMError("divw overflow")
+    f.stack.append(q)
+
+
+@_op("expw")
+def _op_expw(vm, f, args):
+    a, b = _pop2(f)
+    a, b = _u(a), _u(b)
+    if a == 0 and b == 0:
+        raise AVMError("0^0 is undefined")
+    r = a ** b if a <= 1 or b <= 128 else 2**128
+    if r >= 2**128:
+        raise AVMError("expw overflowed")
+    f.stack.extend((r >> 64, r & UINT64_MAX))
+
+
+@_op("sqrt")
+def _op_sqrt(vm, f, args):
+    f.stack.append(isqrt(_u(_pop(f))))
+
+
+@_op("bitlen")
+def _op_bitlen(vm, f, args):
+    v = _pop(f)
+    f.stack.append(v.bit_length() if isinstance(v, int) else int.from_bytes(v, "big").bit_length())
+
+
+def _hash(algo):
+    def handler(vm, f, args):
+        data = _b(_pop(f))
+        if algo == "keccak256":
+            from Cryptodome.Hash import keccak
+            f.stack.append(keccak.new(data=data, digest_bits=256).digest())
+            return
+        h = hashlib.new(algo)
+        h.update(data)
+        f.stack.append(h.digest())
+    return handler
+
+
+_HANDLERS["sha256"] = _hash("sha256")
+_HANDLERS["keccak256"] = _hash("keccak256")
+_HANDLERS["sha512_256"] = _hash("sha512_256")
+
+
+@_op("intcblock")
+def _op_intcblock(vm, f, args):
+    f.intc = args[0]
+
+
+@_op("bytecblock")
+def _op_bytecblock(vm, f, args):
+    f.bytec = args[0]
+
+
+def _intc(i):
+    def handler(vm, f, args):
+        idx = args[0] if i is None else i
+        if idx >= len(f.intc):
+            raise AVMError("intc {} beyond constant block".format(idx))
+        f.stack.append(f.intc[idx])
+    return handler
+
+
+def _bytec(i):
+    def handler(vm, f, args):
+        idx = args[0] if i is None else i
+        if idx >= len(f.bytec):
+            raise AVMError("bytec {} beyond constant block".format(idx))
+        f.stack.append(f.bytec[idx])
+    return handler
+
+
+_HANDLERS["intc"] = _intc(None)
+_HANDLERS["bytec"] = _bytec(None)
+for _i in range(4):
+    _HANDLERS["intc_{}".format(_i)] = _intc(_i)
+    _HANDLERS["bytec_{}".format(_i)] = _bytec(_i)
+
+
+@_op("pushint", "pushbytes")
+def _op_push(vm, f, args):
+    f.stack.append(args[0])
+
+
+@_op("err")
+def _op_err(vm, f, args):
+    raise AVMError("err opcode executed")
+
+
+@_op("arg", "arg_0", "arg_1", "arg_2", "arg_3", "args")
+def _op_arg(vm, f, args):
+    raise AVMError("arg is only available to logic signatures")
+
+
+@_op("txn")
+def _op_txn(vm, f, args):
+    f.stack.append(_txn_field(f, f.txn, f.result, f.gi, args[0], None))
+
+
+@_op("txna")
+def _op_txna(vm, f, args):
+    f.stack.append(_txn_field(f, f.txn, f.result, f.gi, args[0], args[1]))
+
+
+@_op("txnas")
+def _op_txnas(vm, f, args):
+    f.stack.append(_txn_field(f, f.txn, f.result, f.gi, args[0], _u(_pop(f))))
+
+
+def _gtxn(f: _Frame, gi: int):
+    if gi >= len(f.group):
+        raise AVMError("gtxn index {} beyond group of {}".format(gi, len(f.group)))
+    res = f.results[gi] if gi < len(f.results) else None
+    return f.group[gi], res
+
+
+@_op("gtxn")
+def _op_gtxn(vm, f, args):
+    txn, res = _gtxn(f, args[0])
+    f.stack.append(_txn_field(f, txn, res, args[0], args[1], None))
+
+
+@_op("gtxna")
+def _op_gtxna(vm, f, args):
+    txn, res = _gtxn(f, args[0])
+    f.stack.append(_txn_field(f, txn, res, args[0], args[1], args[2]))
+
+
+@_op("gtxnas")
+def _op_gtxnas(vm, f, args):
+    idx = _u(_pop(f))
+    txn, res = _gtxn(f, args[0])
+    f.stack.append(_txn_field(f, txn, res, args[0], args[1], idx))
+
+
+@_op("gtxns")
+def _op_gtxns(vm, f, args):
+    gi = _u(_pop(f))
+    txn, res = _gtxn(f, gi)
+    f.stack.append(_txn_field(f, txn, res, gi, args[0], None))
+
+
+@_op("gtxnsa")
+def _op_gtxnsa(vm, f, args):
+    gi = _u(_pop(f))
+    txn, res = _gtxn(f, gi)
+    f.stack.append(_txn_field(f, txn, res, gi, args[0], args[1]))
+
+
+@_op("gtxnsas")
+def _op_gtxnsas(vm, f, args):
+    a, b = _pop2(f)
+    gi, idx = _u(a), _u(b)
+    txn, res = _gtxn(f, gi)
+    f.stack.append(_txn_field(f, txn, res, gi, args[0], idx))
+
+
+@_op("global")
+def _op_global(vm, f, args):
+    name = GLOBAL_FIELDS[args[0]]
+    led = f.g.ledger
+    if name == "MinTxnFee":
+        v = led.min_fee
+    elif name == "MinBalance":
+        v = 100_000
+    elif name == "MaxTxnLife":
+        v = 1000
+    elif name == "ZeroAddress":
+        v = ZERO_ADDRESS
+    elif name == "GroupSize":
+        v = len(f.group)
+    elif name == "LogicSigVersion":
+        v = 6
+    elif name == "Round":
+        v = led.round
+    elif name == "LatestTimestamp":
+        v = led.timestamp
+    elif name == "CurrentApplicationID":
+        v = f.app.app_id
+    elif name == "CreatorAddress":
+        v = f.app.creator
+    elif name == "CurrentApplicationAddress":
+        v = app_address(f.app.app_id)
+    elif name == "GroupID":
+        v = f.txn.get("grp", ZERO_ADDRESS)
+    elif name == "OpcodeBudget":
+        v = f.g.budget - f.g.used
+    elif name == "CallerApplicationID":
+        v = f.caller
+    elif name == "CallerApplicationAddress":
+        v = app_address(f.caller) if f.caller else ZERO_ADDRESS
+    else:
+        raise AVMError("unknown global field {}".format(name))
+    f.stack.append(v)
+
+
+@_op("load")
+def _op_load(vm, f, args):
+    f.stack.append(f.scratch[args[0]])
+
+
+@_op("store")
+def _op_store(vm, f, args):
+    f.scratch[args[0]] = _pop(f)
+
+
+@_op("loads")
+def _op_loads(vm, f, args):
+    i = _u(_pop(f))
+    if i > 255:
+        raise AVMError("invalid scratch slot {}".format(i))
+    f.stack.append(f.scratch[i])
+
+
+@_op("stores")
+def _op_stores(vm, f, args):
+    i, v = _pop2(f)
+    i = _u(i)
+    if i > 255:
+        raise AVMError("invalid scratch slot {}".format(i))
+    f.scratch[i] = v
+
+
+def _gload(f: _Frame, gi: int, slot: int) -> Value:
+    if gi >= f.gi:
+        raise AVMError("gload can only read earlier transactions")
+    res = f.results[gi]
+    if res.scratch is None:
+        raise AVMError("gload of a transaction that is not an app call")
+    if slot > 255:
+        raise AVMError("invalid scratch slot {}".format(slot))
+    return res.scratch[slot]
+
+
+@_op("gload")
+def _op_gload(vm, f, args):
+    f.stack.append(_gload(f, args[0], args[1]))
+
+
+@_op("gloads")
+def _op_gloads(vm, f, args):
+    f.stack.append(_gload(f, _u(_pop(f)), args[0]))
+
+
+@_op("gloadss")
+def _op_gloadss(vm, f, args):
+    gi, slot = _pop2(f)
+    f.stack.append(_gload(f, _u(gi), _u(slot)))
+
+
+def _gaid(f: _Frame, gi: int) -> int:
+    if gi >= f.gi:
+        raise AVMError("gaid can only read earlier transactions")
+    res = f.results[gi]
+    created = res.created_asset_id or res.created_app_id
+    if not created:
+        raise AVMError("transaction {} did not create anything".format(gi))
+    return created
+
+
+@_op("gaid")
+def _op_gaid(vm, f, args):
+    f.stack.append(_gaid(f, args[0]))
+
+
+@_op("gaids")
+def _op_gaids(vm, f, args):
+    f.stack.append(_gaid(f, _u(_pop(f))))
+
+
+@_op("bnz")
+def _op_bnz(vm, f, args):
+    if _u(_pop(f)) != 0:
+        return args[0]
+
+
+@_op("bz")
+def _op_bz(vm, f, args):
+    if _u(_pop(f)) == 0:
+        return args[0]
+
+
+@_op("b")
+def _op_b(vm, f, args):
+    return args[0]
+
+
+@_op("return")
+def _op_return(vm, f, args):
+    v = _pop(f)
+    f.stack[:] = [v]
+    return -1
+
+
+@_op("assert")
+def _op_assert(vm, f, args):
+    if _u(_pop(f)) == 0:
+        raise AVMError("assert failed")
+
+
+@_op("callsub")
+def _op_callsub(vm, f, args):
+    f.callstack.append(args[1])
+    return args[0]
+
+
+@_op("retsub")
+def _op_retsub(vm, f, args):
+    if not f.callstack:
+        raise AVMError("retsub with empty callstack")
+    return f.callstack.pop()
+
+
+@_op("pop")
+def _op_pop(vm, f, args):
+    _pop(f)
+
+
+@_op("dup")
+def _op_dup(vm, f, args):
+    if not f.stack:
+        raise AVMError("stack underflow")
+    f.stack.append(f.stack[-1])
+
+
+@_op("dup2")
+def _op_dup2(vm, f, args):
+    if len(f.stack) < 2:
+        raise AVMError("stack underflow")
+    f.stack.extend(f.stack[-2:])
+
+
+@_op("dig")
+def _op_dig(vm, f, args):
+    n = args[0]
+    if n >= len(f.stack):
+        raise AVMError("dig {} with stack of {}".format(n, len(f.stack)))
+    f.stack.append(f.stack[-1 - n])
+
+
+@_op("swap")
+def _op_swap(vm, f, args):
+    a, b = _pop2(f)
+    f.stack.extend((b, a))
+
+
+@_op("select")
+def _op_select(vm, f, args):
+    c = _u(_pop(f))
+    a, b = _pop2(f)
+    f.stack.append(b if c != 0 else a)
+
+
+@_op("cover")
+def _op_cover(vm, f, args):
+    n = args[0]
+    if n >= len(f.stack):
+        raise AVMError("cover {} with stack of {}".format(n, len(f.stack)))
+    v = f.stack.pop()
+    f.stack.insert(len(f.stack) - n, v)
+
+
+@_op("uncover")
+def _op_uncover(vm, f, args):
+    n = args[0]
+    if n >= len(f.stack):
+        raise AVMError("uncover {} with stack of {}".format(n, len(f.stack)))
+    f.stack.append(f.stack.pop(-1 - n))
+
+
+@_op("concat")
+def _op_concat(vm, f, args):
+    a, b = _pop2(f)
+    f.stack.append(_check_len(_b(a) + _b(b)))
+
+
+def _substring(v: bytes, s: int, e: int) -> bytes:
+    if s > e or e > len(v):
+        raise AVMError("substring range {}:{} beyond {}".format(s, e, len(v)))
+    return v[s:e]
+
+
+@_op("substring")
+def _op_substring(vm, f, args):
+    f.stack.append(_substring(_b(_pop(f)), args[0], args[1]))
+
+
+@_op("substring3")
+def _op_substring3(vm, f, args):
+    s, e = _pop2(f)
+    f.stack.append(_substring(_b(_pop(f)), _u(s), _u(e)))
+
+
+@_op("extract")
+def _op_extract(vm, f, args):
+    v = _b(_pop(f))
+    s, ln = args
+    if ln == 0:
+        ln = len(v) - s
+    f.stack.append(_substring(v, s, s + ln))
+
+
+@_op("extract3")
+def _op_extract3(vm, f, args):
+    s, ln = _pop2(f)
+    v = _b(_pop(f))
+    f.stack.append(_substring(v, _u(s), _u(s) + _u(ln)))
+
+
+def _extract_uint(size):
+    def handler(vm, f, args):
+        v, s = _pop2(f)
+        s = _u(s)
+        f.stack.append(int.from_bytes(_substring(_b(v), s, s + size), "big"))
+    return handler
+
+
+_HANDLERS["extract_uint16"] = _extract_uint(2)
+_HANDLERS["extract_uint32"] = _extract_uint(4)
+_HANDLERS["extract_uint64"] = _extract_uint(8)
+
+
+@_op("getbit")
+def _op_getbit(vm, f, args):
+    v, i = _pop2(f)
+    i = _u(i)
+    if isinstance(v, int):
+        if i > 63:
+            raise AVMError("getbit index beyond uint64")
+        f.stack.append((v >> i) & 1)
+    else:
+        if i >= len(v) * 8:
+            raise AVMError("getbit index beyond bytes")
+        f.stack.append((v[i // 8] >> (7 - i % 8)) & 1)
+
+
+@_op("setbit")
+def _op_setbit(vm, f, args):
+    c = _u(_pop(f))
+    v, i = _pop2(f)
+    i = _u(i)
+    if c > 1:
+        raise AVMError("setbit value must be 0 or 1")
+    if isinstance(v, int):
+        if i > 63:
+            raise AVMError("setbit index beyond uint64")
+        f.stack.append((v | (1 << i)) if c else (v & ~(1 << i)))
+    else:
+        if i >= len(v) * 8:
+            raise AVMError("setbit index beyond bytes")
+        ba = bytearray(v)
+        mask = 1 << (7 - i % 8)
+        ba[i // 8] = (ba[i // 8] | mask) if c else (ba[i // 8] & ~mask)
+        f.stack.append(bytes(ba))
+
+
+@_op("getbyte")
+def _op_getbyte(vm, f, args):
+    v, i = _pop2(f)
+    v, i = _b(v), _u(i)
+    if i >= len(v):
+        raise AVMError("getbyte index beyond bytes")
+    f.stack.append(v[i])
+
+
+@_op("setbyte")
+def _op_setbyte(vm, f, args):
+    c = _u(_pop(f))
+    v, i = _pop2(f)
+    v, i = _b(v), _u(i)
+    if i >= len(v) or c > 255:
+        raise AVMError("setbyte out of range")
+    ba = bytearray(v)
+    ba[i] = c
+    f.stack.append(bytes(ba))
+
+
+def _bmath(name, fn):
+    def handler(vm, f, args):
+        a, b = _pop2(f)
+        a, b = _b(a), _b(b)
+        if len(a) > 64 or len(b) > 64:
+            raise AVMError("{} arguments limited to 64 bytes".format(name))
+        f.stack.append(fn(int.from_bytes(a, "big"), int.from_bytes(b, "big"), a, b))
+    _HANDLERS[name] = handler
+
+
+def _to_bytes(n: int) -> bytes:
+    return n.to_bytes((n.bit_length() + 7) // 8, "big")
+
+
+def _bsub(a, b, *_):
+    if a < b:
+        raise AVMError("b- would result negative")
+    return _to_bytes(a - b)
+
+
+def _bdiv(a, b, *_):
+    if b == 0:
+        raise AVMError("b/ 0")
+    return _to_bytes(a // b)
+
+
+def _bmod(a, b, *_):
+    if b == 0:
+        raise AVMError("b% 0")
+    return _to_bytes(a % b)
+
+
+def _bbitwise(op):
+    def fn(a, b, ab, bb):
+        size = max(len(ab), len(bb))
+        return op(a, b).to_bytes(size, "big")
+    return fn
+
+
+_bmath("b+", lambda a, b, *_: _to_bytes(a + b))
+_bmath("b-", _bsub)
+_bmath("b/", _bdiv)
+_bmath("b*", lambda a, b, *_: _to_bytes(a * b))
+_bmath("b%", _bmod)
+_bmath("b<", lambda a, b, *_: int(a < b))
+_bmath("b>", lambda a, b, *_: int(a > b))
+_bmath("b<=", lambda a, b, *_: int(a <= b))
+_bmath("b>=", lambda a, b, *_: int(a >= b))
+_bmath("b==", lambda a, b, *_: int(a == b))
+_bmath("b!=", lambda a, b, *_: int(a != b))
+_bmath("b|", _bbitwise(lambda a, b: a | b))
+_bmath("b&", _bbitwise(lambda a, b: a & b))
+_bmath("b^", _bbitwise(lambda a, b: a ^ b))
+
+
+@_op("b~")
+def _op_bnot(vm, f, args):
+    v = _b(_pop(f))
+    f.stack.append(bytes(x ^ 0xff for x in v))
+
+
+@_op("bzero")
+def _op_bzero(vm, f, args):
+    n = _u(_pop(f))
+    if n > MAX_BYTES_LEN:
+        raise AVMError("bzero beyond {} bytes".format(MAX_BYTES_LEN))
+    f.stack.append(bytes(n))
+
+
+@_op("bsqrt")
+def _op_bsqrt(vm, f, args):
+    v = _b(_pop(f))
+    if len(v) > 64:
+        raise AVMError("bsqrt argument limited to 64 bytes")
+    f.stack.append(_to_bytes(isqrt(int.from_bytes(v, "big"))))
+
+
+@_op("log")
+def _op_log(vm, f, args):
+    v = _b(_pop(f))
+    logs = f.result.logs
+    if len(logs) >= MAX_LOGS or sum(map(len, logs)) + len(v) > MAX_LOG_SIZE:
+        raise AVMError("too many logs")
+    logs.append(v)
+
+
+# State access
+
+@_op("balance")
+def _op_balance(vm, f, args):
+    addr = _account_ref(f, _pop(f))
+    f.stack.append(f.g.ledger.balance(addr))
+
+
+@_op("min_balance")
+def _op_min_balance(vm, f, args):
+    addr = _account_ref(f, _pop(f))
+    f.stack.append(f.g.ledger.min_balance(addr))
+
+
+@_op("app_opted_in")
+def _op_app_opted_in(vm, f, args):
+    acct, app = _pop2(f)
+    addr = _account_ref(f, acct)
+    app_id = _app_ref(f, app)
+    f.stack.append(int(app_id in f.g.ledger.account(addr).opted_apps))
+
+
+@_op("app_local_get", "app_local_get_ex", "app_local_put", "app_local_del")
+def _op_local(vm, f, args):
+    raise AVMError("local state is not supported")
+
+
+@_op("app_global_get")
+def _op_app_global_get(vm, f, args):
+    key = _b(_pop(f))
+    f.stack.append(f.app.global_state.get(key, 0))
+
+
+@_op("app_global_get_ex")
+def _op_app_global_get_ex(vm, f, args):
+    app, key = _pop2(f)
+    app_id = _app_ref(f, app)
+    state = f.g.ledger.apps[app_id].global_state if app_id in f.g.ledger.apps else {}
+    key = _b(key)
+    if key in state:
+        f.stack.extend((state[key], 1))
+    else:
+        f.stack.extend((0, 0))
+
+
+@_op("app_global_put")
+def _op_app_global_put(vm, f, args):
+    key, val = _pop2(f)
+    key = _b(key)
+    if len(key) > MAX_KEY_LEN:
+        raise AVMError("key too long")
+    if isinstance(val, bytes) and len(key) + len(val) > MAX_KEY_VALUE_LEN:
+        raise AVMError("key/value too long")
+    state = f.app.global_state
+    state[key] = val
+    nui, nbs = f.app.global_schema
+    ints = sum(1 for v in state.values() if isinstance(v, int))
+    if ints > nui or len(state) - ints > nbs:
+        raise AVMError("store exceeds global schema ({} uints, {} byte slices)".format(nui, nbs))
+
+
+@_op("app_global_del")
+def _op_app_global_del(vm, f, args):
+    f.app.global_state.pop(_b(_pop(f)), None)
+
+
+@_op("asset_holding_get")
+def _op_asset_holding_get(vm, f, args):
+    acct, asset = _pop2(f)
+    addr = _account_ref(f, acct)
+    aid = _asset_ref(f, asset)
+    holding = f.g.ledger.accounts.get(addr)
+    if holding is None or aid not in holding.assets:
+        f.stack.extend((0, 0))
+        return
+    if ASSET_HOLDING_FIELDS[args[0]] == "AssetBalance":
+        f.stack.extend((holding.assets[aid], 1))
+    else:
+        f.stack.extend((int(aid in holding.frozen), 1))
+
+
+@_op("asset_params_get")
+def _op_asset_params_get(vm, f, args):
+    aid = _asset_ref(f, _pop(f))
+    asset = f.g.ledger.assets.get(aid)
+    if asset is None:
+        f.stack.extend((0, 0))
+        return
+    name = ASSET_PARAMS_FIELDS[args[0]]
+    v = {
+        "AssetTotal": asset.total,
+        "AssetDecimals": asset.decimals,
+        "AssetDefaultFrozen": int(asset.default_frozen),
+        "AssetUnitName": asset.unit_name,
+        "AssetName": asset.name,
+        "AssetURL": asset.url,
+        "AssetMetadataHash": asset.metadata_hash,
+        "AssetManager": asset.manager,
+        "AssetReserve": asset.reserve,
+        "AssetFreeze": asset.freeze,
+        "AssetClawback": asset.clawback,
+        "AssetCreator": asset.creator,
+    }[name]
+    f.stack.extend((v, 1))
+
+
+@_op("app_params_get")
+def _op_app_params_get(vm, f, args):
+    app_id = _app_ref(f, _pop(f))
+    app = f.g.ledger.apps.get(app_id)
+    if app is None:
+        f.stack.extend((0, 0))
+        return
+    name = APP_PARAMS_FIELDS[args[0]]
+    v = {
+        "AppApprovalProgram": app.approval,
+        "AppClearStateProgram": app.clear,
+        "AppGlobalNumUint": app.global_schema[0],
+        "AppGlobalNumByteSlice": app.global_schema[1],
+        "AppLocalNumUint": app.local_schema[0],
+        "AppLocalNumByteSlice": app.local_schema[1],
+        "AppExtraProgramPages": app.extra_pages,
+        "AppCreator": app.creator,
+        "AppAddress": app_address(app_id),
+    }[name]
+    f.stack.extend((v, 1))
+
+
+@_op("acct_params_get")
+def _op_acct_params_get(vm, f, args):
+    addr = _account_ref(f, _pop(f))
+    led = f.g.ledger
+    acct = led.accounts.get(addr)
+    if acct is None or acct.algos == 0:
+        f.stack.extend((0, 0) if ACCT_PARAMS_FIELDS[args[0]] != "AcctAuthAddr" else (ZERO_ADDRESS, 0))
+        return
+    name = ACCT_PARAMS_FIELDS[args[0]]
+    v = {
+        "AcctBalance": acct.algos,
+        "AcctMinBalance": led.min_balance(addr),
+        "AcctAuthAddr": ZERO_ADDRESS,
+    }[name]
+    f.stack.extend((v, 1))
+
+
+# Inner transactions
+
+def _new_inner(f: _Frame) -> Dict[str, Any]:
+    led = f.g.ledger
+    return {
+        "snd": app_address(f.app.app_id),
+        "fv": led.round,
+        "lv": led.round + 1000,
+    }
+
+
+@_op("itxn_begin")
+def _op_itxn_begin(vm, f, args):
+    if f.pending is not None:
+        raise AVMError("itxn_begin without itxn_submit")
+    f.pending = [_new_inner(f)]
+
+
+@_op("itxn_next")
+def _op_itxn_next(vm, f, args):
+    if f.pending is None:
+        raise AVMError("itxn_next without itxn_begin")
+    f.pending.append(_new_inner(f))
+
+
+@_op("itxn_field")
+def _op_itxn_field(vm, f, args):
+    if f.pending is None:
+        raise AVMError("itxn_field without itxn_begin")
+    txn = f.pending[-1]
+    name = TXN_FIELDS[args[0]]
+    v = _pop(f)
+
+    if name == "TypeEnum":
+        types = {val: key for key, val in TYPE_ENUM.items()}
+        if _u(v) not in types:
+            raise AVMError("unknown type enum {}".format(v))
+        txn["type"] = types[v]
+        return
+    if name == "Type":
+        txn["type"] = _b(v).decode()
+        return
+
+    spec = TXN_FIELD_KEYS.get(name)
+    if spec is None:
+        raise AVMError("{} cannot be set on an inner transaction".format(name))
+    key, sub, kind = spec
+    if kind == "int":
+        v = _u(v)
+        if name in ("XferAsset", "ConfigAsset", "FreezeAsset") or name == "Assets":
+            v = _asset_ref(f, v) if v not in f.g.created_assets else v
+        elif name in ("ApplicationID", "Applications") and v not in f.g.created_apps:
+            v = _app_ref(f, v)
+    else:
+        v = _b(v)
+        if kind == "addr":
+            if len(v) != 32:
+                raise AVMError("{} must be a 32 byte address".format(name))
+            if name in ("Receiver", "AssetReceiver", "CloseRemainderTo", "AssetCloseTo",
+                        "AssetSender", "Accounts", "FreezeAssetAccount"):
+                _account_ref(f, v)
+
+    if name in ARRAY_TXN_FIELDS:
+        txn.setdefault(key, []).append(v)
+    elif sub is not None:
+        txn.setdefault(key, {})[sub] = v
+    else:
+        txn[key] = v
+
+
+@_op("itxn_submit")
+def _op_itxn_submit(vm, f, args):
+    if f.pending is None:
+        raise AVMError("itxn_submit without itxn_begin")
+    group, f.pending = f.pending, None
+    g = f.g
+    f.inner_count += len(group)
+    if f.inner_count > MAX_INNER_TXNS:
+        raise AVMError("too many inner transactions")
+
+    results: List[TxnResult] = []
+    for txn in group:
+        if "type" not in txn:
+            raise AVMError("inner transaction has no type")
+        need = g.ledger.min_fee
+        if "fee" not in txn:
+            # Default inner fees are covered by any excess paid by the outer group
+            txn["fee"] = need - min(need, max(g.fee_credit, 0))
+        g.fee_credit += txn["fee"] - need
+        g.fees += txn["fee"]
+        g.txn_count += 1
+        if txn["type"] == "appl":
+            g.budget += APP_CALL_BUDGET
+
+    for gi, txn in enumerate(group):
+        res = TxnResult(txn)
+        results.append(res)
+        vm._apply(g, txn, gi, group, results, f.app.app_id, f.depth + 1, res)
+
+    f.last_inner = results
+    f.result.inner_txns.extend(results)
+
+
+def _inner(f: _Frame, gi: Optional[int] = None) -> TxnResult:
+    if not f.last_inner:
+        raise AVMError("no inner transaction has been submitted")
+    if gi is None:
+        return f.last_inner[-1]
+    if gi >= len(f.last_inner):
+        raise AVMError("gitxn index beyond inner group")
+    return f.last_inner[gi]
+
+
+@_op("itxn")
+def _op_itxn(vm, f, args):
+    res = _inner(f)
+    f.stack.append(_txn_field(f, res.txn, res, len(f.last_inner) - 1, args[0], None))
+
+
+@_op("itxna")
+def _op_itxna(vm, f, args):
+    res = _inner(f)
+    f.stack.append(_txn_field(f, res.txn, res, len(f.last_inner) - 1, args[0], args[1]))
+
+
+@_op("itxnas")
+def _op_itxnas(vm, f, args):
+    idx = _u(_pop(f))
+    res = _inner(f)
+    f.stack.append(_txn_field(f, res.txn, res, len(f.last_inner) - 1, args[0], idx))
+
+
+@_op("gitxn")
+def _op_gitxn(vm, f, args):
+    res = _inner(f, args[0])
+    f.stack.append(_txn_field(f, res.txn, res, args[0], args[1], None))
+
+
+@_op("gitxna")
+def _op_gitxna(vm, f, args):
+    res = _inner(f, args[0])
+    f.stack.append(_txn_field(f, res.txn, res, args[0], args[1], args[2]))
+
+
+@_op("gitxnas")
+def _op_gitxnas(vm, f, args):
+    idx = _u(_pop(f))
+    res = _inner(f, args[0])
+    f.stack.append(_txn_field(f, res.txn, res, args[0], args[1], idx))
@@ -0,0 +1,187 @@
+import hashlib
+from typing import Dict, Optional, Set, Tuple, Union
+
+from algosdk import encoding
+
+Address = Union[str, bytes]
+
+ACCOUNT_MIN_BALANCE = 100_000
+ASSET_MIN_BALANCE = 100_000
+APP_MIN_BALANCE = 100_000
+SCHEMA_MIN_BALANCE = 25_000
+UINT_MIN_BALANCE = 3_500
+BYTES_MIN_BALANCE = 25_000
+
+ZERO_ADDRESS = bytes(32)
+
+
+def raw_address(addr: Address) -> bytes:
+    if isinstance(addr, bytes):
+        return addr
+    return encoding.decode_address(addr)
+
+
+def app_address(app_id: int) -> bytes:
+    h = hashlib.new("sha512_256")
+    h.update(b"appID" + app_id.to_bytes(8, "big"))
+    return h.digest()
+
+
+class AccountState:
+    __slots__ = ("algos", "assets", "frozen", "created_apps", "created_assets", "opted_apps")
+
+    def __init__(self) -> None:
+        self.algos = 0
+        self.assets: Dict[int, int] = {}
+        self.frozen: Set[int] = set()
+        self.created_apps: Set[int] = set()
+        self.created_assets: Set[int] = set()
+        self.opted_apps: Set[int] = set()
+
+    def copy(self) -> "AccountState":
+        a = AccountState()
+        a.algos = self.algos
+        a.assets = dict(self.assets)
+        a.frozen = set(self.frozen)
+        a.created_apps = set(self.created_apps)
+        a.created_assets = set(self.created_assets)
+        a.opted_apps = set(self.opted_apps)
+        return a
+
+
+class AppState:
+    __slots__ = ("app_id", "creator", "approval", "clear", "global_state",
+                 "global_schema", "local_schema", "extra_pages")
+
+    def __init__(self, app_id: int, creator: bytes, approval: bytes, clear: bytes,
+                 global_schema: Tuple[int, int] = (0, 0), local_schema: Tuple[int, int] = (0, 0),
+                 extra_pages: int = 0) -> None:
+        self.app_id = app_id
+        self.creator = creator
+        self.approval = approval
+        self.clear = clear
+        self.global_state: Dict[bytes, Union[int, bytes]] = {}
+        self.global_schema = global_schema
+        self.local_schema = local_schema
+        self.extra_pages = extra_pages
+
+    def copy(self) -> "AppState":
+        a = AppState(self.app_id, self.creator, self.approval, self.clear,
+                     self.global_schema, self.local_schema, self.extra_pages)
+        a.global_state = dict(self.global_state)
+        return a
+
+    def min_balance(self) -> int:
+        nui, nbs = self.global_schema
+        return (APP_MIN_BALANCE * (1 + self.extra_pages)
+                + (SCHEMA_MIN_BALANCE + UINT_MIN_BALANCE) * nui
+                + (SCHEMA_MIN_BALANCE + BYTES_MIN_BALANCE) * nbs)
+
+
+class AssetState:
+    __slots__ = ("asset_id", "creator", "total", "decimals", "default_frozen", "unit_name",
+                 "name", "url", "metadata_hash", "manager", "reserve", "freeze", "clawback")
+
+    def __init__(self, asset_id: int, creator: bytes, total: int, decimals: int = 0,
+                 default_frozen: bool = False, unit_name: bytes = b"", name: bytes = b"",
+                 url: bytes = b"", metadata_hash: bytes = b"", manager: bytes = ZERO_ADDRESS,
+                 reserve: bytes = ZERO_ADDRESS, freeze: bytes = ZERO_ADDRESS,
+                 clawback: bytes = ZERO_ADDRESS) -> None:
+        self.asset_id = asset_id
+        self.creator = creator
+        self.total = total
+        self.decimals = decimals
+        self.default_frozen = default_frozen
+        self.unit_name = unit_name
+        self.name = name
+        self.url = url
+        self.metadata_hash = metadata_hash
+        self.manager = manager
+        self.reserve = reserve
+        self.freeze = freeze
+        self.clawback = clawback
+
+
+class Ledger:
+    """In-memory accounts, assets and apps for local program evaluation"""
+
+    def __init__(self, round: int = 1, timestamp: int = 0, min_fee: int = 1000) -> None:
+        self.round = round
+        self.timestamp = timestamp
+        self.min_fee = min_fee
+        self.accounts: Dict[bytes, AccountState] = {}
+        self.apps: Dict[int, AppState] = {}
+        self.assets: Dict[int, AssetState] = {}
+        self.next_id = 1000
+
+    def copy(self) -> "Ledger":
+        led = Ledger(self.round, self.timestamp, self.min_fee)
+        led.accounts = {k: v.copy() for k, v in self.accounts.items()}
+        led.apps = {k: v.copy() for k, v in self.apps.items()}
+        # Asset params are never mutated in place
+        led.assets = dict(self.assets)
+        led.next_id = self.next_id
+        return led
+
+    def restore(self, other: "Ledger"):
+        self.accounts = other.accounts
+        self.apps = other.apps
+        self.assets = other.assets
+        self.next_id = other.next_id
+
+    def allocate_id(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+    def account(self, addr: Address) -> AccountState:
+        addr = raw_address(addr)
+        acct = self.accounts.get(addr)
+        if acct is None:
+            acct = self.accounts[addr] = AccountState()
+        return acct
+
+    def fund(self, addr: Address, algos: int):
+        self.account(addr).algos += algos
+
+    def balance(self, addr: Address, asset_id: int = 0) -> Optional[int]:
+        acct = self.accounts.get(raw_address(addr))
+        if acct is None:
+            return 0 if asset_id == 0 else None
+        if asset_id == 0:
+            return acct.algos
+        return acct.assets.get(asset_id)
+
+    def create_asset(self, creator: Address, total: int, unit_name: str = "", name: str = "",
+                     decimals: int = 0) -> int:
+        """Create an asset directly, without evaluating a transaction"""
+        creator = raw_address(creator)
+        asset_id = self.allocate_id()
+        self.assets[asset_id] = AssetState(asset_id, creator, total, decimals,
+                                           unit_name=unit_name.encode(), name=name.encode())
+        acct = self.account(creator)
+        acct.created_assets.add(asset_id)
+        acct.assets[asset_id] = total
+        return asset_id
+
+    def opt_in(self, addr: Address, asset_id: int):
+        self.account(addr).assets.setdefault(asset_id, 0)
+
+    def global_state(self, app_id: int) -> Dict[bytes, Union[int, bytes]]:
+        return dict(self.apps[app_id].global_state)
+
+    def min_balance(self, addr: bytes) -> int:
+        acct = self.accounts.get(addr)
+        if acct is None:
+            return 0
+        total = ACCOUNT_MIN_BALANCE + ASSET_MIN_BALANCE * len(acct.assets)
+        for app_id in acct.created_apps:
+            app = self.apps.get(app_id)
+            if app is not None:
+                total += app.min_balance()
+        for app_id in acct.opted_apps:
+            app = self.apps.get(app_id)
+            if app is not None:
+                nui, nbs = app.local_schema
+                total += (APP_MIN_BALANCE + (SCHEMA_MIN_BALANCE + UINT_MIN_BALANCE) * nui
+                          + (SCHEMA_MIN_BALANCE + BYTES_MIN_BALANCE) * nbs)
+        return total
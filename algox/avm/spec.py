@@ -0,0 +1,261 @@
+"""Opcode and field tables for TEAL v6"""
+from typing import Dict, List, NamedTuple, Tuple
+
+# Immediate argument kinds
+U8 = "u8"
+VARUINT = "varuint"
+LABEL = "label"
+BYTES = "bytes"
+INTCBLOCK = "intcblock"
+BYTECBLOCK = "bytecblock"
+TXN_FIELD = "txn_field"
+GLOBAL_FIELD = "global_field"
+ASSET_HOLDING_FIELD = "asset_holding_field"
+ASSET_PARAMS_FIELD = "asset_params_field"
+APP_PARAMS_FIELD = "app_params_field"
+ACCT_PARAMS_FIELD = "acct_params_field"
+
+
+class OpSpec(NamedTuple):
+    opcode: int
+    name: str
+    immediates: Tuple[str, ...] = ()
+    cost: int = 1
+
+
+OPS: List[OpSpec] = [
+    OpSpec(0x00, "err"),
+    OpSpec(0x01, "sha256", cost=35),
+    OpSpec(0x02, "keccak256", cost=130),
+    OpSpec(0x03, "sha512_256", cost=45),
+    OpSpec(0x04, "ed25519verify", cost=1900),
+    OpSpec(0x08, "+"),
+    OpSpec(0x09, "-"),
+    OpSpec(0x0a, "/"),
+    OpSpec(0x0b, "*"),
+    OpSpec(0x0c, "<"),
+    OpSpec(0x0d, ">"),
+    OpSpec(0x0e, "<="),
+    OpSpec(0x0f, ">="),
+    OpSpec(0x10, "&&"),
+    OpSpec(0x11, "||"),
+    OpSpec(0x12, "=="),
+    OpSpec(0x13, "!="),
+    OpSpec(0x14, "!"),
+    OpSpec(0x15, "len"),
+    OpSpec(0x16, "itob"),
+    OpSpec(0x17, "btoi"),
+    OpSpec(0x18, "%"),
+    OpSpec(0x19, "|"),
+    OpSpec(0x1a, "&"),
+    OpSpec(0x1b, "^"),
+    OpSpec(0x1c, "~"),
+    OpSpec(0x1d, "mulw"),
+    OpSpec(0x1e, "addw"),
+    OpSpec(0x1f, "divmodw", cost=20),
+    OpSpec(0x20, "intcblock", (INTCBLOCK,)),
+    OpSpec(0x21, "intc", (U8,)),
+    OpSpec(0x22, "intc_0"),
+    OpSpec(0x23, "intc_1"),
+    OpSpec(0x24, "intc_2"),
+    OpSpec(0x25, "intc_3"),
+    OpSpec(0x26, "bytecblock", (BYTECBLOCK,)),
+    OpSpec(0x27, "bytec", (U8,)),
+    OpSpec(0x28, "bytec_0"),
+    OpSpec(0x29, "bytec_1"),
+    OpSpec(0x2a, "bytec_2"),
+    OpSpec(0x2b, "bytec_3"),
+    OpSpec(0x2c, "arg", (U8,)),
+    OpSpec(0x2d, "arg_0"),
+    OpSpec(0x2e, "arg_1"),
+    OpSpec(0x2f, "arg_2"),
+    OpSpec(0x30, "arg_3"),
+    OpSpec(0x31, "txn", (TXN_FIELD,)),
+    OpSpec(0x32, "global", (GLOBAL_FIELD,)),
+    OpSpec(0x33, "gtxn", (U8, TXN_FIELD)),
+    OpSpec(0x34, "load", (U8,)),
+    OpSpec(0x35, "store", (U8,)),
+    OpSpec(0x36, "txna", (TXN_FIELD, U8)),
+    OpSpec(0x37, "gtxna", (U8, TXN_FIELD, U8)),
+    OpSpec(0x38, "gtxns", (TXN_FIELD,)),
+    OpSpec(0x39, "gtxnsa", (TXN_FIELD, U8)),
+    OpSpec(0x3a, "gload", (U8, U8)),
+    OpSpec(0x3b, "gloads", (U8,)),
+    OpSpec(0x3c, "gaid", (U8,)),
+    OpSpec(0x3d, "gaids"),
+    OpSpec(0x3e, "loads"),
+    OpSpec(0x3f, "stores"),
+    OpSpec(0x40, "bnz", (LABEL,)),
+    OpSpec(0x41, "bz", (LABEL,)),
+    OpSpec(0x42, "b", (LABEL,)),
+    OpSpec(0x43, "return"),
+    OpSpec(0x44, "assert"),
+    OpSpec(0x48, "pop"),
+    OpSpec(0x49, "dup"),
+    OpSpec(0x4a, "dup2"),
+    OpSpec(0x4b, "dig", (U8,)),
+    OpSpec(0x4c, "swap"),
+    OpSpec(0x4d, "select"),
+    OpSpec(0x4e, "cover", (U8,)),
+    OpSpec(0x4f, "uncover", (U8,)),
+    OpSpec(0x50, "concat"),
+    OpSpec(0x51, "substring", (U8, U8)),
+    OpSpec(0x52, "substring3"),
+    OpSpec(0x53, "getbit"),
+    OpSpec(0x54, "setbit"),
+    OpSpec(0x55, "getbyte"),
+    OpSpec(0x56, "setbyte"),
+    OpSpec(0x57, "extract", (U8, U8)),
+    OpSpec(0x58, "extract3"),
+    OpSpec(0x59, "extract_uint16"),
+    OpSpec(0x5a, "extract_uint32"),
+    OpSpec(0x5b, "extract_uint64"),
+    OpSpec(0x60, "balance"),
+    OpSpec(0x61, "app_opted_in"),
+    OpSpec(0x62, "app_local_get"),
+    OpSpec(0x63, "app_local_get_ex"),
+    OpSpec(0x64, "app_global_get"),
+    OpSpec(0x65, "app_global_get_ex"),
+    OpSpec(0x66, "app_local_put"),
+    OpSpec(0x67, "app_global_put"),
+    OpSpec(0x68, "app_local_del"),
+    OpSpec(0x69, "app_global_del"),
+    OpSpec(0x70, "asset_holding_get", (ASSET_HOLDING_FIELD,)),
+    OpSpec(0x71, "asset_params_get", (ASSET_PARAMS_FIELD,)),
+    OpSpec(0x72, "app_params_get", (APP_PARAMS_FIELD,)),
+    OpSpec(0x73, "acct_params_get", (ACCT_PARAMS_FIELD,)),
+    OpSpec(0x78, "min_balance"),
+    OpSpec(0x80, "pushbytes", (BYTES,)),
+    OpSpec(0x81, "pushint", (VARUINT,)),
+    OpSpec(0x88, "callsub", (LABEL,)),
+    OpSpec(0x89, "retsub"),
+    OpSpec(0x90, "shl"),
+    OpSpec(0x91, "shr"),
+    OpSpec(0x92, "sqrt", cost=4),
+    OpSpec(0x93, "bitlen"),
+    OpSpec(0x94, "exp"),
+    OpSpec(0x95, "expw", cost=10),
+    OpSpec(0x96, "bsqrt", cost=40),
+    OpSpec(0x97, "divw"),
+    OpSpec(0xa0, "b+", cost=10),
+    OpSpec(0xa1, "b-", cost=10),
+    OpSpec(0xa2, "b/", cost=20),
+    OpSpec(0xa3, "b*", cost=20),
+    OpSpec(0xa4, "b<"),
+    OpSpec(0xa5, "b>"),
+    OpSpec(0xa6, "b<="),
+    OpSpec(0xa7, "b>="),
+    OpSpec(0xa8, "b=="),
+    OpSpec(0xa9, "b!="),
+    OpSpec(0xaa, "b%", cost=20),
+    OpSpec(0xab, "b|", cost=6),
+    OpSpec(0xac, "b&", cost=6),
+    OpSpec(0xad, "b^", cost=6),
+    OpSpec(0xae, "b~", cost=4),
+    OpSpec(0xaf, "bzero"),
+    OpSpec(0xb0, "log"),
+    OpSpec(0xb1, "itxn_begin"),
+    OpSpec(0xb2, "itxn_field", (TXN_FIELD,)),
+    OpSpec(0xb3, "itxn_submit"),
+    OpSpec(0xb4, "itxn", (TXN_FIELD,)),
+    OpSpec(0xb5, "itxna", (TXN_FIELD, U8)),
+    OpSpec(0xb6, "itxn_next"),
+    OpSpec(0xb7, "gitxn", (U8, TXN_FIELD)),
+    OpSpec(0xb8, "gitxna", (U8, TXN_FIELD, U8)),
+    OpSpec(0xc0, "txnas", (TXN_FIELD,)),
+    OpSpec(0xc1, "gtxnas", (U8, TXN_FIELD)),
+    OpSpec(0xc2, "gtxnsas", (TXN_FIELD,)),
+    OpSpec(0xc3, "args"),
+    OpSpec(0xc4, "gloadss"),
+    OpSpec(0xc5, "itxnas", (TXN_FIELD,)),
+    OpSpec(0xc6, "gitxnas", (U8, TXN_FIELD)),
+]
+
+OPS_BY_CODE: Dict[int, OpSpec] = {op.opcode: op for op in OPS}
+OPS_BY_NAME: Dict[str, OpSpec] = {op.name: op for op in OPS}
+
+TXN_FIELDS = [
+    "Sender", "Fee", "FirstValid", "FirstValidTime", "LastValid", "Note",
+    "Lease", "Receiver", "Amount", "CloseRemainderTo", "VotePK",
+    "SelectionPK", "VoteFirst", "VoteLast", "VoteKeyDilution", "Type",
+    "TypeEnum", "XferAsset", "AssetAmount", "AssetSender", "AssetReceiver",
+    "AssetCloseTo", "GroupIndex", "TxID", "ApplicationID", "OnCompletion",
+    "ApplicationArgs", "NumAppArgs", "Accounts", "NumAccounts",
+    "ApprovalProgram", "ClearStateProgram", "RekeyTo", "ConfigAsset",
+    "ConfigAssetTotal", "ConfigAssetDecimals", "ConfigAssetDefaultFrozen",
+    "ConfigAssetUnitName", "ConfigAssetName", "ConfigAssetURL",
+    "ConfigAssetMetadataHash", "ConfigAssetManager", "ConfigAssetReserve",
+    "ConfigAssetFreeze", "ConfigAssetClawback", "FreezeAsset",
+    "FreezeAssetAccount", "FreezeAssetFrozen", "Assets", "NumAssets",
+    "Applications", "NumApplications", "GlobalNumUint", "GlobalNumByteSlice",
+    "LocalNumUint", "LocalNumByteSlice", "ExtraProgramPages",
+    "Nonparticipation", "Logs", "NumLogs", "CreatedAssetID",
+    "CreatedApplicationID", "LastLog", "StateProofPK",
+]
+
+GLOBAL_FIELDS = [
+    "MinTxnFee", "MinBalance", "MaxTxnLife", "ZeroAddress", "GroupSize",
+    "LogicSigVersion", "Round", "LatestTimestamp", "CurrentApplicationID",
+    "CreatorAddress", "CurrentApplicationAddress", "GroupID", "OpcodeBudget",
+    "CallerApplicationID", "CallerApplicationAddress",
+]
+
+ASSET_HOLDING_FIELDS = ["AssetBalance", "AssetFrozen"]
+
+ASSET_PARAMS_FIELDS = [
+    "AssetTotal", "AssetDecimals", "AssetDefaultFrozen", "AssetUnitName",
+    "AssetName", "AssetURL", "AssetMetadataHash", "AssetManager",
+    "AssetReserve", "AssetFreeze", "AssetClawback", "AssetCreator",
+]
+
+APP_PARAMS_FIELDS = [
+    "AppApprovalProgram", "AppClearStateProgram", "AppGlobalNumUint",
+    "AppGlobalNumByteSlice", "AppLocalNumUint", "AppLocalNumByteSlice",
+    "AppExtraProgramPages", "AppCreator", "AppAddress",
+]
+
+ACCT_PARAMS_FIELDS = ["AcctBalance", "AcctMinBalance", "AcctAuthAddr"]
+
+FIELD_NAMES: Dict[str, List[str]] = {
+    TXN_FIELD: TXN_FIELDS,
+    GLOBAL_FIELD: GLOBAL_FIELDS,
+    ASSET_HOLDING_FIELD: ASSET_HOLDING_FIELDS,
+    ASSET_PARAMS_FIELD: ASSET_PARAMS_FIELDS,
+    APP_PARAMS_FIELD: APP_PARAMS_FIELDS,
+    ACCT_PARAMS_FIELD: ACCT_PARAMS_FIELDS,
+}
+
+# Txn fields that are arrays, indexed by an immediate or a stack value
+ARRAY_TXN_FIELDS = {"ApplicationArgs", "Accounts", "Assets", "Applications", "Logs"}
+
+ON_COMPLETION = {
+    "NoOp": 0,
+    "OptIn": 1,
+    "CloseOut": 2,
+    "ClearState": 3,
+    "UpdateApplication": 4,
+    "DeleteApplication": 5,
+}
+
+TYPE_ENUM = {
+    "unknown": 0,
+    "pay": 1,
+    "keyreg": 2,
+    "acfg": 3,
+    "axfer": 4,
+    "afrz": 5,
+    "appl": 6,
+}
+
+# Named constants accepted by the `int` pseudo-op
+NAMED_INTS = dict(ON_COMPLETION, **TYPE_ENUM)
+
+MAX_STACK_DEPTH = 1000
+MAX_BYTES_LEN = 4096
+MAX_CALL_DEPTH = 8
+MAX_INNER_TXNS = 16
+MAX_LOGS = 32
+MAX_LOG_SIZE = 1024
+APP_CALL_BUDGET = 700
+MAX_KEY_LEN = 64
+MAX_KEY_VALUE_LEN = 128
@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+
+from .utils import PendingTxnResponse
+
+ALGO = 0
+
+
+def _addr(value: Union[str, bytes, None]) -> Optional[str]:
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        return encoding.encode_address(value)
+    return value
+
+
+def _txn_fields(txn: Any) -> Dict[str, Any]:
+    if hasattr(txn, "transaction"):
+        txn = txn.transaction
+    if hasattr(txn, "dictify"):
+        txn = txn.dictify()
+    return txn
+
+
+class BalanceCache:
+    """Algo and asset balances indexed by `(address, asset_id)`
+
+    `load` fetches the tracked accounts once; afterwards `apply` and
+    `apply_group` fold in the transfers, fees and inner transactions of
+    confirmed transactions, so balances stay current without another
+    `account_info`. Only loaded addresses are tracked; asset id 0 is algos.
+    """
+
+    def __init__(self, client: AlgodClient, max_workers: int = 8) -> None:
+        self.client = client
+        self.max_workers = max_workers
+        self._balances: Dict[Tuple[str, int], int] = {}
+        self._tracked: set = set()
+
+    def load(self, *addresses: str) -> "BalanceCache":
+        def fetch(addr):
+            return addr, self.client.account_info(addr)
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            infos = list(pool.map(fetch, addresses))
+
+        for addr, info in infos:
+            for key in [k for k in self._balances if k[0] == addr]:
+                del self._balances[key]
+            self._tracked.add(addr)
+            self._balances[(addr, ALGO)] = info["amount"]
+            for holding in info.get("assets", []):
+                self._balances[(addr, holding["asset-id"])] = holding["amount"]
+        return self
+
+    def get(self, address: str, asset_id: int = ALGO) -> Optional[int]:
+        """Cached balance, None if the account is not opted in or not tracked"""
+        return self._balances.get((address, asset_id))
+
+    def __getitem__(self, key: Tuple[str, int]) -> int:
+        return self._balances[key]
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        return key in self._balances
+
+    def holdings(self, address: str) -> Dict[int, int]:
+        return {aid: amt for (addr, aid), amt in self._balances.items() if addr == address}
+
+    def apply(self, response: Union[PendingTxnResponse, Dict[str, Any]]):
+        """Apply a confirmed transaction and all of its inner transactions"""
+        if isinstance(response, PendingTxnResponse):
+            response = response.response
+        self._apply_txn(response.get("txn", {}).get("txn", {}), response)
+        for inner in response.get("inner-txns") or []:
+            self.apply(inner)
+
+    def apply_group(self, group: Iterable[Any], response: Optional[Union[PendingTxnResponse, Dict[str, Any]]] = None):
+        """Apply the outer transactions of a sent group
+
+        `response` is the confirmed response of the group's app call, whose
+        inner transactions are applied as well.
+        """
+        for txn in group:
+            self._apply_txn(_txn_fields(txn), {})
+        if response is not None:
+            if isinstance(response, PendingTxnResponse):
+                inner_txns = response.inner_txns
+            else:
+                inner_txns = response.get("inner-txns") or []
+            for inner in inner_txns:
+                self.apply(inner)
+
+    def _move(self, sender: Optional[str], receiver: Optional[str], asset_id: int, amount: int):
+        if sender in self._tracked and (sender, asset_id) in self._balances:
+            self._balances[(sender, asset_id)] -= amount
+        if receiver in self._tracked and (receiver, asset_id) in self._balances:
+            self._balances[(receiver, asset_id)] += amount
+
+    def _apply_txn(self, txn: Dict[str, Any], response: Dict[str, Any]):
+        sender = _addr(txn.get("snd"))
+        if sender in self._tracked:
+            self._balances[(sender, ALGO)] = self._balances.get((sender, ALGO), 0) - txn.get("fee", 0)
+
+        kind = txn.get("type")
+        if kind == "pay":
+            self._move(sender, _addr(txn.get("rcv")), ALGO, txn.get("amt", 0))
+            close = _addr(txn.get("close"))
+            if close:
+                remaining = response.get("closing-amount")
+                if remaining is None:
+                    remaining = self._balances.get((sender, ALGO), 0)
+                self._move(sender, close, ALGO, remaining)
+                if sender in self._tracked:
+                    self._balances[(sender, ALGO)] = 0
+
+        elif kind == "axfer":
+            asset_id = txn.get("xaid", 0)
+            receiver = _addr(txn.get("arcv"))
+            source = _addr(txn.get("asnd")) or sender
+            amount = txn.get("aamt", 0)
+            if amount == 0 and source == receiver and receiver in self._tracked:
+                # Opt in
+                self._balances.setdefault((receiver, asset_id), 0)
+            self._move(source, receiver, asset_id, amount)
+            close = _addr(txn.get("aclose"))
+            if close:
+                remaining = response.get("asset-closing-amount")
+                if remaining is None:
+                    remaining = self._balances.get((source, asset_id), 0)
+                self._move(source, close, asset_id, remaining)
+                self._balances.pop((source, asset_id), None)
+
+        elif kind == "acfg" and not txn.get("caid"):
+            asset_id = response.get("asset-index")
+            if asset_id and sender in self._tracked:
+                self._balances[(sender, asset_id)] = txn.get("apar", {}).get("t", 0)
+
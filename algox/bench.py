@@ -0,0 +1,352 @@
+"""Opcode cost benchmarks for the pool and master entry points
+
+Runs a representative group for every `on_call` branch through the local
+AVM and compares the opcode cost of each branch with a JSON baseline.
+Each build has its own baseline, `bench_baseline.json` for the default
+build and e.g. `bench_baseline.sharded.json` for `--sharded`. A build with
+no baseline fails until one is written with `--update`.
+
+    python -m algox.bench             # check against the baseline
+    python -m algox.bench --update    # rewrite the baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from algosdk import account
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+
+from .avm import GroupResult, LocalAlgod, TxnResult
+from .cache import CompileCache
+from .constants import POOL_TEMPLATE, SHARD_CREATION_FEE, SHARD_SCHEMA, SHARDED_MASTER_SCHEMA
+from .contracts.master import POOL_CREATION_FEE, MasterContract
+from .contracts.pool import PoolContract
+from .contracts.registry import RegistryShard
+from .operations import (
+    compile_cache, compile_program, get_app_call, get_asset_xfer, get_boot_group, get_fund_group, get_multiswap_group,
+    patch_pool_program,
+)
+from .params import suggested_params
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_THRESHOLD = 0.05
+
+Results = Dict[str, Dict[str, int]]
+Programs = Tuple[bytes, bytes]
+
+
+class _Bench:
+    def __init__(self, pool_programs: Programs, master_programs: Programs,
+                 registry_programs: Optional[Programs] = None) -> None:
+        self.client = LocalAlgod()
+        self.results: Results = {}
+
+        self.pool_approval, self.pool_clear = pool_programs
+        self.master_approval, self.master_clear = master_programs
+        self.registry_programs = registry_programs
+
+        self.sender = self._account()
+        self.user = self._account()
+
+    def _account(self) -> str:
+        addr = account.generate_account()[1]
+        self.client.ledger.fund(addr, 1_000_000_000)
+        return addr
+
+    def run(self, txns: List[transaction.Transaction]) -> GroupResult:
+        if len(txns) > 1:
+            txns = transaction.assign_group_id(txns)
+        result = self.client.avm.evaluate(txns)
+        if not result.approved:
+            raise Exception("benchmark group was rejected: {}".format(result.error))
+        return result
+
+    def record(self, name: str, result: GroupResult, txn: TxnResult, program: bytes):
+        self.results[name] = {
+            "cost": txn.cost,
+            "budget": result.budget,
+            "size": len(program),
+        }
+
+    def sp(self) -> transaction.SuggestedParams:
+        return suggested_params(self.client)
+
+    def create_app(self, approval: bytes, clear: bytes, apps: List[int] = [],
+                   schema: Tuple[int, int] = (32, 32)) -> GroupResult:
+        return self.run([transaction.ApplicationCreateTxn(
+            self.sender, self.sp(), transaction.OnComplete.NoOpOC, approval, clear,
+            transaction.StateSchema(*schema), transaction.StateSchema(0, 0), foreign_apps=apps,
+        )])
+
+    def create_asset(self, unit_name: str) -> int:
+        result = self.run([transaction.AssetCreateTxn(
+            self.sender, self.sp(), 1_000_000_000, 0, False, unit_name=unit_name, asset_name="asset",
+        )])
+        return result.txns[0].created_asset_id
+
+    def scenario(self) -> Results:
+        """Pool created and configured through the master"""
+        sender = self.sender
+
+        result = self.create_app(self.pool_approval, self.pool_clear)
+        self.record("pool.create", result, result.txns[0], self.pool_approval)
+        template_id = result.txns[0].created_app_id
+
+        result = self.create_app(self.master_approval, self.master_clear, [template_id])
+        self.record("master.create", result, result.txns[0], self.master_approval)
+        master_id = result.txns[0].created_app_id
+
+        asset_a = self.create_asset("A")
+        asset_b = self.create_asset("B")
+
+        result = self.run([
+            transaction.PaymentTxn(sender, self.sp(), get_application_address(master_id), POOL_CREATION_FEE),
+            get_app_call(sender, self.sp(), master_id, ["new_pool"], [asset_a, asset_b], apps=[template_id]),
+        ])
+        self.record("master.new_pool", result, result.txns[1], self.master_approval)
+        self.record("pool.set", result, _inner_call(result.txns[1], b"set"), self.pool_approval)
+        pool_id = next(t.created_app_id for t in result.txns[1].inner_txns if t.created_app_id)
+
+        result = self.run([get_app_call(sender, self.sp(), master_id, ["set_govener"], [asset_a, asset_b],
+                                        [sender], [pool_id])])
+        self.record("master.set_govener", result, result.txns[0], self.master_approval)
+        self.record("pool.update", result, _inner_call(result.txns[0], b"update"), self.pool_approval)
+
+        return self.pool_scenario(pool_id, asset_a, asset_b, self.pool_approval)
+
+    def sharded_scenario(self) -> Results:
+        """Pool created through a sharded master, registered in a new shard"""
+        sender = self.sender
+        registry_approval, registry_clear = self.registry_programs
+
+        result = self.create_app(self.pool_approval, self.pool_clear)
+        self.record("pool.create", result, result.txns[0], self.pool_approval)
+        template_id = result.txns[0].created_app_id
+
+        result = self.create_app(registry_approval, registry_clear, schema=SHARD_SCHEMA)
+        self.record("registry.create", result, result.txns[0], registry_approval)
+        shard_template_id = result.txns[0].created_app_id
+
+        result = self.create_app(self.master_approval, self.master_clear, [template_id, shard_template_id],
+                                 SHARDED_MASTER_SCHEMA)
+        self.record("master.create", result, result.txns[0], self.master_approval)
+        master_id = result.txns[0].created_app_id
+
+        asset_a = self.create_asset("A")
+        asset_b = self.create_asset("B")
+
+        result = self.run([
+            transaction.PaymentTxn(sender, self.sp(), get_application_address(master_id),
+                                   POOL_CREATION_FEE + SHARD_CREATION_FEE),
+            get_app_call(sender, self.sp(), master_id, ["new_pool"], [asset_a, asset_b],
+                         apps=[template_id, shard_template_id]),
+        ])
+        self.record("master.new_pool", result, result.txns[1], self.master_approval)
+        self.record("pool.set", result, _inner_call(result.txns[1], b"set"), self.pool_approval)
+        self.record("registry.put", result, _inner_call(result.txns[1], b"put"), registry_approval)
+        created = [t.created_app_id for t in result.txns[1].inner_txns if t.created_app_id]
+        shard_id, pool_id = created
+
+        result = self.run([get_app_call(sender, self.sp(), master_id, ["set_govener"], [asset_a, asset_b],
+                                        [sender], [pool_id, shard_id])])
+        self.record("master.set_govener", result, result.txns[0], self.master_approval)
+        self.record("pool.update", result, _inner_call(result.txns[0], b"update"), self.pool_approval)
+
+        return self.pool_scenario(pool_id, asset_a, asset_b, self.pool_approval)
+
+    def pair_scenario(self) -> Results:
+        """Pool from a templated build, created for its pair directly"""
+        sender = self.sender
+        asset_a = self.create_asset("A")
+        asset_b = self.create_asset("B")
+
+        approval = patch_pool_program(self.pool_approval, asset_a, asset_b)
+        result = self.create_app(approval, self.pool_clear)
+        self.record("pool.create", result, result.txns[0], approval)
+        pool_id = result.txns[0].created_app_id
+
+        result = self.run([get_app_call(sender, self.sp(), pool_id, ["update"], accounts=[sender])])
+        self.record("pool.update", result, result.txns[0], approval)
+
+        return self.pool_scenario(pool_id, asset_a, asset_b, approval)
+
+    def pool_scenario(self, pool_id: int, asset_a: int, asset_b: int, approval: bytes) -> Results:
+        sender, user = self.sender, self.user
+        pool_addr = get_application_address(pool_id)
+
+        # Onboarded the way `operations.onboard_pool` does it, seeding with boot
+        # and opting in with fund
+        result = self.run(get_boot_group(sender, self.sp(), pool_id, asset_a, asset_b))
+        self.record("pool.boot", result, result.txns[-1], approval)
+        pool_token = result.txns[-1].inner_txns[0].created_asset_id
+
+        sp = self.sp()
+        self.run([get_asset_xfer(user, sp, a, user, 0) for a in (asset_a, asset_b)])
+        self.run([get_asset_xfer(sender, sp, a, user, 100_000) for a in (asset_a, asset_b)])
+
+        result = self.run(get_fund_group(sender, sp, pool_id, asset_a, asset_b, pool_token, 1_000_000, 3_000_000))
+        self.record("pool.fund", result, result.txns[1], approval)
+
+        result = self.run([
+            get_app_call(sender, sp, pool_id, ["mint"], [asset_a, asset_b, pool_token]),
+            get_asset_xfer(sender, sp, asset_a, pool_addr, 100_000),
+            get_asset_xfer(sender, sp, asset_b, pool_addr, 300_000),
+        ])
+        self.record("pool.mint", result, result.txns[0], approval)
+
+        for name, asset in (("pool.swap_a_b", asset_a), ("pool.swap_b_a", asset_b)):
+            result = self.run([
+                get_app_call(user, sp, pool_id, ["swap"], [asset_a, asset_b]),
+                get_asset_xfer(user, sp, asset, pool_addr, 10_000),
+            ])
+            self.record(name, result, result.txns[0], approval)
+
+        result = self.run(get_multiswap_group(user, sp, pool_id, asset_a, asset_b, [
+            (user, asset_a, 10_000), (user, asset_b, 10_000), (user, asset_a, 5_000), (user, asset_b, 5_000),
+        ]))
+        self.record("pool.multiswap_4", result, result.txns[0], approval)
+
+        result = self.run([
+            get_app_call(sender, sp, pool_id, ["burn"], [asset_a, asset_b, pool_token]),
+            get_asset_xfer(sender, sp, pool_token, pool_addr, 10_000),
+        ])
+        self.record("pool.burn", result, result.txns[0], approval)
+
+        return self.results
+
+
+def _inner_call(result: TxnResult, method: bytes) -> TxnResult:
+    for inner in result.inner_txns:
+        if inner.txn.get("type") == "appl" and inner.txn.get("apaa", [b""])[0] == method:
+            return inner
+    raise Exception("no inner {} call".format(method.decode()))
+
+
+def run_benchmarks(pool_contract: Optional[PoolContract] = None,
+                   master_contract: Optional[MasterContract] = None,
+                   cache: Optional[CompileCache] = compile_cache) -> Results:
+    """Cost, pooled budget and program size for every entry point"""
+    pool_contract = pool_contract or PoolContract()
+    master_contract = master_contract or MasterContract()
+    templated = getattr(pool_contract, "templated", False)
+    client = LocalAlgod()
+    registry_programs = None
+    if getattr(master_contract, "sharded", False):
+        registry = RegistryShard()
+        registry_programs = (
+            compile_program(client, registry, "approval_program", cache),
+            compile_program(client, registry, "clear_program", cache),
+        )
+    return benchmark_programs(
+        (
+            compile_program(client, pool_contract, "approval_program", cache, POOL_TEMPLATE if templated else None),
+            compile_program(client, pool_contract, "clear_program", cache),
+        ),
+        (
+            compile_program(client, master_contract, "approval_program", cache),
+            compile_program(client, master_contract, "clear_program", cache),
+        ),
+        templated,
+        registry_programs,
+    )
+
+
+def benchmark_programs(pool_programs: Programs, master_programs: Programs, templated: bool = False,
+                       registry_programs: Optional[Programs] = None) -> Results:
+    """Like `run_benchmarks` for already compiled programs
+
+    A templated pool program is patched for a fresh pair and created
+    directly, so its results have no master entries and no `pool.set`.
+    With `registry_programs` the master is a sharded build, and the results
+    also have the `registry.*` entries.
+    """
+    bench = _Bench(pool_programs, master_programs, registry_programs)
+    if templated:
+        return bench.pair_scenario()
+    return bench.sharded_scenario() if registry_programs is not None else bench.scenario()
+
+
+def baseline_path(optimized: bool = False, sharded: bool = False, templated: bool = False) -> str:
+    """Baseline of a build, `bench_baseline.json` for the default one"""
+    flags = (("optimized", optimized), ("sharded", sharded), ("templated", templated))
+    build = ".".join(name for name, on in flags if on)
+    if not build:
+        return BASELINE_PATH
+    return BASELINE_PATH[:-len(".json")] + "." + build + ".json"
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Results:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results: Results, path: str = BASELINE_PATH):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(results: Results, baseline: Results, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Describe every branch whose cost grew by more than `threshold`"""
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        current = results.get(name)
+        if current is None:
+            regressions.append("{}: missing from results".format(name))
+            continue
+        limit = base["cost"] * (1 + threshold)
+        if current["cost"] > limit:
+            regressions.append("{}: cost {} exceeds baseline {} by more than {:.0%}".format(
+                name, current["cost"], base["cost"], threshold))
+    return regressions
+
+
+def print_results(results: Results, baseline: Optional[Results] = None):
+    print("{:<20} {:>6} {:>7} {:>6} {:>9}".format("branch", "cost", "budget", "size", "baseline"))
+    for name, r in sorted(results.items()):
+        base: Any = (baseline or {}).get(name, {}).get("cost", "-")
+        print("{:<20} {:>6} {:>7} {:>6} {:>9}".format(name, r["cost"], r["budget"], r["size"], base))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="rewrite the baseline")
+    parser.add_argument("--baseline", help="default bench_baseline[.<build>].json for the chosen build")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--optimized", action="store_true", help="benchmark the optimized pool build")
+    parser.add_argument("--sharded", action="store_true", help="benchmark the sharded master build")
+    parser.add_argument("--templated", action="store_true", help="benchmark the templated per-pair pool build")
+    args = parser.parse_args(argv)
+    if args.templated and args.sharded:
+        parser.error("templated pools are not registered with a master, --sharded does not apply")
+    args.baseline = args.baseline or baseline_path(args.optimized, args.sharded, args.templated)
+
+    # Keep compile progress out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_benchmarks(PoolContract(args.optimized, args.templated), MasterContract(args.sharded))
+
+    if args.update:
+        save_baseline(results, args.baseline)
+        print_results(results)
+        print("Wrote baseline to {}".format(args.baseline))
+        return 0
+    if not os.path.exists(args.baseline):
+        print_results(results)
+        print("MISSING baseline {}: write it with --update and the same flags".format(args.baseline))
+        return 1
+
+    baseline = load_baseline(args.baseline)
+    print_results(results, baseline)
+    regressions = compare(results, baseline, args.threshold)
+    for r in regressions:
+        print("REGRESSION " + r)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import ast
+import hashlib
+import inspect
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from algosdk.v2client.algod import AlgodClient
+
+from .utils import fully_compile_contract
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ALGOX_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "algox")
+)
+
+
+def pyteal_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("pyteal")
+    except Exception:
+        return "unknown"
+
+
+def _package_root(path: str) -> str:
+    root = os.path.dirname(path)
+    while os.path.exists(os.path.join(os.path.dirname(root), "__init__.py")):
+        root = os.path.dirname(root)
+    return root
+
+
+def _module_file(base: str, parts: List[str]) -> Optional[str]:
+    path = os.path.join(base, *parts)
+    for candidate in (path + ".py", os.path.join(path, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def source_closure(path: str) -> List[str]:
+    """`path` and every module of its package it imports at module level,
+    directly or not
+
+    Imports are read from the source, so nothing is imported and PyTeal is
+    not needed. Imports inside functions, e.g. in `main`, are left out.
+    """
+    path = os.path.abspath(path)
+    root = _package_root(path)
+    package = os.path.basename(root)
+    seen = set()
+    todo = [path]
+    while todo:
+        current = todo.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        with open(current, "rb") as f:
+            tree = ast.parse(f.read(), current)
+
+        for node in tree.body:
+            modules = []
+            if isinstance(node, ast.Import):
+                modules = [(root, a.name.split(".")[1:]) for a in node.names if a.name.split(".")[0] == package]
+            elif isinstance(node, ast.ImportFrom):
+                parts = node.module.split(".") if node.module else []
+                if node.level:
+                    base = os.path.dirname(current)
+                    for _ in range(node.level - 1):
+                        base = os.path.dirname(base)
+                elif parts[:1] == [package]:
+                    base, parts = root, parts[1:]
+                else:
+                    continue
+                modules = [(base, parts)] + [(base, parts + [a.name]) for a in node.names]
+            for base, parts in modules:
+                found = _module_file(base, parts) if parts else None
+                if found is not None:
+                    todo.append(found)
+    return sorted(seen)
+
+
+def hash_sources(h: Any, path: str):
+    """Feed the source of `path` and of every package module it imports into `h`"""
+    root = _package_root(path)
+    for source in source_closure(path):
+        h.update(os.path.relpath(source, root).encode())
+        with open(source, "rb") as f:
+            h.update(f.read())
+
+
+class CompileCache:
+    """On-disk cache of compiled programs
+
+    Bytecode is stored under a hash of the TEAL source, TEAL version and
+    PyTeal version, so a hit skips the algod compile endpoint. A second index
+    keyed by the source of the contract and of every module it imports lets
+    `program` skip building the PyTeal AST as well. The least recently used entries are evicted once
+    more than `max_entries` programs are stored.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, max_entries: int = 64) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, teal: str, version: int) -> str:
+        h = hashlib.sha256()
+        h.update(teal.encode())
+        h.update("|teal={}|pyteal={}".format(version, pyteal_version()).encode())
+        return h.hexdigest()
+
+    def contract_key(self, contract: Any, name: str, version: int, template: Optional[Dict[str, int]] = None) -> str:
+        cls = type(contract)
+        h = hashlib.sha256()
+        hash_sources(h, inspect.getsourcefile(cls))
+        h.update("|{}.{}|{}|teal={}|pyteal={}".format(
+            cls.__module__, cls.__qualname__, name, version, pyteal_version()
+        ).encode())
+        h.update(repr(sorted(vars(contract).items())).encode())
+        if template:
+            h.update(repr(sorted(template.items())).encode())
+        return h.hexdigest()
+
+    def _file(self, key: str, ext: str) -> str:
+        return os.path.join(self.path, key + ext)
+
+    def _read(self, fname: str) -> Optional[bytes]:
+        try:
+            with open(fname, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        os.utime(fname)
+        return data
+
+    def _write(self, fname: str, data: bytes):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = "{}.{}.tmp".format(fname, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, fname)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._read(self._file(key, ".bin"))
+
+    def put(self, key: str, program: bytes):
+        self._write(self._file(key, ".bin"), program)
+        self.evict()
+
+    def evict(self):
+        try:
+            names = [n for n in os.listdir(self.path) if n.endswith((".bin", ".ref"))]
+        except OSError:
+            return
+
+        for ext in (".bin", ".ref"):
+            entries = [os.path.join(self.path, n) for n in names if n.endswith(ext)]
+            if len(entries) <= self.max_entries:
+                continue
+            entries.sort(key=lambda p: os.stat(p).st_mtime)
+            for p in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def compile(self, client: AlgodClient, teal: str, version: int) -> bytes:
+        key = self.key(teal, version)
+        program = self.get(key)
+        if program is not None:
+            self.hits += 1
+            return program
+
+        self.misses += 1
+        program = fully_compile_contract(client, teal)
+        self.put(key, program)
+        return program
+
+    @staticmethod
+    def build(contract: Any, name: str, version: int, template: Optional[Dict[str, int]] = None) -> str:
+        """TEAL for `getattr(contract, name)()`, with the `TMPL_*` variables in `template` substituted"""
+        from pyteal import Mode, compileTeal
+
+        teal = compileTeal(getattr(contract, name)(), mode=Mode.Application, version=version)
+        for var, value in (template or {}).items():
+            teal = re.sub(r"\b{}\b".format(var), str(value), teal)
+        return teal
+
+    def cached_program(self, contract: Any, name: str, version: int,
+                       template: Optional[Dict[str, int]] = None) -> Optional[bytes]:
+        """Bytecode for `getattr(contract, name)()` without building the PyTeal AST"""
+        key = self._read(self._file(self.contract_key(contract, name, version, template), ".ref"))
+        if key is None:
+            return None
+        program = self.get(key.decode())
+        if program is not None:
+            self.hits += 1
+        return program
+
+    def remember(self, contract: Any, name: str, version: int, teal: str, program: bytes,
+                 template: Optional[Dict[str, int]] = None):
+        key = self.key(teal, version)
+        self.put(key, program)
+        self._write(self._file(self.contract_key(contract, name, version, template), ".ref"), key.encode())
+
+    def program(self, client: AlgodClient, contract: Any, name: str, version: int,
+                template: Optional[Dict[str, int]] = None) -> bytes:
+        """Compiled bytecode for `getattr(contract, name)()`"""
+        program = self.cached_program(contract, name, version, template)
+        if program is not None:
+            return program
+
+        teal = self.build(contract, name, version, template)
+        program = self.compile(client, teal, version)
+        self.remember(contract, name, version, teal, program, template)
+        return program
@@ -0,0 +1,25 @@
+"""Values shared by the contracts and the client, importable without PyTeal"""
+
+TEAL_VERSION = 6
+
+# Min balance and fees for the pool app created by `new_pool`
+POOL_CREATION_FEE = 2_715_000
+
+# Stand-ins compiled into the templated pool program in place of the pair,
+# see `operations.patch_pool_program`
+POOL_TEMPLATE = {"TMPL_ASSET_A": 2**64 - 3, "TMPL_ASSET_B": 2**64 - 2}
+
+# Global `(uints, byte slices)` of the apps; a sharded master keeps one uint
+# per registry shard
+POOL_SCHEMA = (32, 32)
+MASTER_SCHEMA = (32, 32)
+SHARDED_MASTER_SCHEMA = (63, 1)
+SHARD_SCHEMA = (64, 0)
+
+# Registry shards of a sharded master, each holding up to `SHARD_CAPACITY`
+# pools; a pair whose shard is full cannot be registered in that master
+REGISTRY_SHARDS = 60
+SHARD_CAPACITY = SHARD_SCHEMA[0]
+
+# Min balance and fees for a registry shard created by `new_pool`
+SHARD_CREATION_FEE = 1_930_000
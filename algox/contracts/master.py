@@ -1,14 +1,36 @@
-import os
-
 from pyteal import *
 
+from ..constants import POOL_CREATION_FEE, REGISTRY_SHARDS, SHARD_CREATION_FEE, SHARD_SCHEMA
+
 
 class MasterContract:
+    def __init__(self, sharded: bool = False) -> None:
+        # Sharded builds register pools in RegistryShard apps rather than in
+        # their own global state, so the registry is not capped by the schema
+        self.sharded = sharded
+
     class Vars:
         gov_key = Bytes("gov")
         pool_id_key = Bytes("pid")
+        shard_id_key = Bytes("sid")
+
+    @staticmethod
+    def pool_key(asset_a, asset_b):
+        return Concat(Itob(asset_a), Bytes("_"), Itob(asset_b))
+
+    @staticmethod
+    def shard_key(pool_key):
+        # Master global key of the shard holding a pair, see `registry.shard_index`
+        return Itob(Btoi(Extract(Sha256(pool_key), Int(0), Int(8))) % Int(REGISTRY_SHARDS))
 
     def on_create(self):
+        if self.sharded:
+            return Seq(
+                App.globalPut(self.Vars.pool_id_key, Txn.applications[1]),
+                App.globalPut(self.Vars.shard_id_key, Txn.applications[2]),
+                App.globalPut(self.Vars.gov_key, Txn.sender()),
+                Approve()
+            )
         return Seq(
             App.globalPut(self.Vars.pool_id_key, Txn.applications[1]),
             App.globalPut(self.Vars.gov_key, Txn.sender()),
@@ -55,6 +77,7 @@ class MasterContract:
         asset_a = Txn.assets[0]
         asset_b = Txn.assets[1]
         app_id = ScratchVar(TealType.uint64)
+        payment = Gtxn[Txn.group_index() - Int(1)]
         return Seq(
             Assert(
                 And(
@@ -62,6 +85,16 @@ class MasterContract:
                     asset_a < asset_b
                 )
             ),
+            # Pool creation is paid for by the txn right before this call
+            Assert(Txn.group_index() > Int(0)),
+            Assert(
+                And(
+                    payment.type_enum() == TxnType.Payment,
+                    payment.sender() == Txn.sender(),
+                    payment.receiver() == Global.current_application_address(),
+                    payment.amount() >= Int(POOL_CREATION_FEE),
+                )
+            ),
             pool_key_var.store(
                 Concat(Itob(asset_a), Bytes("_"), Itob(asset_b))
             ),
@@ -103,8 +136,150 @@ class MasterContract:
             Approve()
         )
 
+    def on_set_govener_sharded(self):
+        # Accounts: new governor; apps: pool, its registry shard
+        account = Txn.accounts[1]
+        key = ScratchVar(TealType.bytes)
+        shard = App.globalGetEx(Int(0), self.shard_key(key.load()))
+        has_pool = App.globalGetEx(Txn.applications[2], key.load())
+        asset_a = Txn.assets[0]
+        asset_b = Txn.assets[1]
+        pool_app_id = Txn.applications[1]
+        return Seq(
+            Assert(asset_a < asset_b),
+            key.store(self.pool_key(asset_a, asset_b)),
+            shard,
+            Assert(
+                And(
+                    shard.hasValue(),
+                    shard.value() == Txn.applications[2],
+                )
+            ),
+            has_pool,
+            Assert(has_pool.value() == pool_app_id),
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.ApplicationCall,
+                TxnField.on_completion: OnComplete.NoOp,
+                TxnField.application_id: pool_app_id,
+                TxnField.application_args: [Bytes("update")],
+                TxnField.accounts: [account]
+            }),
+            InnerTxnBuilder.Submit(),
+            Approve()
+        )
+
+    def on_new_pool_sharded(self):
+        # Apps: pool template, shard template and, once it exists, the shard
+        # of this pair; a missing shard is created and paid for by this call
+        key = ScratchVar(TealType.bytes)
+        shard_key = ScratchVar(TealType.bytes)
+        shard_id = ScratchVar(TealType.uint64)
+        exists = ScratchVar(TealType.uint64)
+        app_id = ScratchVar(TealType.uint64)
+
+        shard = App.globalGetEx(Int(0), shard_key.load())
+        has_pool = App.globalGetEx(Txn.applications[3], key.load())
+        pool_approval = AppParam.approvalProgram(Txn.applications[1])
+        pool_clear = AppParam.clearStateProgram(Txn.applications[1])
+        shard_approval = AppParam.approvalProgram(Txn.applications[2])
+        shard_clear = AppParam.clearStateProgram(Txn.applications[2])
+        asset_a = Txn.assets[0]
+        asset_b = Txn.assets[1]
+        payment = Gtxn[Txn.group_index() - Int(1)]
+        return Seq(
+            Assert(
+                And(
+                    App.globalGet(self.Vars.pool_id_key) == Txn.applications[1],
+                    App.globalGet(self.Vars.shard_id_key) == Txn.applications[2],
+                    asset_a < asset_b
+                )
+            ),
+            Assert(Txn.group_index() > Int(0)),
+            Assert(
+                And(
+                    payment.type_enum() == TxnType.Payment,
+                    payment.sender() == Txn.sender(),
+                    payment.receiver() == Global.current_application_address(),
+                    payment.amount() >= Int(POOL_CREATION_FEE),
+                )
+            ),
+            key.store(self.pool_key(asset_a, asset_b)),
+            shard_key.store(self.shard_key(key.load())),
+            shard,
+            If(shard.hasValue())
+            .Then(Seq(
+                shard_id.store(shard.value()),
+                Assert(Txn.applications[3] == shard_id.load()),
+                has_pool,
+                exists.store(has_pool.hasValue()),
+            ))
+            .Else(Seq(
+                Assert(payment.amount() >= Int(POOL_CREATION_FEE + SHARD_CREATION_FEE)),
+                shard_approval,
+                shard_clear,
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.ApplicationCall,
+                    TxnField.on_completion: OnComplete.NoOp,
+                    TxnField.approval_program: shard_approval.value(),
+                    TxnField.clear_state_program: shard_clear.value(),
+                    TxnField.global_num_uints: Int(SHARD_SCHEMA[0]),
+                    TxnField.global_num_byte_slices: Int(SHARD_SCHEMA[1]),
+                    TxnField.local_num_uints: Int(0),
+                    TxnField.local_num_byte_slices: Int(0)
+                }),
+                InnerTxnBuilder.Submit(),
+                shard_id.store(InnerTxn.created_application_id()),
+                App.globalPut(shard_key.load(), shard_id.load()),
+                exists.store(Int(0)),
+            )),
+            If(Not(exists.load())).Then(Seq(
+                pool_approval,
+                pool_clear,
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.ApplicationCall,
+                    TxnField.on_completion: OnComplete.NoOp,
+                    TxnField.approval_program: pool_approval.value(),
+                    TxnField.clear_state_program: pool_clear.value(),
+                    TxnField.global_num_uints: Int(32),
+                    TxnField.global_num_byte_slices: Int(32),
+                    TxnField.local_num_uints: Int(0),
+                    TxnField.local_num_byte_slices: Int(0)
+                }),
+                InnerTxnBuilder.Submit(),
+                app_id.store(InnerTxn.created_application_id()),
+
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.ApplicationCall,
+                    TxnField.on_completion: OnComplete.NoOp,
+                    TxnField.application_id: app_id.load(),
+                    TxnField.application_args: [Bytes("set")],
+                    TxnField.assets: [asset_a, asset_b]
+                }),
+                InnerTxnBuilder.Submit(),
+
+                InnerTxnBuilder.Begin(),
+                InnerTxnBuilder.SetFields({
+                    TxnField.type_enum: TxnType.ApplicationCall,
+                    TxnField.on_completion: OnComplete.NoOp,
+                    TxnField.application_id: shard_id.load(),
+                    TxnField.application_args: [Bytes("put"), key.load(), Itob(app_id.load())],
+                }),
+                InnerTxnBuilder.Submit(),
+            )),
+            Approve()
+        )
+
     def on_call(self):
         on_call_method = Txn.application_args[0]
+        if self.sharded:
+            return Cond(
+                [on_call_method == Bytes("new_pool"), self.on_new_pool_sharded()],
+                [on_call_method == Bytes("set_govener"), self.on_set_govener_sharded()],
+            )
         return Cond(
             [on_call_method == Bytes("new_pool"), self.on_new_pool()],
             [on_call_method == Bytes("set_govener"), self.on_set_govener()],
@@ -136,20 +311,7 @@ class MasterContract:
 
 
 if __name__ == "__main__":
-    path = os.path.dirname(os.path.abspath(__file__))
-
-    contract = MasterContract()
+    # python -m algox.contracts.master
+    from ..artifacts import main
 
-    with open(os.path.join(path, "master_approval.teal"), "w") as f:
-        compiled = compileTeal(
-            contract.approval_program(),
-            mode=Mode.Application, version=6
-        )
-        f.write(compiled)
-
-    with open(os.path.join(path, "master_clear.teal"), "w") as f:
-        compiled = compileTeal(
-            contract.clear_program(),
-            mode=Mode.Application, version=6
-        )
-        f.write(compiled)
+    main(["master"])
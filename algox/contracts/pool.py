@@ -1,4 +1,3 @@
-import os
 from pyteal import *
 
 tmpl_asset_a = Tmpl.Int("TMPL_ASSET_A")
@@ -10,6 +9,14 @@ scale = Int(1000)
 
 
 class PoolContract:
+    def __init__(self, optimized: bool = False, templated: bool = False) -> None:
+        # Optimized builds dispatch the user methods first and run swap from
+        # scratch-cached state; accepted and rejected groups are unchanged
+        self.optimized = optimized
+        # Templated builds read the pair from TMPL_ASSET_A/B, patched into the
+        # bytecode per pair, instead of from global state set by `set`
+        self.templated = templated
+
     class Vars:
         gov_key = Bytes("gov")
         pool_key = Bytes("p")
@@ -84,7 +91,27 @@ class PoolContract:
         factor = scale - fee
         return (inamt * factor * outsup) / ((insup * scale) + (inamt * factor))
 
+    def get_asset_a(self):
+        return tmpl_asset_a if self.templated else App.globalGet(self.Vars.asset_a_key)
+
+    def get_asset_b(self):
+        return tmpl_asset_b if self.templated else App.globalGet(self.Vars.asset_b_key)
+
+    def check_assets_set(self):
+        if self.templated:
+            return Seq()
+        return Assert(App.globalGet(self.Vars.assets_set_key) == Int(1))
+
     def on_create(self):
+        if self.templated:
+            # Pair is fixed at creation, so `set` is rejected from here on
+            return Seq(
+                App.globalPut(self.Vars.gov_key, Txn.sender()),
+                App.globalPut(self.Vars.asset_a_key, tmpl_asset_a),
+                App.globalPut(self.Vars.asset_b_key, tmpl_asset_b),
+                App.globalPut(self.Vars.assets_set_key, Int(1)),
+                Approve()
+            )
         return Seq(
             App.globalPut(self.Vars.gov_key, Txn.sender()),
             App.globalPut(self.Vars.asset_a_key, Int(0)),
@@ -94,9 +121,8 @@ class PoolContract:
         )
 
     def on_mint(self):
-        asset_a = App.globalGet(self.Vars.asset_a_key)
-        asset_b = App.globalGet(self.Vars.asset_b_key)
-        assets_set = App.globalGet(self.Vars.assets_set_key)
+        asset_a = self.get_asset_a()
+        asset_b = self.get_asset_b()
 
         mine = Global.current_application_address()
         pool_token = App.globalGet(self.Vars.pool_key)
@@ -106,7 +132,7 @@ class PoolContract:
         b_bal = AssetHolding.balance(mine, asset_b)
 
         return Seq(
-            Assert(assets_set == Int(1)),  # check if assets set
+            self.check_assets_set(),
             # Init MaybeValues
             pool_bal,
             a_bal,
@@ -152,9 +178,8 @@ class PoolContract:
         )
 
     def on_burn(self):
-        asset_a = App.globalGet(self.Vars.asset_a_key)
-        asset_b = App.globalGet(self.Vars.asset_b_key)
-        assets_set = App.globalGet(self.Vars.assets_set_key)
+        asset_a = self.get_asset_a()
+        asset_b = self.get_asset_b()
 
         mine = Global.current_application_address()
         pool_token = App.globalGet(self.Vars.pool_key)
@@ -164,7 +189,7 @@ class PoolContract:
         b_bal = AssetHolding.balance(mine, asset_b)
 
         return Seq(
-            Assert(assets_set == Int(1)),  # check if assets set
+            self.check_assets_set(),
             pool_bal,
             a_bal,
             b_bal,
@@ -206,9 +231,11 @@ class PoolContract:
         )
 
     def on_swap(self):
-        asset_a = App.globalGet(self.Vars.asset_a_key)
-        asset_b = App.globalGet(self.Vars.asset_b_key)
-        assets_set = App.globalGet(self.Vars.assets_set_key)
+        if self.optimized:
+            return self.on_swap_optimized()
+
+        asset_a = self.get_asset_a()
+        asset_b = self.get_asset_b()
 
         mine = Global.current_application_address()
 
@@ -223,7 +250,7 @@ class PoolContract:
         out_sup = AssetHolding.balance(mine, out_id)
 
         return Seq(
-            Assert(assets_set == Int(1)),  # check if assets set
+            self.check_assets_set(),
             in_sup,
             out_sup,
             Assert(
@@ -252,22 +279,164 @@ class PoolContract:
             Approve(),
         )
 
-    def on_bootstrap(self):
-        asset_a = App.globalGet(self.Vars.asset_a_key)
-        asset_b = App.globalGet(self.Vars.asset_b_key)
-        assets_set = App.globalGet(self.Vars.assets_set_key)
-        gov = App.globalGet(self.Vars.gov_key)
+    def on_swap_optimized(self):
+        asset_a = ScratchVar(TealType.uint64)
+        asset_b = ScratchVar(TealType.uint64)
+        in_id = ScratchVar(TealType.uint64)
+        out_id = ScratchVar(TealType.uint64)
+        in_amt = ScratchVar(TealType.uint64)
+
+        mine = Global.current_application_address()
+        factor = Int(scale.value - fee.value)
+
+        in_sup = AssetHolding.balance(mine, in_id.load())
+        out_sup = AssetHolding.balance(mine, out_id.load())
 
         return Seq(
-            Assert(assets_set == Int(1)),  # check if assets set
+            self.check_assets_set(),
+            asset_a.store(self.get_asset_a()),
+            asset_b.store(self.get_asset_b()),
+            in_id.store(Gtxn[1].xfer_asset()),
+            in_amt.store(Gtxn[1].asset_amount()),
             Assert(
                 And(
-                    Global.group_size() == Int(1),
+                    Global.group_size() == Int(2),
+                    Txn.assets[0] == asset_a.load(),
+                    Txn.assets[1] == asset_b.load(),
                     Gtxn[0].type_enum() == TxnType.ApplicationCall,
-                    And(
-                        Txn.assets[0] == asset_a,
-                        Txn.assets[1] == asset_b
+                    Gtxn[1].type_enum() == TxnType.AssetTransfer,
+                    in_amt.load() > Int(0),
+                )
+            ),
+            If(in_id.load() == asset_a.load())
+            .Then(out_id.store(asset_b.load()))
+            .ElseIf(in_id.load() == asset_b.load())
+            .Then(out_id.store(asset_a.load()))
+            .Else(Err()),
+            in_sup,
+            out_sup,
+            Assert(And(in_sup.hasValue(), out_sup.hasValue())),
+            # swap_tokens and axfer inlined to skip the subroutine calls
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields(
+                {
+                    TxnField.type_enum: TxnType.AssetTransfer,
+                    TxnField.xfer_asset: out_id.load(),
+                    TxnField.asset_amount: (in_amt.load() * factor * out_sup.value())
+                    / ((in_sup.value() * scale) + (in_amt.load() * factor)),
+                    TxnField.asset_receiver: Gtxn[1].sender(),
+                }
+            ),
+            InnerTxnBuilder.Submit(),
+            Approve(),
+        )
+
+    def on_multiswap(self):
+        # App call followed by `n` transfers into this pool, each settled as a
+        # swap against reserves that include the earlier legs of the batch
+        asset_a = ScratchVar(TealType.uint64)
+        asset_b = ScratchVar(TealType.uint64)
+        res_a = ScratchVar(TealType.uint64)
+        res_b = ScratchVar(TealType.uint64)
+        last = ScratchVar(TealType.uint64)
+        idx = ScratchVar(TealType.uint64)
+        in_amt = ScratchVar(TealType.uint64)
+        out_amt = ScratchVar(TealType.uint64)
+        out_id = ScratchVar(TealType.uint64)
+
+        mine = Global.current_application_address()
+        factor = Int(scale.value - fee.value)
+        leg = Gtxn[idx.load()]
+
+        bal_a = AssetHolding.balance(mine, asset_a.load())
+        bal_b = AssetHolding.balance(mine, asset_b.load())
+
+        return Seq(
+            self.check_assets_set(),
+            asset_a.store(self.get_asset_a()),
+            asset_b.store(self.get_asset_b()),
+            Assert(
+                And(
+                    Txn.application_args.length() == Int(2),
+                    Txn.assets[0] == asset_a.load(),
+                    Txn.assets[1] == asset_b.load(),
+                )
+            ),
+            last.store(Txn.group_index() + Btoi(Txn.application_args[1])),
+            Assert(And(last.load() > Txn.group_index(), last.load() < Global.group_size())),
+            bal_a,
+            bal_b,
+            Assert(And(bal_a.hasValue(), bal_b.hasValue())),
+            res_a.store(bal_a.value()),
+            res_b.store(bal_b.value()),
+            For(
+                idx.store(Txn.group_index() + Int(1)),
+                idx.load() <= last.load(),
+                idx.store(idx.load() + Int(1)),
+            ).Do(
+                Seq(
+                    Assert(
+                        And(
+                            leg.type_enum() == TxnType.AssetTransfer,
+                            leg.asset_receiver() == mine,
+                            leg.asset_amount() > Int(0),
+                        )
                     ),
+                    in_amt.store(leg.asset_amount()),
+                    # swap_tokens and axfer are inlined to fit more legs per call
+                    If(leg.xfer_asset() == asset_a.load())
+                    .Then(
+                        Seq(
+                            out_amt.store(
+                                (in_amt.load() * factor * res_b.load())
+                                / ((res_a.load() * scale) + (in_amt.load() * factor))
+                            ),
+                            res_a.store(res_a.load() + in_amt.load()),
+                            res_b.store(res_b.load() - out_amt.load()),
+                            out_id.store(asset_b.load()),
+                        )
+                    )
+                    .ElseIf(leg.xfer_asset() == asset_b.load())
+                    .Then(
+                        Seq(
+                            out_amt.store(
+                                (in_amt.load() * factor * res_a.load())
+                                / ((res_b.load() * scale) + (in_amt.load() * factor))
+                            ),
+                            res_b.store(res_b.load() + in_amt.load()),
+                            res_a.store(res_a.load() - out_amt.load()),
+                            out_id.store(asset_a.load()),
+                        )
+                    )
+                    .Else(Err()),
+                    InnerTxnBuilder.Begin(),
+                    InnerTxnBuilder.SetFields(
+                        {
+                            TxnField.type_enum: TxnType.AssetTransfer,
+                            TxnField.xfer_asset: out_id.load(),
+                            TxnField.asset_amount: out_amt.load(),
+                            TxnField.asset_receiver: leg.sender(),
+                        }
+                    ),
+                    InnerTxnBuilder.Submit(),
+                )
+            ),
+            Approve(),
+        )
+
+    def on_bootstrap(self):
+        asset_a = self.get_asset_a()
+        asset_b = self.get_asset_b()
+        gov = App.globalGet(self.Vars.gov_key)
+
+        # No group layout is required, so the governor can seed the app
+        # account and boot it in the same group as `set_govener`
+        return Seq(
+            self.check_assets_set(),
+            Assert(
+                And(
+                    Txn.assets[0] == asset_a,
+                    Txn.assets[1] == asset_b
                 )
             ),
             Assert(gov == Txn.sender()),
@@ -278,36 +447,46 @@ class PoolContract:
         )
 
     def on_fund(self):
-        assets_set = App.globalGet(self.Vars.assets_set_key)
-        asset_a = App.globalGet(self.Vars.asset_a_key)
-        asset_b = App.globalGet(self.Vars.asset_b_key)
+        mine = Global.current_application_address()
+        asset_a = self.get_asset_a()
+        asset_b = self.get_asset_b()
         pool_token = App.globalGet(self.Vars.pool_key)
 
+        # The deposits follow the app call, which may itself follow other
+        # transactions such as the funder's pool token opt-in
+        a_idx = ScratchVar(TealType.uint64)
+        b_idx = ScratchVar(TealType.uint64)
+        a_xfer = Gtxn[a_idx.load()]
+        b_xfer = Gtxn[b_idx.load()]
+
         return Seq(
-            Assert(assets_set == Int(1)),
+            self.check_assets_set(),
+            a_idx.store(Txn.group_index() + Int(1)),
+            b_idx.store(Txn.group_index() + Int(2)),
             Assert(
                 And(
-                    Global.group_size() == Int(3),
-                    Gtxn[0].type_enum() == TxnType.ApplicationCall,
+                    b_idx.load() < Global.group_size(),  # App call, Asset A, Asset B
                     And(
                         Txn.assets[0] == asset_a,
                         Txn.assets[1] == asset_b,
                         Txn.assets[2] == pool_token
                     ),
-                    Gtxn[1].type_enum() == TxnType.AssetTransfer,
-                    Gtxn[1].xfer_asset() == asset_a,
-                    Gtxn[1].asset_amount() > Int(0),
-                    Gtxn[1].sender() == Gtxn[0].sender(),
-                    Gtxn[2].type_enum() == TxnType.AssetTransfer,
-                    Gtxn[2].xfer_asset() == asset_b,
-                    Gtxn[2].asset_amount() > Int(0),
-                    Gtxn[2].sender() == Gtxn[0].sender(),
+                    a_xfer.type_enum() == TxnType.AssetTransfer,
+                    a_xfer.asset_receiver() == mine,
+                    a_xfer.xfer_asset() == asset_a,
+                    a_xfer.asset_amount() > Int(0),
+                    a_xfer.sender() == Txn.sender(),
+                    b_xfer.type_enum() == TxnType.AssetTransfer,
+                    b_xfer.asset_receiver() == mine,
+                    b_xfer.xfer_asset() == asset_b,
+                    b_xfer.asset_amount() > Int(0),
+                    b_xfer.sender() == Txn.sender(),
                 )
             ),
             self.axfer(
-                Gtxn[0].sender(),
+                Txn.sender(),
                 pool_token,
-                Sqrt(Gtxn[1].asset_amount() * Gtxn[2].asset_amount()) - scale,
+                Sqrt(a_xfer.asset_amount() * b_xfer.asset_amount()) - scale,
             ),
             Approve()
         )
@@ -342,6 +521,18 @@ class PoolContract:
 
     def on_call(self):
         on_call_method = Txn.application_args[0]
+        if self.optimized:
+            return Cond(
+                # Hot path first
+                [on_call_method == Bytes("swap"), self.on_swap()],
+                [on_call_method == Bytes("multiswap"), self.on_multiswap()],
+                [on_call_method == Bytes("mint"), self.on_mint()],
+                [on_call_method == Bytes("burn"), self.on_burn()],
+                [on_call_method == Bytes("boot"), self.on_bootstrap()],
+                [on_call_method == Bytes("fund"), self.on_fund()],
+                [on_call_method == Bytes("update"), self.on_update_governor()],
+                [on_call_method == Bytes("set"), self.on_set_assets()],
+            )
         return Cond(
             # Users
             [on_call_method == Bytes("mint"), self.on_mint()],
@@ -352,10 +543,26 @@ class PoolContract:
             [on_call_method == Bytes("fund"), self.on_fund()],
             [on_call_method == Bytes("update"), self.on_update_governor()],
             [on_call_method == Bytes("set"), self.on_set_assets()],
+            [on_call_method == Bytes("multiswap"), self.on_multiswap()],
         )
 
     def approval_program(self):
         gov = App.globalGet(self.Vars.gov_key)
+        if self.optimized:
+            # OnCompletion values are exclusive, so NoOp can be tested first
+            return Cond(
+                [Txn.application_id() == Int(0), self.on_create()],
+                [Txn.on_completion() == OnComplete.NoOp, self.on_call()],
+                [
+                    Or(
+                        Txn.on_completion() == OnComplete.DeleteApplication,
+                        Txn.on_completion() == OnComplete.UpdateApplication,
+                    ),
+                    Return(gov == Txn.sender())
+                ],
+                [Txn.on_completion() == OnComplete.CloseOut, Approve()],
+                [Txn.on_completion() == OnComplete.OptIn, Reject()],
+            )
         return Cond(
             [Txn.application_id() == Int(0), self.on_create()],
             [
@@ -375,24 +582,7 @@ class PoolContract:
 
 
 if __name__ == "__main__":
-    path = os.path.dirname(os.path.abspath(__file__))
-
-    contract = PoolContract()
+    # python -m algox.contracts.pool
+    from ..artifacts import main
 
-    with open(os.path.join(path, "pool_approval.teal"), "w") as f:
-        compiled = compileTeal(
-            contract.approval_program(), 
-            mode=Mode.Application, 
-            version=6, 
-            assembleConstants=True
-        )
-        f.write(compiled)
-
-    with open(os.path.join(path, "pool_clear.teal"), "w") as f:
-        compiled = compileTeal(
-            contract.clear_program(), 
-            mode=Mode.Application, 
-            version=6, 
-            assembleConstants=True
-        )
-        f.write(compiled)
+    main(["pool"])
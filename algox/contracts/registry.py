@@ -0,0 +1,48 @@
+from pyteal import *
+
+
+class RegistryShard:
+    """One shard of a sharded MasterContract's pool registry
+
+    Holds up to 64 `itob(a) + "_" + itob(b)` -> pool app id entries in its
+    global state. Only the master that created the shard can add entries,
+    and an entry is never overwritten.
+    """
+
+    def on_put(self):
+        key = Txn.application_args[1]
+        existing = App.globalGetEx(Int(0), key)
+        return Seq(
+            existing,
+            Assert(
+                And(
+                    Txn.sender() == Global.creator_address(),
+                    Txn.application_args.length() == Int(3),
+                    Not(existing.hasValue()),
+                )
+            ),
+            App.globalPut(key, Btoi(Txn.application_args[2])),
+            Approve()
+        )
+
+    def approval_program(self):
+        return Cond(
+            [Txn.application_id() == Int(0), Approve()],
+            [
+                And(
+                    Txn.on_completion() == OnComplete.NoOp,
+                    Txn.application_args[0] == Bytes("put"),
+                ),
+                self.on_put()
+            ],
+        )
+
+    def clear_program(self):
+        return Approve()
+
+
+if __name__ == "__main__":
+    # python -m algox.contracts.registry
+    from ..artifacts import main
+
+    main(["registry"])
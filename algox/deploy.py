@@ -0,0 +1,340 @@
+"""Concurrent onboarding of many asset pairs
+
+Every group needed to bring a pair live becomes a `Step` that depends on the
+steps whose results it needs. A `Deployment` submits every step whose
+dependencies have confirmed at once through a `Submitter`, so the steps of
+different pairs share rounds. Onboarding takes as many rounds as the longest
+chain of steps, whatever the number of pairs:
+
+    template -> master -> create_pool -> boot -> fund -> mint
+
+`boot` is `set_govener`, the algo seeding and `boot` in one group, `fund` the
+pool token opt-in and the initial liquidity, see `operations.get_boot_group`.
+
+Pairs whose pool already exists resume where they stopped: an unbooted pool
+gets boot, fund and mint, a booted but unfunded one fund and mint, and a
+funded one is reported live with nothing sent. Rerunning a deployment after
+a partial failure therefore finishes it.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from algosdk.future import transaction
+from algosdk.logic import get_application_address
+from algosdk.v2client.algod import AlgodClient
+
+from . import artifacts
+from .account import Account
+from .constants import POOL_CREATION_FEE, SHARD_CREATION_FEE
+from .math import TOTAL_SUPPLY
+from .operations import (
+    get_app_call, get_asset_xfer, get_boot_group, get_fund_group, get_master_contracts, get_pool_contracts,
+)
+from .params import suggested_params
+from .registry import PoolRegistry, check_shard_capacity, registered_pool, shard_index
+from .state import PoolState
+from .submit import Submitter
+from .utils import PendingTxnResponse
+
+Pair = Tuple[int, int]
+Builder = Callable[[transaction.SuggestedParams], List[transaction.Transaction]]
+
+
+class Step:
+    """One group of a deployment, built once its dependencies have confirmed"""
+
+    def __init__(self, name: str, build: Builder, deps: Iterable["Step"] = (),
+                 pair: Optional[Pair] = None, done: Optional[Callable[[PendingTxnResponse], None]] = None,
+                 txn_index: int = 0) -> None:
+        self.name = name
+        self.build = build
+        self.deps = list(deps)
+        self.pair = pair
+        self.done = done
+        # Transaction of the group whose response `done` gets
+        self.txn_index = txn_index
+
+        self.response: Optional[PendingTxnResponse] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def ready(self) -> bool:
+        return all(d.response is not None for d in self.deps)
+
+    @property
+    def blocked(self) -> bool:
+        return any(d.error is not None for d in self.deps)
+
+    def __repr__(self) -> str:
+        return "Step({}{})".format(self.name, " {}/{}".format(*self.pair) if self.pair else "")
+
+
+class PairDeployment:
+    """Ids created for one pair, and the error that stopped it if any"""
+
+    def __init__(self, asset_a: int, asset_b: int) -> None:
+        self.asset_a = asset_a
+        self.asset_b = asset_b
+        self.pool_id: Optional[int] = None
+        self.pool_token: Optional[int] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def live(self) -> bool:
+        return self.error is None and self.pool_token is not None
+
+    def __repr__(self) -> str:
+        return "PairDeployment({}/{}, pool_id={}, pool_token={}, error={!r})".format(
+            self.asset_a, self.asset_b, self.pool_id, self.pool_token, self.error)
+
+
+class Deployment:
+    """Create, boot and fund the pools of many pairs at once
+
+    Missing template and master apps are created first. For a sharded master
+    pass `shard_template_id`; pairs that would create the same new registry
+    shard are then chained, since only the first pool of a shard creates it,
+    and pairs whose shard would overflow fail without being sent.
+    """
+
+    def __init__(self, client: AlgodClient, sender: Account,
+                 master_app_id: Optional[int] = None, template_pool_id: Optional[int] = None,
+                 shard_template_id: Optional[int] = None, registry: Optional[PoolRegistry] = None,
+                 seed_amount: int = 10_000_000, fund_amounts: Pair = (1000, 3000),
+                 mint_amounts: Pair = (100000, 10000), window: int = 256) -> None:
+        self.client = client
+        self.sender = sender
+        self.master_app_id = master_app_id
+        self.template_pool_id = template_pool_id
+        self.shard_template_id = shard_template_id
+        self.registry = registry
+        self.seed_amount = seed_amount
+        self.fund_amounts = fund_amounts
+        self.mint_amounts = mint_amounts
+        self.window = window
+
+        self.steps: List[Step] = []
+        self.pairs: Dict[Pair, PairDeployment] = {}
+
+    def plan(self, pairs: Iterable[Pair]) -> List[Step]:
+        """Steps for the shared apps and for every pair, each after its dependencies"""
+        self.steps = []
+        template = master = None
+        if self.template_pool_id is None:
+            template = self._add(Step("template", self._build_template, done=self._template_done))
+        if self.master_app_id is None:
+            master = self._add(Step("master", self._build_master, [template] if template else [],
+                                    done=self._master_done))
+        elif self.registry is None:
+            self.registry = PoolRegistry(self.client, self.master_app_id).load()
+
+        new_shards: Dict[int, Step] = {}
+        planned: Dict[int, int] = {}
+        for asset_a, asset_b in pairs:
+            if asset_a > asset_b:
+                asset_a, asset_b = asset_b, asset_a
+            pair = (asset_a, asset_b)
+            if pair in self.pairs:
+                continue
+            self.pairs[pair] = PairDeployment(*pair)
+            pool_id = self.registry.lookup(*pair) if self.registry is not None else None
+            if pool_id is not None:
+                self._resume(pair, pool_id)
+                continue
+
+            deps = [s for s in (template, master) if s is not None]
+            if self.shard_template_id is not None:
+                index = shard_index(*pair)
+                existing = self.registry.shard_size(*pair) if self.registry is not None else 0
+                try:
+                    check_shard_capacity(existing + planned.get(index, 0), *pair)
+                except Exception as e:
+                    self.pairs[pair].error = e
+                    print("{}/{} skipped: {}".format(asset_a, asset_b, e))
+                    continue
+                planned[index] = planned.get(index, 0) + 1
+                if index in new_shards:
+                    deps.append(new_shards[index])
+            created = self._add(Step("create_pool", self._build_create_pool(pair), deps, pair,
+                                     self._create_pool_done(pair), txn_index=1))
+            if self.shard_template_id is not None and (self.registry is None or self.registry.shard(*pair) is None):
+                new_shards.setdefault(shard_index(*pair), created)
+
+            boot = self._add(Step("boot", self._build_boot(pair), [created], pair, self._boot_done(pair), txn_index=-1))
+            fund = self._add(Step("fund", self._build_fund(pair), [boot], pair))
+            self._add(Step("mint", self._build_mint(pair), [fund], pair))
+        return self.steps
+
+    def run(self, pairs: Iterable[Pair]) -> Dict[Pair, PairDeployment]:
+        """Deploy every pair; a failed step only stops the steps that depend on it"""
+        steps = self.plan(pairs)
+        dependents: Dict[Step, List[Step]] = {}
+        for step in steps:
+            for dep in step.deps:
+                dependents.setdefault(dep, []).append(step)
+        remaining = {step: len(step.deps) for step in steps}
+        ready = [step for step in steps if not step.deps]
+        running: Dict[Future, Tuple[Step, str]] = {}
+        rounds = set()
+
+        def finished(step: Step):
+            for nxt in dependents.get(step, []):
+                remaining[nxt] -= 1
+                if remaining[nxt] == 0:
+                    ready.append(nxt)
+
+        with Submitter(self.client, self.window) as submitter:
+            while ready or running:
+                sp = suggested_params(self.client) if ready else None
+                while ready:
+                    step = ready.pop()
+                    if step.blocked:
+                        step.error = Exception("{} skipped after a failed dependency".format(step.name))
+                        finished(step)
+                        continue
+                    group = step.build(sp)
+                    if len(group) > 1:
+                        group = transaction.assign_group_id(group)
+                    signed = [t.sign(self.sender.get_private_key()) for t in group]
+                    running[submitter.submit(signed)] = (step, signed[step.txn_index].get_txid())
+
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    step, txid = running.pop(fut)
+                    try:
+                        step.response = fut.result()
+                        if step.txn_index:
+                            step.response = PendingTxnResponse(self.client.pending_transaction_info(txid))
+                        rounds.add(step.response.confirmed_round)
+                        if step.done is not None:
+                            step.done(step.response)
+                    except Exception as e:
+                        step.response = None
+                        step.error = e
+                        print("{} failed: {}".format(step, e))
+                    finished(step)
+
+        for step in self.steps:
+            if step.error is None:
+                continue
+            targets = [self.pairs[step.pair]] if step.pair else list(self.pairs.values())
+            for target in targets:
+                target.error = target.error or step.error
+
+        live = sum(1 for p in self.pairs.values() if p.live)
+        print("Deployed {} of {} pairs in {} rounds".format(live, len(self.pairs), len(rounds)))
+        return self.pairs
+
+    def _resume(self, pair: Pair, pool_id: int):
+        """Plan the steps an existing pool still needs"""
+        deployment = self.pairs[pair]
+        deployment.pool_id = pool_id
+        deployment.pool_token = PoolState.fetch(self.client, pool_id).pool_token
+        boot = None
+        if deployment.pool_token is None:
+            boot = self._add(Step("boot", self._build_boot(pair), [], pair, self._boot_done(pair), txn_index=-1))
+        else:
+            info = self.client.account_info(get_application_address(pool_id))
+            held = {h["asset-id"]: h["amount"] for h in info.get("assets", [])}
+            if held.get(deployment.pool_token, TOTAL_SUPPLY) < TOTAL_SUPPLY:
+                print("{}/{} is already live in pool {}".format(pair[0], pair[1], pool_id))
+                return
+        print("Resuming {}/{} at {}".format(pair[0], pair[1], "boot" if boot else "fund"))
+        fund = self._add(Step("fund", self._build_fund(pair), [boot] if boot else [], pair))
+        self._add(Step("mint", self._build_mint(pair), [fund], pair))
+
+    def _add(self, step: Step) -> Step:
+        self.steps.append(step)
+        return step
+
+    def _address(self) -> str:
+        return self.sender.get_address()
+
+    def _build_app(self, sp: transaction.SuggestedParams, programs: Tuple[bytes, bytes], contract: str,
+                   build: str, foreign_apps: Optional[List[int]] = None) -> List[transaction.Transaction]:
+        schema = artifacts.schema(contract, build)
+        return [transaction.ApplicationCreateTxn(
+            self._address(), sp, transaction.OnComplete.NoOpOC, programs[0], programs[1],
+            transaction.StateSchema(*schema["global"]), transaction.StateSchema(*schema["local"]),
+            foreign_apps=foreign_apps,
+        )]
+
+    def _build_template(self, sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+        return self._build_app(sp, get_pool_contracts(self.client, 0, 0), "pool", "default")
+
+    def _template_done(self, response: PendingTxnResponse):
+        self.template_pool_id = response.application_index
+
+    def _build_master(self, sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+        sharded = self.shard_template_id is not None
+        foreign_apps = [self.template_pool_id] + ([self.shard_template_id] if sharded else [])
+        programs = get_master_contracts(self.client, sharded=sharded)
+        return self._build_app(sp, programs, "master", "sharded" if sharded else "default", foreign_apps)
+
+    def _master_done(self, response: PendingTxnResponse):
+        self.master_app_id = response.application_index
+        self.registry = PoolRegistry(self.client, self.master_app_id).load()
+
+    def _build_create_pool(self, pair: Pair) -> Builder:
+        def build(sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+            amount = POOL_CREATION_FEE
+            apps = [self.template_pool_id]
+            if self.shard_template_id is not None:
+                shard_id = self.registry.shard(*pair)
+                apps.append(self.shard_template_id)
+                if shard_id is None:
+                    amount += SHARD_CREATION_FEE
+                else:
+                    apps.append(shard_id)
+            return [
+                transaction.PaymentTxn(self._address(), sp, get_application_address(self.master_app_id), amount),
+                get_app_call(self._address(), sp, self.master_app_id, ["new_pool"], list(pair), apps=apps),
+            ]
+        return build
+
+    def _create_pool_done(self, pair: Pair) -> Callable[[PendingTxnResponse], None]:
+        def done(response: PendingTxnResponse):
+            self.registry.apply(response)
+            pool_id = registered_pool(response, *pair)
+            if pool_id is None:
+                raise Exception("new_pool did not register {}/{}".format(*pair))
+            self.pairs[pair].pool_id = pool_id
+        return done
+
+    def _build_boot(self, pair: Pair) -> Builder:
+        def build(sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+            shard_id = self.registry.shard(*pair) if self.shard_template_id is not None else None
+            return get_boot_group(self._address(), sp, self.pairs[pair].pool_id, pair[0], pair[1],
+                                  self.seed_amount, self.master_app_id, shard_id)
+        return build
+
+    def _boot_done(self, pair: Pair) -> Callable[[PendingTxnResponse], None]:
+        def done(response: PendingTxnResponse):
+            self.pairs[pair].pool_token = response.inner_txns[0]["asset-index"]
+        return done
+
+    def _build_fund(self, pair: Pair) -> Builder:
+        def build(sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+            deployment = self.pairs[pair]
+            return get_fund_group(self._address(), sp, deployment.pool_id, deployment.asset_a, deployment.asset_b,
+                                  deployment.pool_token, *self.fund_amounts)
+        return build
+
+    def _build_mint(self, pair: Pair) -> Builder:
+        def build(sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+            deployment = self.pairs[pair]
+            pool_addr = get_application_address(deployment.pool_id)
+            return [
+                get_app_call(self._address(), sp, deployment.pool_id, ["mint"],
+                             [deployment.asset_a, deployment.asset_b, deployment.pool_token]),
+                get_asset_xfer(self._address(), sp, deployment.asset_a, pool_addr, self.mint_amounts[0]),
+                get_asset_xfer(self._address(), sp, deployment.asset_b, pool_addr, self.mint_amounts[1]),
+            ]
+        return build
+
+
+def deploy_pairs(client: AlgodClient, sender: Account, pairs: Iterable[Pair], **kwargs) -> Dict[Pair, PairDeployment]:
+    """Bring every pair live concurrently, see `Deployment`"""
+    return Deployment(client, sender, **kwargs).run(pairs)
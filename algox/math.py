@@ -0,0 +1,147 @@
+"""Off-chain mirror of the PoolContract token math.
+
+Every function reproduces the uint64 semantics of the AVM exactly: division
+truncates, and any expression the contract would reject (overflow on ``+`` or
+``*``, underflow on ``-``, division by zero) is flagged instead of silently
+wrapping. Inputs may be Python ints or NumPy arrays and broadcast against
+each other, so thousands of quotes can be computed in a single call.
+
+Each function returns ``(value, ok)`` where ``ok`` is a boolean array marking
+the elements for which the contract would have approved the computation.
+``value`` is meaningless where ``ok`` is False.
+"""
+from typing import Tuple
+
+import numpy as np
+
+FEE = 5
+SCALE = 1000
+TOTAL_SUPPLY = int(1e10)
+
+UINT64_MAX = 2**64 - 1
+
+_ZERO = np.uint64(0)
+_ONE = np.uint64(1)
+_MAX = np.uint64(UINT64_MAX)
+_SQRT_MAX = np.uint64(2**32 - 1)
+
+Quote = Tuple[np.ndarray, np.ndarray]
+
+
+def u64(x) -> np.ndarray:
+    """Coerce ints or array-likes to a uint64 array, rejecting negatives"""
+    arr = np.asarray(x)
+    if arr.dtype.kind == "i" and (arr < 0).any():
+        raise ValueError("uint64 values cannot be negative")
+    if arr.dtype.kind == "O" and any(int(v) < 0 or int(v) > UINT64_MAX for v in arr.flat):
+        raise ValueError("value out of uint64 range")
+    return arr.astype(np.uint64)
+
+
+def _ok(*arrays) -> np.ndarray:
+    return np.ones(np.broadcast(*arrays).shape, dtype=bool)
+
+
+def _add(a, b, ok):
+    with np.errstate(over="ignore"):
+        s = a + b
+    return s, ok & (s >= a)
+
+
+def _sub(a, b, ok):
+    with np.errstate(over="ignore"):
+        d = a - b
+    return d, ok & (a >= b)
+
+
+def _mul(a, b, ok):
+    bad = (a != _ZERO) & (b > _MAX // np.maximum(a, _ONE))
+    with np.errstate(over="ignore"):
+        p = a * b
+    return p, ok & ~bad
+
+
+def _div(a, b, ok):
+    zero = b == _ZERO
+    return a // np.where(zero, _ONE, b), ok & ~zero
+
+
+def _sqrt(x):
+    # Float sqrt is within one ulp, nudge it onto the exact integer root
+    r = np.minimum(np.sqrt(x.astype(np.float64)).astype(np.uint64), _SQRT_MAX)
+    with np.errstate(over="ignore"):
+        for _ in range(2):
+            r = np.where(r * r > x, r - _ONE, r)
+        for _ in range(2):
+            r1 = r + _ONE
+            r = np.where((r1 <= _SQRT_MAX) & (r1 * r1 <= x), r1, r)
+    return r
+
+
+def pool_issued(pool_bal, total_supply: int = TOTAL_SUPPLY) -> Quote:
+    """Pool tokens in circulation, `total_supply - pool_bal`"""
+    pool_bal = u64(pool_bal)
+    return _sub(np.uint64(total_supply), pool_bal, _ok(pool_bal))
+
+
+def mint_tokens(issued, asup, bsup, aamt, bamt) -> Quote:
+    """Mirror of `PoolContract.mint_tokens`"""
+    issued, asup, bsup, aamt, bamt = map(u64, (issued, asup, bsup, aamt, bamt))
+    ok = _ok(issued, asup, bsup, aamt, bamt)
+    ra, ok = _div(aamt, asup, ok)
+    rb, ok = _div(bamt, bsup, ok)
+    return _mul(np.minimum(ra, rb), issued, ok)
+
+
+def burn_tokens(issued, sup, amt) -> Quote:
+    """Mirror of `PoolContract.burn_tokens`"""
+    issued, sup, amt = map(u64, (issued, sup, amt))
+    ok = _ok(issued, sup, amt)
+    share, ok = _div(amt, issued, ok)
+    return _mul(sup, share, ok)
+
+
+def swap_tokens(inamt, insup, outsup, fee: int = FEE, scale: int = SCALE) -> Quote:
+    """Mirror of `PoolContract.swap_tokens`"""
+    inamt, insup, outsup, fee, scale = map(u64, (inamt, insup, outsup, fee, scale))
+    ok = _ok(inamt, insup, outsup, fee, scale)
+    factor, ok = _sub(scale, fee, ok)
+    num, ok = _mul(inamt, factor, ok)
+    num, ok = _mul(num, outsup, ok)
+    den_a, ok = _mul(insup, scale, ok)
+    den_b, ok = _mul(inamt, factor, ok)
+    den, ok = _add(den_a, den_b, ok)
+    return _div(num, den, ok)
+
+
+def fund_tokens(aamt, bamt, scale: int = SCALE) -> Quote:
+    """Pool tokens issued by `on_fund`, `sqrt(aamt * bamt) - scale`"""
+    aamt, bamt, scale = map(u64, (aamt, bamt, scale))
+    ok = _ok(aamt, bamt, scale)
+    prod, ok = _mul(aamt, bamt, ok)
+    return _sub(_sqrt(prod), scale, ok)
+
+
+def quote_swap(amount, reserve_in, reserve_out, fee: int = FEE, scale: int = SCALE) -> Quote:
+    """Output of a `swap` call given the pool's reserves before the call"""
+    out, ok = swap_tokens(amount, reserve_in, reserve_out, fee, scale)
+    return out, ok & (u64(amount) > _ZERO)
+
+
+def quote_mint(a_amt, b_amt, reserve_a, reserve_b, pool_bal,
+               total_supply: int = TOTAL_SUPPLY) -> Quote:
+    """Pool tokens returned by a `mint` call given the pool's balances"""
+    issued, ok = pool_issued(pool_bal, total_supply)
+    out, mint_ok = mint_tokens(issued, reserve_a, reserve_b, a_amt, b_amt)
+    ok = ok & mint_ok & (u64(a_amt) > _ZERO) & (u64(b_amt) > _ZERO)
+    return out, ok & (out <= u64(pool_bal))
+
+
+def quote_burn(pool_amt, reserve_a, reserve_b, pool_bal,
+               total_supply: int = TOTAL_SUPPLY) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Amounts of A and B returned by a `burn` call, as `(a_out, b_out, ok)`"""
+    issued, ok = pool_issued(pool_bal, total_supply)
+    a_out, a_ok = burn_tokens(issued, reserve_a, pool_amt)
+    b_out, b_ok = burn_tokens(issued, reserve_b, pool_amt)
+    ok = ok & a_ok & b_ok & (a_out <= u64(reserve_a)) & (b_out <= u64(reserve_b))
+    return a_out, b_out, ok
@@ -1,13 +1,19 @@
 import base64
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from algosdk.future import transaction
 from algosdk.v2client.algod import AlgodClient
 from algosdk.logic import get_application_address
-from pyteal import compileTeal, Mode, Int
+from . import artifacts
 from .account import Account
-from .contracts.master import MasterContract
-from .contracts.pool import PoolContract
-from .utils import fully_compile_contract, wait_for_transaction
+from .balances import BalanceCache
+from .cache import CompileCache
+from .constants import POOL_CREATION_FEE, POOL_TEMPLATE, SHARD_CREATION_FEE, TEAL_VERSION
+from .params import observe_round, suggested_params
+from .registry import PoolRegistry, check_shard_capacity, pool_key, registered_pool
+from .state import GlobalState, MasterState
+from .utils import PendingTxnResponse, fully_compile_contract, wait_for_transaction
+
+compile_cache = CompileCache()
 
 
 def fund_if_needed(client: AlgodClient, funder: str, pk: str, app: str):
@@ -20,7 +26,7 @@ def fund_if_needed(client: AlgodClient, funder: str, pk: str, app: str):
 
     if fund:
         # Fund App address
-        sp = client.suggested_params()
+        sp = suggested_params(client)
         txn_group = [transaction.PaymentTxn(funder, sp, app, 10000000)]
         return send(client, "seed", [txn.sign(pk) for txn in txn_group])
 
@@ -31,8 +37,17 @@ def write_dryrun(name: str, client: AlgodClient, txns: transaction.List[transact
         f.write(base64.b64decode(transaction.encoding.msgpack_encode(drr)))
 
 
-def print_balances(client:AlgodClient, app: str, addr: str, pool: int, a: int, b: int):
-    appbal = client.account_info(app)
+def _cached_account_info(balances: BalanceCache, addr: str):
+    return {"assets": [{"asset-id": aid, "amount": amt} for aid, amt in sorted(balances.holdings(addr).items())]}
+
+
+def print_balances(client:AlgodClient, app: str, addr: str, pool: int, a: int, b: int, balances: Optional[BalanceCache] = None):
+    if balances is not None:
+        account_info = lambda address: _cached_account_info(balances, address)
+    else:
+        account_info = client.account_info
+
+    appbal = account_info(app)
     print("App: ")
     for asset in appbal["assets"]:
         if asset["asset-id"] == pool:
@@ -42,7 +57,7 @@ def print_balances(client:AlgodClient, app: str, addr: str, pool: int, a: int, b
         if asset["asset-id"] == b:
             print("\tAssetB Balance {}".format(asset["amount"]))
 
-    addrbal = client.account_info(addr)
+    addrbal = account_info(addr)
     print("Participant: ")
     for asset in addrbal["assets"]:
         if asset["asset-id"] == pool:
@@ -61,7 +76,16 @@ def send(client, name, signed_group):
     print("Sending Transaction for {}".format(name))
     # write_dryrun(name, client, signed_group)
     txid = client.send_transactions(signed_group)
-    return transaction.wait_for_confirmation(client, txid, 4)
+    result = transaction.wait_for_confirmation(client, txid, 4)
+    observe_round(client, result.get("confirmed-round"))
+    return result
+
+
+def compile_program(client: AlgodClient, contract, name: str, cache: Optional[CompileCache] = None,
+                    template: Optional[Dict[str, int]] = None) -> bytes:
+    if cache is not None:
+        return cache.program(client, contract, name, TEAL_VERSION, template)
+    return fully_compile_contract(client, CompileCache.build(contract, name, TEAL_VERSION, template))
 
 
 def get_app_call(addr, sp, app_id, app_args=[], assets=[], accounts=[], apps=[]):
@@ -77,82 +101,217 @@ def get_app_call(addr, sp, app_id, app_args=[], assets=[], accounts=[], apps=[])
     )
     
 
-def get_master_contracts(client: AlgodClient) -> Tuple[bytes, bytes]:
-    contract = MasterContract()
-    approval_program = fully_compile_contract(
-        client, compileTeal(
-            contract.approval_program(),
-            mode=Mode.Application,
-            version=6
-        )
-    )
-    clear_state_program = fully_compile_contract(
-        client, compileTeal(
-            contract.clear_program(),
-            mode=Mode.Application,
-            version=6
-        )
+# Legs one `multiswap` call settles within its 700 opcode budget; 8 legs
+# cost 686, a 9th fails with "dynamic cost budget exceeded". Kept out of
+# `constants` so the contracts, and their bundles, do not depend on it
+MULTISWAP_MAX_LEGS = 8
+
+# Transactions in one atomic group
+MAX_GROUP_SIZE = 16
+
+
+def get_multiswap_group(addr, sp, pool_id, asset_a, asset_b, transfers):
+    """`multiswap` app calls followed by the transfers they settle, given as `(sender, asset_id, amount)`
+
+    A call runs on its own 700 opcode budget, so the transfers are split into
+    chunks of at most `MULTISWAP_MAX_LEGS`, each behind its own call. Every
+    call sees the reserves left by the chunks before it. A group holds 16
+    transactions, so it settles at most 14 legs (two calls of 8 and 6);
+    split larger batches across several groups.
+    """
+    chunks = [transfers[i:i + MULTISWAP_MAX_LEGS] for i in range(0, len(transfers), MULTISWAP_MAX_LEGS)]
+    if len(chunks) + len(transfers) > MAX_GROUP_SIZE:
+        raise Exception("multiswap group holds at most {} transactions, {} legs need {}".format(
+            MAX_GROUP_SIZE, len(transfers), len(chunks) + len(transfers)))
+    pool_addr = get_application_address(pool_id)
+    group = []
+    for chunk in chunks:
+        group.append(get_app_call(addr, sp, pool_id, app_args=["multiswap", len(chunk)], assets=[asset_a, asset_b]))
+        group += [get_asset_xfer(sender, sp, asset_id, pool_addr, amt) for sender, asset_id, amt in chunk]
+    return group
+
+
+def get_boot_group(addr, sp, pool_id, asset_a, asset_b, seed_amount=10_000_000, master_app_id=None, shard_id=None):
+    """`set_govener` through the master when `master_app_id` is given, algo
+    seeding of the pool account and `boot`, to be sent as one group
+
+    `shard_id` is the pair's registry shard for a sharded master.
+    """
+    group = []
+    if master_app_id is not None:
+        apps = [pool_id] if shard_id is None else [pool_id, shard_id]
+        group.append(get_app_call(addr, sp, master_app_id, ["set_govener"], [asset_a, asset_b], [addr], apps))
+    if seed_amount:
+        group.append(transaction.PaymentTxn(addr, sp, get_application_address(pool_id), seed_amount))
+    group.append(get_app_call(addr, sp, pool_id, ["boot"], [asset_a, asset_b]))
+    return group
+
+
+def get_fund_group(addr, sp, pool_id, asset_a, asset_b, pool_token, amount_a, amount_b):
+    """Pool token opt-in of the funder and the initial `fund`, to be sent as one group"""
+    pool_addr = get_application_address(pool_id)
+    return [
+        get_asset_xfer(addr, sp, pool_token, addr, 0),
+        get_app_call(addr, sp, pool_id, ["fund"], [asset_a, asset_b, pool_token]),
+        get_asset_xfer(addr, sp, asset_a, pool_addr, amount_a),
+        get_asset_xfer(addr, sp, asset_b, pool_addr, amount_b),
+    ]
+
+
+def onboard_pool(client: AlgodClient, sender: Account, pool_id: int, asset_a: int, asset_b: int, amount_a: int, amount_b: int,
+                 seed_amount: int = 10_000_000, master_app_id: Optional[int] = None, shard_id: Optional[int] = None) -> int:
+    """Boot and fund a new pool in two groups, see `get_boot_group` and `get_fund_group`
+
+    The pool token id is only known once `boot` confirms, so the opt-in and
+    `fund` cannot join the first group. Returns the pool token id.
+    """
+    addr, pk = sender.get_address(), sender.get_private_key()
+
+    sp = suggested_params(client)
+    txn_group = transaction.assign_group_id(get_boot_group(addr, sp, pool_id, asset_a, asset_b, seed_amount, master_app_id, shard_id))
+    send(client, "boot", [txn.sign(pk) for txn in txn_group])
+    # The group has confirmed; the pool token is in `boot`'s inner transactions
+    boot = PendingTxnResponse(client.pending_transaction_info(txn_group[-1].get_txid()))
+    pool_token = boot.inner_txns[0]["asset-index"]
+
+    sp = suggested_params(client)
+    txn_group = transaction.assign_group_id(get_fund_group(addr, sp, pool_id, asset_a, asset_b, pool_token, amount_a, amount_b))
+    send(client, "fund", [txn.sign(pk) for txn in txn_group])
+    return pool_token
+
+
+def get_master_contracts(client: AlgodClient, cache: Optional[CompileCache] = compile_cache, prebuilt: bool = True, sharded: bool = False) -> Tuple[bytes, bytes]:
+    programs = artifacts.load("master", "sharded" if sharded else "default") if prebuilt else None
+    if programs is not None:
+        return programs
+
+    from .contracts.master import MasterContract
+
+    contract = MasterContract(sharded)
+    return (
+        compile_program(client, contract, "approval_program", cache),
+        compile_program(client, contract, "clear_program", cache),
     )
 
-    return approval_program, clear_state_program
 
+def get_registry_contracts(client: AlgodClient, cache: Optional[CompileCache] = compile_cache, prebuilt: bool = True) -> Tuple[bytes, bytes]:
+    programs = artifacts.load("registry") if prebuilt else None
+    if programs is not None:
+        return programs
 
-def get_pool_contracts(client: AlgodClient, asset_a: int, asset_b: int) -> Tuple[bytes, bytes]:
-    contract = PoolContract()
-    approval_program = fully_compile_contract(
-        client,
-        compileTeal(
-            contract.approval_program(),
-            mode=Mode.Application,
-            version=6
-        )
-    )
-    clear_state_program = fully_compile_contract(
-        client,
-        compileTeal(contract.clear_program(), mode=Mode.Application, version=6)
+    from .contracts.registry import RegistryShard
+
+    contract = RegistryShard()
+    return (
+        compile_program(client, contract, "approval_program", cache),
+        compile_program(client, contract, "clear_program", cache),
     )
 
-    return approval_program, clear_state_program
 
+def patch_pool_program(program: bytes, asset_a: int, asset_b: int) -> bytes:
+    """Templated pool approval program for one pair, without recompiling"""
+    from .avm.assembler import patch_intcblock
 
-def create_master_app(client: AlgodClient, sender: Account, template_pool_id: int) -> int:
-    approval_program, clear_program = get_master_contracts(client)
+    assert 0 < asset_a < asset_b
+    return patch_intcblock(program, {
+        POOL_TEMPLATE["TMPL_ASSET_A"]: asset_a,
+        POOL_TEMPLATE["TMPL_ASSET_B"]: asset_b,
+    })
 
-    global_schema = transaction.StateSchema(32, 32)
-    local_schema = transaction.StateSchema(0, 0)
 
-    txn = transaction.ApplicationCreateTxn(
-        sender=sender.get_address(),
-        sp=client.suggested_params(),
-        on_complete=transaction.OnComplete.NoOpOC,
-        approval_program=approval_program,
-        clear_program=clear_program,
-        global_schema=global_schema,
-        local_schema=local_schema,
-        foreign_apps=[template_pool_id]
-    )
-    signed_txn = txn.sign(sender.get_private_key())
-    tx_id = client.send_transaction(signed_txn)
-
-    response = wait_for_transaction(client, tx_id)
-    assert response.application_index is not None and response.application_index > 0
-    return response.application_index
+def get_pool_contracts(client: AlgodClient, asset_a: int, asset_b: int, cache: Optional[CompileCache] = compile_cache, optimized: bool = False, templated: bool = False, prebuilt: bool = True) -> Tuple[bytes, bytes]:
+    """Pool programs; templated ones are bound to `asset_a`/`asset_b`, others get the pair from `set`
 
+    Prebuilt artifacts are used when available, which skips PyTeal and algod.
+    """
+    build = artifacts.pool_build(optimized, templated)
+    programs = artifacts.load("pool", build) if prebuilt and build else None
+    if programs is None:
+        from .contracts.pool import PoolContract
 
-def create_pool_app(client: AlgodClient, sender: Account) -> int:
-    approval_program, clear_program = get_pool_contracts(client, 0, 0)
+        contract = PoolContract(optimized, templated)
+        # Templated programs are compiled once with the stand-ins
+        programs = (
+            compile_program(client, contract, "approval_program", cache, POOL_TEMPLATE if templated else None),
+            compile_program(client, contract, "clear_program", cache),
+        )
 
-    global_schema = transaction.StateSchema(32, 32)
-    local_schema = transaction.StateSchema(0, 0)
+    if templated:
+        return patch_pool_program(programs[0], asset_a, asset_b), programs[1]
+    return programs
+
+
+def create_master_app(client: AlgodClient, sender: Account, template_pool_id: int, bundle: Optional[artifacts.Bundle] = None,
+                      shard_template_id: Optional[int] = None) -> int:
+    """Master app, from `bundle` when given, which needs no compile calls
+
+    With `shard_template_id`, see `create_shard_template_app`, the sharded
+    build is deployed: pools are registered in registry shards it creates
+    from that template, so the number of pools is not capped by its schema.
+    """
+    sharded = shard_template_id is not None
+    build = "sharded" if sharded else "default"
+    if bundle is not None:
+        approval_program, clear_program = bundle.programs(build)
+    else:
+        approval_program, clear_program = get_master_contracts(client, sharded=sharded)
+    foreign_apps = [template_pool_id, shard_template_id] if sharded else [template_pool_id]
+    return _create_app(client, sender, approval_program, clear_program, _schemas("master", build, bundle), foreign_apps)
+
+
+def create_shard_template_app(client: AlgodClient, sender: Account, bundle: Optional[artifacts.Bundle] = None) -> int:
+    """Registry shard app whose programs a sharded master copies into new shards"""
+    if bundle is not None:
+        approval_program, clear_program = bundle.programs()
+    else:
+        approval_program, clear_program = get_registry_contracts(client)
+    return _create_app(client, sender, approval_program, clear_program, _schemas("registry", "default", bundle))
+
+
+def create_pool_app(client: AlgodClient, sender: Account, optimized: bool = False, bundle: Optional[artifacts.Bundle] = None) -> int:
+    """Template pool app, from `bundle` when given, which needs no compile calls"""
+    if bundle is not None:
+        approval_program, clear_program = bundle.programs(artifacts.pool_build(optimized))
+    else:
+        approval_program, clear_program = get_pool_contracts(client, 0, 0, optimized=optimized)
+    return _create_app(client, sender, approval_program, clear_program, _schemas("pool", artifacts.pool_build(optimized), bundle))
+
+
+def create_pair_pool_app(client: AlgodClient, sender: Account, asset_a: int, asset_b: int, optimized: bool = False, bundle: Optional[artifacts.Bundle] = None) -> int:
+    """Pool created for `asset_a`/`asset_b` from the templated program, ready to boot without `set`
+
+    Unlike pools created through the master's `new_pool`, it is not recorded
+    in the master's registry.
+    """
+    if bundle is not None:
+        approval_program, clear_program = bundle.programs("templated")
+        approval_program = patch_pool_program(approval_program, asset_a, asset_b)
+    else:
+        approval_program, clear_program = get_pool_contracts(client, asset_a, asset_b, optimized=optimized, templated=True)
+    return _create_app(client, sender, approval_program, clear_program, _schemas("pool", "templated", bundle))
+
+
+def _schemas(contract: str, build: str, bundle: Optional[artifacts.Bundle] = None) -> Tuple[transaction.StateSchema, transaction.StateSchema]:
+    if bundle is not None:
+        return bundle.global_schema(build), bundle.local_schema(build)
+    schema = artifacts.schema(contract, build)
+    return transaction.StateSchema(*schema["global"]), transaction.StateSchema(*schema["local"])
+
+
+def _create_app(client: AlgodClient, sender: Account, approval_program: bytes, clear_program: bytes,
+                schemas: Tuple[transaction.StateSchema, transaction.StateSchema],
+                foreign_apps: Optional[List[int]] = None) -> int:
+    global_schema, local_schema = schemas
 
     txn = transaction.ApplicationCreateTxn(
         sender=sender.get_address(),
-        sp=client.suggested_params(),
+        sp=suggested_params(client),
         on_complete=transaction.OnComplete.NoOpOC,
         approval_program=approval_program,
         clear_program=clear_program,
         global_schema=global_schema,
-        local_schema=local_schema
+        local_schema=local_schema,
+        foreign_apps=foreign_apps
     )
     signed_txn = txn.sign(sender.get_private_key())
     tx_id = client.send_transaction(signed_txn)
@@ -162,22 +321,42 @@ def create_pool_app(client: AlgodClient, sender: Account) -> int:
     return response.application_index
 
 
-def create_pool(client: AlgodClient, sender: Account, master_app_id: int, template_pool_id: int, asset_a: int, asset_b: int) -> int:
+def create_pool(client: AlgodClient, sender: Account, master_app_id: int, template_pool_id: int, asset_a: int, asset_b: int,
+                registry: Optional[PoolRegistry] = None, shard_template_id: Optional[int] = None) -> Optional[int]:
+    """Create and register the pool for a pair through the master
+
+    For a sharded master pass its `shard_template_id`. The pair's shard is
+    looked up in `registry` when given, otherwise in the master's state;
+    the first pool of a shard also pays for creating the shard. Raises
+    before sending anything if the pair's shard is full.
+    """
     assert asset_a < asset_b
+    amount = POOL_CREATION_FEE
+    foreign_apps = [template_pool_id]
+    if shard_template_id is not None:
+        if registry is not None:
+            shard_id = registry.shard(asset_a, asset_b)
+        else:
+            shard_id = MasterState.fetch(client, master_app_id).shard(asset_a, asset_b)
+        foreign_apps.append(shard_template_id)
+        if shard_id is None:
+            amount += SHARD_CREATION_FEE
+        else:
+            pools = registry.shard_size(asset_a, asset_b) if registry is not None else len(GlobalState.fetch(client, shard_id))
+            check_shard_capacity(pools, asset_a, asset_b)
+            foreign_apps.append(shard_id)
+
+    sp = suggested_params(client)
     txn = transaction.PaymentTxn(
         sender=sender.get_address(),
-        sp=client.suggested_params(),
+        sp=sp,
         receiver=get_application_address(master_app_id),
-        amt=2_715_000
+        amt=amount
     )
-    signed_txn = txn.sign(sender.get_private_key())
-    tx_id = client.send_transaction(signed_txn)
-    
-    wait_for_transaction(client, tx_id)
-    
+
     txn2 = transaction.ApplicationCallTxn(
         sender=sender.get_address(),
-        sp=client.suggested_params(),
+        sp=sp,
         index=master_app_id,
         on_complete=transaction.OnComplete.NoOpOC,
         app_args=[
@@ -187,19 +366,39 @@ def create_pool(client: AlgodClient, sender: Account, master_app_id: int, templa
             asset_a,
             asset_b
         ],
-        foreign_apps=[template_pool_id]
+        foreign_apps=foreign_apps
     )
 
-    signed_txn2 = txn2.sign(sender.get_private_key())
-    tx_id = client.send_transaction(signed_txn2)
+    txn_group = transaction.assign_group_id([txn, txn2])
+    client.send_transactions([t.sign(sender.get_private_key()) for t in txn_group])
+
+    response = wait_for_transaction(client, txn_group[1].get_txid())
+    if registry is not None:
+        registry.apply(response)
+    return registered_pool(response, asset_a, asset_b)
+
+
+def lookup_pool(client: AlgodClient, master_app_id: int, asset_a: int, asset_b: int) -> Optional[int]:
+    """Pool app id for a pair, in either order, read from algod
 
-    wait_for_transaction(client, tx_id)
+    A sharded master costs one extra read: the master maps the pair to its
+    shard, and only that shard's state is fetched.
+    """
+    if asset_a > asset_b:
+        asset_a, asset_b = asset_b, asset_a
+    master = MasterState.fetch(client, master_app_id)
+    if not master.sharded:
+        return master.pool(asset_a, asset_b)
+    shard_id = master.shard(asset_a, asset_b)
+    if shard_id is None:
+        return None
+    return GlobalState.fetch(client, shard_id).get(pool_key(asset_a, asset_b))
 
 
 def create_asset(client: AlgodClient, sender: Account, unitname: str):
     txn = transaction.AssetCreateTxn(
         sender=sender.get_address(),
-        sp=client.suggested_params(),
+        sp=suggested_params(client),
         total=1_000_000,
         decimals=0,
         default_frozen=False,
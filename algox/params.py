@@ -0,0 +1,113 @@
+import copy
+import inspect
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+from algosdk.future import transaction
+
+
+class ParamsProvider:
+    """Round-aware cache of `suggested_params`
+
+    Params are fetched once and handed out until either a round newer than
+    `max_age` rounds past the fetch is observed, or the current round gets
+    within `margin` rounds of the params' `last` valid round. Rounds are
+    learned through `observe` (confirmation waiters report every round they
+    see) and otherwise estimated from `round_time`.
+    """
+
+    def __init__(self, client: Any, max_age: int = 1, margin: int = 10, round_time: float = 4.5) -> None:
+        self.client = client
+        self.max_age = max_age
+        self.margin = margin
+        self.round_time = round_time
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._params: Optional[transaction.SuggestedParams] = None
+        self._fetched_at = 0.0
+        self._observed_round = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def observe(self, round: int):
+        with self._lock:
+            self._observed_round = max(self._observed_round, round)
+
+    def current_round(self) -> int:
+        """Newest round observed or estimated since the last fetch, 0 before any"""
+        with self._lock:
+            if self._params is None:
+                return self._observed_round
+            return self._current_round()
+
+    def invalidate(self):
+        with self._lock:
+            self._params = None
+
+    def _current_round(self) -> int:
+        elapsed = int((time.monotonic() - self._fetched_at) / self.round_time)
+        return max(self._observed_round, self._params.first + elapsed)
+
+    def _cached(self) -> Optional[transaction.SuggestedParams]:
+        if self._params is None:
+            return None
+        current = self._current_round()
+        if current - self._params.first >= self.max_age or current + self.margin >= self._params.last:
+            return None
+        self.hits += 1
+        return copy.copy(self._params)
+
+    def _store(self, sp: transaction.SuggestedParams) -> transaction.SuggestedParams:
+        self.misses += 1
+        self._params = sp
+        self._fetched_at = time.monotonic()
+        self._observed_round = max(self._observed_round, sp.first)
+        return copy.copy(sp)
+
+    def get(self) -> transaction.SuggestedParams:
+        with self._lock:
+            sp = self._cached()
+            if sp is None:
+                sp = self._store(self.client.suggested_params())
+            return sp
+
+    async def aget(self) -> transaction.SuggestedParams:
+        """`get` for clients whose `suggested_params` is a coroutine"""
+        with self._lock:
+            sp = self._cached()
+        if sp is not None:
+            return sp
+
+        sp = self.client.suggested_params()
+        if inspect.isawaitable(sp):
+            sp = await sp
+        with self._lock:
+            return self._store(sp)
+
+
+_providers: "weakref.WeakKeyDictionary[Any, ParamsProvider]" = weakref.WeakKeyDictionary()
+_providers_lock = threading.Lock()
+
+
+def get_params_provider(client: Any) -> ParamsProvider:
+    """The shared provider for `client`, created on first use"""
+    with _providers_lock:
+        provider = _providers.get(client)
+        if provider is None:
+            provider = _providers[client] = ParamsProvider(client)
+        return provider
+
+
+def suggested_params(client: Any) -> transaction.SuggestedParams:
+    return get_params_provider(client).get()
+
+
+def observe_round(client: Any, round: Optional[int]):
+    if round:
+        get_params_provider(client).observe(round)
@@ -0,0 +1,154 @@
+import hashlib
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from algosdk.v2client.algod import AlgodClient
+
+from .constants import REGISTRY_SHARDS, SHARD_CAPACITY
+from .utils import PendingTxnResponse, decode_state_delta, get_app_global_state
+
+GOV_KEY = b"gov"
+POOL_ID_KEY = b"pid"
+SHARD_ID_KEY = b"sid"
+
+
+def pool_key(asset_a: int, asset_b: int) -> bytes:
+    """Master global state key for a pair, `itob(a) + "_" + itob(b)`"""
+    return asset_a.to_bytes(8, "big") + b"_" + asset_b.to_bytes(8, "big")
+
+
+def parse_pool_key(key: bytes) -> Optional[Tuple[int, int]]:
+    if len(key) != 17 or key[8:9] != b"_":
+        return None
+    return int.from_bytes(key[:8], "big"), int.from_bytes(key[9:], "big")
+
+
+def shard_index(asset_a: int, asset_b: int, shards: int = REGISTRY_SHARDS) -> int:
+    """Registry shard of a pair in a sharded master, `btoi(sha256(key)[:8]) % shards`"""
+    return int.from_bytes(hashlib.sha256(pool_key(asset_a, asset_b)).digest()[:8], "big") % shards
+
+
+def shard_key(index: int) -> bytes:
+    """Sharded master global state key holding a shard's app id, `itob(index)`"""
+    return index.to_bytes(8, "big")
+
+
+def check_shard_capacity(pools: int, asset_a: int, asset_b: int):
+    """Raise if a registry shard already holding `pools` pools cannot take the pair"""
+    if pools >= SHARD_CAPACITY:
+        raise Exception("Registry shard {} is full ({} pools), pair {}/{} cannot be registered in this master".format(
+            shard_index(asset_a, asset_b), pools, asset_a, asset_b))
+
+
+def registered_pool(response: PendingTxnResponse, asset_a: int, asset_b: int) -> Optional[int]:
+    """Pool app id a confirmed `new_pool` call registered, from the master's
+    own state delta or, for a sharded master, from its shard `put` call"""
+    key = pool_key(asset_a, asset_b)
+    app_id = decode_state_delta(response.global_state_delta).get(key)
+    if app_id is None:
+        for inner in response.inner_txns:
+            app_id = decode_state_delta(inner.get("global-state-delta")).get(key) or app_id
+    return app_id
+
+
+class PoolRegistry:
+    """In-process index of the pools registered in a MasterContract
+
+    `load` reads the master's global state once; afterwards `apply` folds in
+    the `global-state-delta` of confirmed master app calls, so lookups by
+    pair or by pool app id never touch algod. For a sharded master `load`
+    also reads every registry shard, and `apply` follows the shard `put`
+    calls among the inner transactions.
+    """
+
+    def __init__(self, client: AlgodClient, master_app_id: int) -> None:
+        self.client = client
+        self.master_app_id = master_app_id
+
+        self.governor: Optional[bytes] = None
+        self.template_pool_id: Optional[int] = None
+        self.shard_template_id: Optional[int] = None
+        # Shard index -> registry shard app id, empty unless the master is sharded
+        self.shards: Dict[int, int] = {}
+
+        self._by_pair: Dict[Tuple[int, int], int] = {}
+        self._by_app: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_pair)
+
+    def __iter__(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        return iter(self._by_pair.items())
+
+    def __contains__(self, pair: Tuple[int, int]) -> bool:
+        return self.lookup(*pair) is not None
+
+    def load(self) -> "PoolRegistry":
+        self._by_pair.clear()
+        self._by_app.clear()
+        self.shards.clear()
+        self._update(get_app_global_state(self.client, self.master_app_id))
+        for app_id in list(self.shards.values()):
+            self._update(get_app_global_state(self.client, app_id))
+        return self
+
+    def apply(self, response: Union[PendingTxnResponse, Dict[str, Any]]):
+        """Apply the state changes of a confirmed master app call"""
+        if isinstance(response, PendingTxnResponse):
+            txn, delta, inner_txns = response.txn, response.global_state_delta, response.inner_txns
+        else:
+            txn, delta = response.get("txn", {}), response.get("global-state-delta")
+            inner_txns = response.get("inner-txns", [])
+
+        app_id = txn.get("txn", {}).get("apid")
+        if app_id != self.master_app_id and app_id not in self.shards.values():
+            return
+        self._update(decode_state_delta(delta))
+        for inner in inner_txns:
+            self.apply(inner)
+
+    def _update(self, state: Dict[bytes, Any]):
+        for key, value in state.items():
+            if key == GOV_KEY:
+                self.governor = value
+                continue
+            if key == POOL_ID_KEY:
+                self.template_pool_id = value
+                continue
+            if key == SHARD_ID_KEY:
+                self.shard_template_id = value
+                continue
+            if len(key) == 8:
+                self.shards[int.from_bytes(key, "big")] = value
+                continue
+
+            pair = parse_pool_key(key)
+            if pair is None:
+                continue
+
+            old = self._by_pair.pop(pair, None)
+            if old is not None:
+                self._by_app.pop(old, None)
+            if value is not None:
+                self._by_pair[pair] = value
+                self._by_app[value] = pair
+
+    def lookup(self, asset_a: int, asset_b: int) -> Optional[int]:
+        """Pool app id for a pair, in either order"""
+        if asset_a > asset_b:
+            asset_a, asset_b = asset_b, asset_a
+        return self._by_pair.get((asset_a, asset_b))
+
+    def shard(self, asset_a: int, asset_b: int) -> Optional[int]:
+        """Registry shard app a pair is (or would be) recorded in, None if not created yet"""
+        if asset_a > asset_b:
+            asset_a, asset_b = asset_b, asset_a
+        return self.shards.get(shard_index(asset_a, asset_b))
+
+    def shard_size(self, asset_a: int, asset_b: int) -> int:
+        """Pools registered in the shard a pair maps to"""
+        index = shard_index(min(asset_a, asset_b), max(asset_a, asset_b))
+        return sum(1 for pair in self._by_pair if shard_index(*pair) == index)
+
+    def pair(self, app_id: int) -> Optional[Tuple[int, int]]:
+        """`(asset_a, asset_b)` served by a pool app"""
+        return self._by_app.get(app_id)
@@ -0,0 +1,163 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from algosdk.logic import get_application_address
+from algosdk.v2client.algod import AlgodClient
+
+from .math import TOTAL_SUPPLY
+from .params import get_params_provider, observe_round
+from .registry import PoolRegistry
+
+
+class PoolReserves(NamedTuple):
+    reserve_a: int
+    reserve_b: int
+    # Pool tokens in circulation, 0 before the pool is booted
+    issued: int
+    # Round the balances were read at
+    round: int
+
+
+class ReserveCache:
+    """Reserves of many pools, each tagged with the round it was read at
+
+    Reads are served from memory while an entry is at most `max_staleness`
+    rounds behind the current round. Stale and missing entries are refreshed
+    together, one `account_info` call per pool spread over `max_workers`
+    threads.
+
+    Bounds of up to `exact_staleness` rounds are checked against the round
+    algod reports, at the cost of one `status` call per read. Looser bounds
+    use the round the shared params provider has observed or estimated, see
+    `params.ParamsProvider`, and cost no request. That estimate is
+    approximate: it counts wall-clock time in fixed `round_time` steps, so it
+    lags a chain with faster rounds and runs ahead of a dev-mode node whose
+    rounds only advance with transactions.
+
+    Pools come from `registry` when given, and from `track` otherwise.
+    """
+
+    def __init__(self, client: AlgodClient, registry: Optional[PoolRegistry] = None,
+                 max_staleness: int = 1, max_workers: int = 8, exact_staleness: int = 1) -> None:
+        self.client = client
+        self.registry = registry
+        self.max_staleness = max_staleness
+        self.max_workers = max_workers
+        self.exact_staleness = exact_staleness
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._pairs: Dict[int, Tuple[int, int]] = {}
+        self._entries: Dict[int, PoolReserves] = {}
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def track(self, pool_id: int, asset_a: int, asset_b: int):
+        """Add a pool that is not in the registry"""
+        with self._lock:
+            self._pairs[pool_id] = (min(asset_a, asset_b), max(asset_a, asset_b))
+
+    def pair(self, pool_id: int) -> Optional[Tuple[int, int]]:
+        pair = self._pairs.get(pool_id)
+        if pair is None and self.registry is not None:
+            pair = self.registry.pair(pool_id)
+        return pair
+
+    def pools(self) -> List[int]:
+        """Every known pool app id"""
+        pools = set(self._pairs)
+        if self.registry is not None:
+            pools.update(app_id for _, app_id in self.registry)
+        return sorted(pools)
+
+    def current_round(self, exact: bool = False) -> int:
+        """Round staleness is measured against, estimated unless `exact`"""
+        current = 0 if exact else get_params_provider(self.client).current_round()
+        if not current:
+            current = self.client.status()["last-round"]
+            observe_round(self.client, current)
+        return current
+
+    def peek(self, pool_id: int) -> Optional[PoolReserves]:
+        """Cached entry, however old, without touching algod"""
+        return self._entries.get(pool_id)
+
+    def get(self, pool_id: int, max_staleness: Optional[int] = None) -> PoolReserves:
+        return self.get_many([pool_id], max_staleness)[pool_id]
+
+    def get_many(self, pool_ids: Optional[Iterable[int]] = None,
+                 max_staleness: Optional[int] = None) -> Dict[int, PoolReserves]:
+        """Reserves of `pool_ids`, default every known pool, refreshing the stale ones in one batch"""
+        pool_ids = self.pools() if pool_ids is None else list(pool_ids)
+        max_staleness = self.max_staleness if max_staleness is None else max_staleness
+        oldest = self.current_round(max_staleness <= self.exact_staleness) - max_staleness
+
+        with self._lock:
+            stale = [p for p in pool_ids if p not in self._entries or self._entries[p].round < oldest]
+            self.hits += len(pool_ids) - len(stale)
+            self.misses += len(stale)
+
+        if stale:
+            self.refresh(stale)
+        with self._lock:
+            return {p: self._entries[p] for p in pool_ids}
+
+    def refresh(self, pool_ids: Optional[Iterable[int]] = None) -> "ReserveCache":
+        """Read the reserves of `pool_ids`, default every known pool, concurrently"""
+        pool_ids = self.pools() if pool_ids is None else list(pool_ids)
+        pairs = {}
+        for pool_id in pool_ids:
+            pair = self.pair(pool_id)
+            if pair is None:
+                raise Exception("Unknown pool {}, add it with track".format(pool_id))
+            pairs[pool_id] = pair
+        # Tag for nodes whose account info has no round; read before the
+        # balances, so an entry is never newer than its tag
+        fallback = self.current_round()
+
+        def fetch(pool_id: int) -> Tuple[int, PoolReserves]:
+            info = self.client.account_info(get_application_address(pool_id))
+            return pool_id, self._decode(info, pairs[pool_id], info.get("round", fallback))
+
+        if len(pool_ids) == 1:
+            results = [fetch(pool_ids[0])]
+        else:
+            with ThreadPoolExecutor(self.max_workers) as pool:
+                results = list(pool.map(fetch, pool_ids))
+
+        with self._lock:
+            for pool_id, reserves in results:
+                self._store(pool_id, reserves)
+        observe_round(self.client, max(r.round for _, r in results) if results else None)
+        return self
+
+    def set(self, pool_id: int, reserves: PoolReserves):
+        """Store reserves known by other means, e.g. the balances after a confirmed
+        swap; an entry read at a later round is kept"""
+        with self._lock:
+            self._store(pool_id, reserves)
+
+    def _store(self, pool_id: int, reserves: PoolReserves):
+        current = self._entries.get(pool_id)
+        if current is None or current.round <= reserves.round:
+            self._entries[pool_id] = reserves
+
+    def invalidate(self, pool_id: Optional[int] = None):
+        with self._lock:
+            if pool_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(pool_id, None)
+
+    @staticmethod
+    def _decode(info: Dict, pair: Tuple[int, int], round: int) -> PoolReserves:
+        asset_a, asset_b = pair
+        held = {h["asset-id"]: h["amount"] for h in info.get("assets", [])}
+        # The pool holds only its pair and the pool token it created
+        pool_tokens = [aid for aid in held if aid not in pair]
+        issued = TOTAL_SUPPLY - held[pool_tokens[0]] if pool_tokens else 0
+        return PoolReserves(held.get(asset_a, 0), held.get(asset_b, 0), issued, round)
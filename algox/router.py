@@ -0,0 +1,156 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .math import quote_swap
+from .operations import get_multiswap_group
+from .registry import PoolRegistry
+from .reserves import ReserveCache
+
+
+class Hop(NamedTuple):
+    pool_id: int
+    asset_in: int
+    asset_out: int
+    amount_in: int
+    amount_out: int
+
+
+class Route(NamedTuple):
+    hops: Tuple[Hop, ...]
+
+    @property
+    def amount_in(self) -> int:
+        return self.hops[0].amount_in
+
+    @property
+    def amount_out(self) -> int:
+        return self.hops[-1].amount_out
+
+    @property
+    def path(self) -> List[int]:
+        return [self.hops[0].asset_in] + [h.asset_out for h in self.hops]
+
+
+class Router:
+    """Best-output swap routes across every pool in a `PoolRegistry`
+
+    `refresh` pulls the reserves of all pools through a `ReserveCache`;
+    `route` then searches paths of up to `max_hops` pools, quoting every hop
+    with the contract's exact `swap_tokens` math, without touching algod.
+    """
+
+    def __init__(self, client: AlgodClient, registry: PoolRegistry, max_workers: int = 8,
+                 candidates: int = 4, cache: Optional[ReserveCache] = None) -> None:
+        self.client = client
+        self.registry = registry
+        self.max_workers = max_workers
+        self.candidates = candidates
+        self.cache = cache if cache is not None else ReserveCache(client, registry, max_workers=max_workers)
+
+        self.reserves: Dict[int, Dict[int, int]] = {}
+        self._edges: Optional[Tuple[np.ndarray, ...]] = None
+        self._edge_pools: List[int] = []
+
+    def refresh(self, max_staleness: Optional[int] = 0) -> "Router":
+        """Reserves of every pool, re-reading those more than `max_staleness`
+        rounds old; None uses the cache's own bound"""
+        pools = list(self.registry)
+        cached = self.cache.get_many([app_id for _, app_id in pools], max_staleness)
+        self.reserves = {
+            app_id: {a: cached[app_id].reserve_a, b: cached[app_id].reserve_b} for (a, b), app_id in pools
+        }
+        self._edges = None
+        return self
+
+    def set_reserves(self, pool_id: int, reserves: Dict[int, int]):
+        """Replace the cached reserves of one pool, e.g. after a confirmed swap"""
+        self.reserves[pool_id] = dict(reserves)
+        self._edges = None
+
+    def _build_edges(self) -> Tuple[np.ndarray, ...]:
+        src, dst, res_in, res_out, pools = [], [], [], [], []
+        for (a, b), app_id in self.registry:
+            held = self.reserves.get(app_id)
+            if not held or not held[a] or not held[b]:
+                continue
+            for i, o in ((a, b), (b, a)):
+                src.append(i)
+                dst.append(o)
+                res_in.append(held[i])
+                res_out.append(held[o])
+                pools.append(app_id)
+        self._edge_pools = pools
+        self._edges = (
+            np.array(src, dtype=np.uint64),
+            np.array(dst, dtype=np.uint64),
+            np.array(res_in, dtype=np.uint64),
+            np.array(res_out, dtype=np.uint64),
+        )
+        return self._edges
+
+    def route(self, asset_in: int, asset_out: int, amount: int, max_hops: int = 3) -> Optional[Route]:
+        """Route with the largest output, or None if no path yields anything"""
+        if asset_in == asset_out or amount <= 0:
+            return None
+        src, dst, res_in, res_out = self._edges if self._edges is not None else self._build_edges()
+        if not len(src):
+            return None
+
+        # Largest amounts reaching each asset after k hops, with the hops taken.
+        # A larger amount can overflow a later hop that a smaller one clears,
+        # so a few candidates are kept per asset rather than only the best.
+        frontier: Dict[int, List[Tuple[int, Tuple[Hop, ...]]]] = {asset_in: [(amount, ())]}
+        best: Optional[Route] = None
+
+        for _ in range(max_hops):
+            depth = max(len(labels) for labels in frontier.values())
+            held = np.zeros((depth, len(src)), dtype=np.uint64)
+            for asset, labels in frontier.items():
+                mask = src == asset
+                for j, (amt, _hops) in enumerate(labels):
+                    held[j, mask] = amt
+            out, ok = quote_swap(held, res_in, res_out)
+            ok &= out > 0
+
+            nxt: Dict[int, List[Tuple[int, Tuple[Hop, ...]]]] = {}
+            for j, e in zip(*np.nonzero(ok)):
+                i, o, got = int(src[e]), int(dst[e]), int(out[j, e])
+                amt, hops = frontier[i][j]
+                pool_id = self._edge_pools[e]
+                # Never revisit an asset or reuse a pool within one route
+                if o == asset_in or any(h.asset_out == o or h.pool_id == pool_id for h in hops):
+                    continue
+                nxt.setdefault(o, []).append((got, hops + (Hop(pool_id, i, o, amt, got),)))
+
+            if asset_out in nxt:
+                got, hops = max(nxt.pop(asset_out), key=lambda label: label[0])
+                if best is None or got > best.amount_out:
+                    best = Route(hops)
+            if not nxt:
+                break
+            frontier = {
+                asset: sorted(labels, key=lambda label: -label[0])[:self.candidates]
+                for asset, labels in nxt.items()
+            }
+
+        return best
+
+    def swap_group(self, route: Route, sender: str,
+                   sp: transaction.SuggestedParams) -> List[transaction.Transaction]:
+        """The whole route as one atomic group of chained `multiswap` calls
+
+        Each hop pays out before the next hop's transfer executes. Transfer
+        amounts are the quoted ones and there is no minimum output: if a pool
+        moved since `refresh` and a hop pays out less, the next transfer still
+        succeeds whenever the sender already holds enough of that asset, and
+        the group only fails if it does not. Quote right before sending, and
+        check the received amount, when slippage matters.
+        """
+        txns: List[transaction.Transaction] = []
+        for hop in route.hops:
+            a, b = sorted((hop.asset_in, hop.asset_out))
+            txns += get_multiswap_group(sender, sp, hop.pool_id, a, b, [(sender, hop.asset_in, hop.amount_in)])
+        return transaction.assign_group_id(txns)
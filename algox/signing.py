@@ -0,0 +1,72 @@
+import base64
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from algosdk import encoding
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .account import Account
+
+Group = Sequence[transaction.Transaction]
+
+# Private keys by address, set once in every worker process
+_keys: Dict[str, str] = {}
+
+
+def _init_worker(keys: Dict[str, str]):
+    global _keys
+    _keys = keys
+
+
+def _sign_chunk(groups: List[Group]) -> List[bytes]:
+    return [sign_group(group, _keys) for group in groups]
+
+
+def sign_group(group: Group, keys: Dict[str, str]) -> bytes:
+    """Signed group as concatenated msgpack, the body `send_raw_transaction` expects"""
+    return b"".join(
+        base64.b64decode(encoding.msgpack_encode(txn.sign(keys[txn.sender]))) for txn in group
+    )
+
+
+def send_signed(client: AlgodClient, signed: bytes) -> str:
+    """Submit one group returned by `sign_group` or `SigningPool.sign`"""
+    return client.send_raw_transaction(base64.b64encode(signed).decode())
+
+
+class SigningPool:
+    """Signs batches of unsigned groups on a pool of worker processes
+
+    Keys are handed to every worker once, when it starts, so a batch only
+    ships the transactions out and the msgpack-encoded signed groups back.
+    Batches are split into chunks of `chunk_size` groups to amortize that
+    round trip; batches no larger than one chunk are signed in-process.
+    """
+
+    def __init__(self, accounts: Iterable[Account], max_workers: Optional[int] = None,
+                 chunk_size: int = 64) -> None:
+        self.keys = {a.get_address(): a.get_private_key() for a in accounts}
+        self.chunk_size = chunk_size
+        self._pool = ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(self.keys,))
+
+    def __enter__(self) -> "SigningPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def sign(self, groups: Sequence[Group]) -> List[bytes]:
+        """Signed bytes for every group, in the order given"""
+        unknown = {txn.sender for group in groups for txn in group} - self.keys.keys()
+        if unknown:
+            raise Exception("No signing key for {}".format(", ".join(sorted(unknown))))
+
+        if len(groups) <= self.chunk_size:
+            return [sign_group(group, self.keys) for group in groups]
+
+        chunks = [groups[i:i + self.chunk_size] for i in range(0, len(groups), self.chunk_size)]
+        return [signed for chunk in self._pool.map(_sign_chunk, chunks) for signed in chunk]
+
+    def close(self, wait: bool = True):
+        self._pool.shutdown(wait)
@@ -0,0 +1,301 @@
+"""Monte Carlo order flow through the pool math, for tuning fee and scale
+
+Replays randomized paths of swaps, mints and burns through the exact uint64
+`swap_tokens` / `mint_tokens` / `burn_tokens` / `fund_tokens` of
+`algox.math`, for every `(fee, scale)` of a grid at once. Every grid point
+sees the same random flow, so differences between them come from the
+parameters alone. Operations the contract would reject leave the pool
+untouched and are counted.
+
+The pool is funded by two LPs, the tracked first LP and everyone else. Each
+step the external price of A in B moves by a geometric Brownian motion step.
+An arbitrageur then trades the pool back towards that price, and with some
+probability a noise trader swaps, a new LP mints or one of the other LPs
+burns. A mint or burn that would pay out nothing is skipped, as no one would
+send it, and counted in `zero_mint` / `zero_burn`; the contract's integer
+ratio division makes that the fate of any mint smaller than the pool and
+any burn smaller than the whole issue. The default flow therefore mints
+whole multiples of the pool and sends no burns.
+
+    python -m algox.sim
+    python -m algox.sim --fees 1,3,5,10,30 --scales 1000,10000 --paths 5000
+"""
+import argparse
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from .math import FEE, SCALE, TOTAL_SUPPLY, burn_tokens, fund_tokens, mint_tokens, swap_tokens
+
+Results = List[Dict[str, float]]
+
+
+class OrderFlow(NamedTuple):
+    steps: int = 200
+    # Initial deposit of each asset, at an external price of 1
+    reserves: int = 10**8
+    # Share of the initial deposit, and of the fund tokens, of the first LP
+    lp_share: float = 0.5
+    # Per step volatility of the external price
+    volatility: float = 0.01
+    # Whether an arbitrageur trades each step
+    arb_prob: float = 1.0
+    swap_prob: float = 0.8
+    # Noise swap size as a fraction of the input reserve, lognormal
+    swap_size: float = 0.002
+    swap_spread: float = 1.0
+    mint_prob: float = 0.01
+    # Largest mint, in multiples of the reserves. The contract only issues
+    # tokens for whole multiples, so sizes are drawn from 1 to `mint_size`
+    mint_size: int = 1
+    # Burns pay out only when they burn the whole issue, which the other LPs
+    # never hold, so none are sent unless asked for
+    burn_prob: float = 0.0
+    # Fraction of the other LPs' tokens burned
+    burn_size: float = 0.5
+
+
+def _u64(x: np.ndarray) -> np.ndarray:
+    return np.floor(np.clip(x, 0, 2.0**63)).astype(np.uint64)
+
+
+class _Pools:
+    """Reserves and token balances of every (parameter set, path)"""
+
+    def __init__(self, fee: np.ndarray, scale: np.ndarray, paths: int, flow: OrderFlow) -> None:
+        shape = (len(fee), paths)
+        self.fee = fee.reshape(-1, 1).astype(np.uint64)
+        self.scale = scale.reshape(-1, 1).astype(np.uint64)
+
+        self.ra = np.full(shape, flow.reserves, dtype=np.uint64)
+        self.rb = np.full(shape, flow.reserves, dtype=np.uint64)
+        tokens, ok = fund_tokens(self.ra, self.rb, self.scale)
+        # A fund that issues no tokens leaves the LPs with nothing to show for it
+        self.funded = ok & (tokens > 0)
+        tokens = np.where(self.funded, tokens, 0).astype(np.uint64)
+        # The first LP's tokens, and those of the other LPs
+        self.lp = _u64(tokens.astype(np.float64) * flow.lp_share)
+        self.others = tokens - self.lp
+        self.issued = tokens.copy()
+
+        self.attempts = np.zeros(shape)
+        self.rejected = np.zeros(shape)
+        self.mints = np.zeros(shape)
+        self.zero_mints = np.zeros(shape)
+        self.burns = np.zeros(shape)
+        self.zero_burns = np.zeros(shape)
+        self.fees = np.zeros(shape)
+        self.leak_swap = np.zeros(shape)
+        self.leak_mint = np.zeros(shape)
+        self.leak_burn = np.zeros(shape)
+        self.impact: List[np.ndarray] = []
+
+    def value(self, price: np.ndarray) -> np.ndarray:
+        return self.ra.astype(np.float64) * price + self.rb.astype(np.float64)
+
+    def swap(self, active: np.ndarray, a_in: np.ndarray, amount: np.ndarray, price: np.ndarray,
+             record_impact: bool = False):
+        """Swap `amount` of A (where `a_in`) or B into every active pool"""
+        active = active & self.funded & (amount > 0)
+        insup = np.where(a_in, self.ra, self.rb)
+        outsup = np.where(a_in, self.rb, self.ra)
+        out, ok = swap_tokens(amount, insup, outsup, self.fee, self.scale)
+        ok &= active & (out < outsup)
+        self.attempts += active
+        self.rejected += active & ~ok
+
+        amt = amount.astype(np.float64)
+        ins, outs = insup.astype(np.float64), outsup.astype(np.float64)
+        scale, fee = self.scale.astype(np.float64), self.fee.astype(np.float64)
+        factor = scale - fee
+        exact = amt * factor * outs / (ins * scale + amt * factor)
+        # Value in B of what truncation kept in the pool, and of the fee
+        out_price = np.where(a_in, 1.0, price)
+        in_price = np.where(a_in, price, 1.0)
+        self.leak_swap += np.where(ok, (exact - out.astype(np.float64)) * out_price, 0.0)
+        self.fees += np.where(ok, amt * fee / scale * in_price, 0.0)
+        if record_impact:
+            spot = outs / np.maximum(ins, 1.0)
+            impact = 1.0 - out.astype(np.float64) / np.maximum(amt, 1.0) / np.maximum(spot, 1e-300)
+            self.impact.append(np.where(ok, impact, np.nan))
+
+        self.ra = np.where(ok, np.where(a_in, self.ra + amount, self.ra - out), self.ra)
+        self.rb = np.where(ok, np.where(a_in, self.rb - out, self.rb + amount), self.rb)
+
+    def mint(self, active: np.ndarray, size: np.ndarray, price: np.ndarray):
+        """Deposit `size` of both reserves, in the pool's ratio"""
+        active = active & self.funded
+        aamt = _u64(self.ra.astype(np.float64) * size)
+        bamt = _u64(self.rb.astype(np.float64) * size)
+        active &= (aamt > 0) & (bamt > 0)
+        out, ok = mint_tokens(self.issued, self.ra, self.rb, aamt, bamt)
+        zero = active & ok & (out == 0)
+        self.mints += active
+        self.zero_mints += zero
+        active &= ~zero
+        ok &= active & (out <= np.uint64(TOTAL_SUPPLY) - self.issued)
+        self.attempts += active
+        self.rejected += active & ~ok
+
+        deposited = aamt.astype(np.float64) * price + bamt.astype(np.float64)
+        worth = out.astype(np.float64) * self.value(price) / np.maximum(self.issued.astype(np.float64), 1.0)
+        self.leak_mint += np.where(ok, deposited - worth, 0.0)
+
+        self.ra = np.where(ok, self.ra + aamt, self.ra)
+        self.rb = np.where(ok, self.rb + bamt, self.rb)
+        self.issued = np.where(ok, self.issued + out, self.issued)
+        self.others = np.where(ok, self.others + out, self.others)
+
+    def burn(self, active: np.ndarray, size: np.ndarray, price: np.ndarray):
+        """Burn `size` of the other LPs' tokens"""
+        amt = _u64(self.others.astype(np.float64) * size)
+        active = active & self.funded & (amt > 0)
+        a_out, a_ok = burn_tokens(self.issued, self.ra, amt)
+        b_out, b_ok = burn_tokens(self.issued, self.rb, amt)
+        zero = active & a_ok & b_ok & (a_out == 0) & (b_out == 0)
+        self.burns += active
+        self.zero_burns += zero
+        active &= ~zero
+        ok = active & a_ok & b_ok & (a_out <= self.ra) & (b_out <= self.rb)
+        self.attempts += active
+        self.rejected += active & ~ok
+
+        worth = amt.astype(np.float64) * self.value(price) / np.maximum(self.issued.astype(np.float64), 1.0)
+        paid = a_out.astype(np.float64) * price + b_out.astype(np.float64)
+        self.leak_burn += np.where(ok, worth - paid, 0.0)
+
+        self.ra = np.where(ok, self.ra - a_out, self.ra)
+        self.rb = np.where(ok, self.rb - b_out, self.rb)
+        self.issued = np.where(ok, self.issued - amt, self.issued)
+        self.others = np.where(ok, self.others - amt, self.others)
+
+    def arbitrage(self, active: np.ndarray, price: np.ndarray):
+        """Trade each pool towards the external price, sized for a fee-on-input constant product"""
+        ra, rb = self.ra.astype(np.float64), self.rb.astype(np.float64)
+        gamma = (self.scale.astype(np.float64) - self.fee.astype(np.float64)) / self.scale.astype(np.float64)
+        k = ra * rb
+        # A is cheap in the pool: pay B until its marginal price reaches `price`
+        b_in = (np.sqrt(k * gamma * price) - rb) / gamma
+        # A is dear in the pool: sell A until its marginal price falls to `price`
+        a_in = (np.sqrt(k * gamma / price) - ra) / gamma
+        sell_a = a_in > 0
+        amount = _u64(np.where(sell_a, a_in, np.maximum(b_in, 0.0)))
+        self.swap(active, sell_a, amount, price)
+
+
+def sweep(fees: Sequence[int] = (FEE,), scales: Sequence[int] = (SCALE,), paths: int = 1000,
+          flow: Optional[OrderFlow] = None, seed: int = 0) -> Results:
+    """Simulate `paths` paths for every `(fee, scale)` of the grid
+
+    Values are in units of B at the external price, relative to the initial
+    deposit. `lp_vs_hodl` is the first LP's final value against holding the
+    deposit, `fees` the fee paid on successful swaps, and `leak_*` the value
+    each operation's integer truncation moved to the pool (positive) or out
+    of it. `impact_*` is the price impact of noise swaps, fee included.
+    `zero_mint` / `zero_burn` are the shares of mints and burns skipped for
+    paying out nothing, `rejected` the share of the operations sent that the
+    contract would reject.
+    """
+    flow = flow or OrderFlow()
+    grid = [(f, s) for s in scales for f in fees]
+    if any(f >= s for f, s in grid):
+        raise ValueError("fee must be below scale")
+    fee = np.array([f for f, _ in grid], dtype=np.uint64)
+    scale = np.array([s for _, s in grid], dtype=np.uint64)
+
+    rng = np.random.default_rng(seed)
+    pools = _Pools(fee, scale, paths, flow)
+    price = np.ones((1, paths))
+    initial = 2.0 * flow.reserves
+
+    for _ in range(flow.steps):
+        # One draw per path, shared by every parameter set
+        price = price * np.exp(flow.volatility * rng.standard_normal((1, paths)) - flow.volatility**2 / 2)
+        pools.arbitrage(rng.random((1, paths)) < flow.arb_prob, price)
+
+        a_in = rng.random((1, paths)) < 0.5
+        fraction = flow.swap_size * np.exp(flow.swap_spread * rng.standard_normal((1, paths)) - flow.swap_spread**2 / 2)
+        insup = np.where(a_in, pools.ra, pools.rb).astype(np.float64)
+        pools.swap(rng.random((1, paths)) < flow.swap_prob, a_in, _u64(insup * np.minimum(fraction, 0.5)),
+                   price, record_impact=True)
+
+        pools.mint(rng.random((1, paths)) < flow.mint_prob, rng.integers(1, flow.mint_size + 1, (1, paths)), price)
+        pools.burn(rng.random((1, paths)) < flow.burn_prob, flow.burn_size * rng.random((1, paths)), price)
+
+    hodl = flow.lp_share * (flow.reserves * price + flow.reserves)
+    lp_value = pools.lp.astype(np.float64) / np.maximum(pools.issued.astype(np.float64), 1.0) * pools.value(price)
+    lp_vs_hodl = lp_value / hodl - 1.0
+
+    # (parameter set, path * step), NaN where no noise swap went through
+    impacts = np.stack(pools.impact, axis=-1).reshape(len(grid), -1) if pools.impact else np.empty((len(grid), 0))
+
+    results = []
+    for g, (f, s) in enumerate(grid):
+        funded = pools.funded[g]
+        impact = impacts[g][~np.isnan(impacts[g])]
+        results.append({
+            "fee": f,
+            "scale": s,
+            "funded": float(funded.mean()),
+            "lp_vs_hodl": float(lp_vs_hodl[g][funded].mean()) if funded.any() else float("nan"),
+            "lp_vs_hodl_p5": float(np.percentile(lp_vs_hodl[g][funded], 5)) if funded.any() else float("nan"),
+            "fees": float(pools.fees[g].mean() / initial),
+            "leak_swap": float(pools.leak_swap[g].mean() / initial),
+            "leak_mint": float(pools.leak_mint[g].mean() / initial),
+            "leak_burn": float(pools.leak_burn[g].mean() / initial),
+            "impact_mean": float(impact.mean()) if impact.size else float("nan"),
+            "impact_p95": float(np.percentile(impact, 95)) if impact.size else float("nan"),
+            "zero_mint": _share(pools.zero_mints[g], pools.mints[g]),
+            "zero_burn": _share(pools.zero_burns[g], pools.burns[g]),
+            "rejected": _share(pools.rejected[g], pools.attempts[g]),
+        })
+    return results
+
+
+def _share(part: np.ndarray, total: np.ndarray) -> float:
+    return float(part.sum() / total.sum()) if total.sum() else 0.0
+
+
+def print_results(results: Results):
+    columns = ("fee", "scale", "lp_vs_hodl", "lp_vs_hodl_p5", "fees", "leak_swap", "leak_mint", "leak_burn",
+               "impact_mean", "impact_p95", "zero_mint", "zero_burn", "rejected")
+    print(" ".join("{:>13}".format(c) for c in columns))
+    for r in results:
+        print(" ".join("{:>13}".format(r[c]) if c in ("fee", "scale") else "{:>13.4%}".format(r[c])
+                       for c in columns))
+        if r["funded"] < 1:
+            print("    fund rejected or issued no tokens on {:.0%} of paths".format(1 - r["funded"]))
+        if r["zero_mint"] or r["zero_burn"]:
+            print("    skipped {:.0%} of mints and {:.0%} of burns, which would pay out nothing".format(
+                r["zero_mint"], r["zero_burn"]))
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = OrderFlow()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fees", type=_ints, default=[1, 3, FEE, 10, 30])
+    parser.add_argument("--scales", type=_ints, default=[SCALE, 10 * SCALE])
+    parser.add_argument("--paths", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=defaults.steps)
+    parser.add_argument("--reserves", type=int, default=defaults.reserves)
+    parser.add_argument("--volatility", type=float, default=defaults.volatility)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    flow = defaults._replace(steps=args.steps, reserves=args.reserves, volatility=args.volatility)
+    start = time.time()
+    results = sweep(args.fees, args.scales, args.paths, flow, args.seed)
+    print_results(results)
+    print("{} parameter sets x {} paths x {} steps in {:.2f}s".format(
+        len(results), args.paths, flow.steps, time.time() - start))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+from base64 import b64decode, b64encode
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+
+from .registry import GOV_KEY, POOL_ID_KEY, SHARD_ID_KEY, parse_pool_key, pool_key, shard_index, shard_key
+from .utils import decode_value
+
+Value = Union[int, bytes]
+
+
+class GlobalState:
+    """Read-only view of an app's `global-state` array
+
+    Only the keys that are read get decoded. The array is indexed by its
+    still-encoded keys on first access, and each value is decoded when it is
+    looked up.
+    """
+
+    __slots__ = ("raw", "_index")
+
+    def __init__(self, state_array: List[Dict[str, Any]]) -> None:
+        self.raw = state_array
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @classmethod
+    def fetch(cls, client: AlgodClient, app_id: int):
+        return cls(client.application_info(app_id)["params"].get("global-state", []))
+
+    def _lookup(self, key: bytes) -> Optional[Dict[str, Any]]:
+        if self._index is None:
+            self._index = {pair["key"]: pair["value"] for pair in self.raw}
+        return self._index.get(b64encode(key).decode())
+
+    def get(self, key: bytes, default: Optional[Value] = None) -> Optional[Value]:
+        value = self._lookup(key)
+        return default if value is None else decode_value(value)
+
+    def __getitem__(self, key: bytes) -> Value:
+        value = self._lookup(key)
+        if value is None:
+            raise KeyError(key)
+        return decode_value(value)
+
+    def __contains__(self, key: bytes) -> bool:
+        return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return (b64decode(pair["key"]) for pair in self.raw)
+
+    def _address(self, key: bytes) -> Optional[str]:
+        value = self.get(key)
+        return encoding.encode_address(value) if value else None
+
+
+class PoolState(GlobalState):
+    """Global state of a PoolContract"""
+
+    __slots__ = ()
+
+    @property
+    def governor(self) -> Optional[str]:
+        return self._address(GOV_KEY)
+
+    @property
+    def pool_token(self) -> Optional[int]:
+        return self.get(b"p")
+
+    @property
+    def asset_a(self) -> int:
+        return self.get(b"a", 0)
+
+    @property
+    def asset_b(self) -> int:
+        return self.get(b"b", 0)
+
+    @property
+    def assets_set(self) -> bool:
+        return self.get(b"set", 0) == 1
+
+
+class MasterState(GlobalState):
+    """Global state of a MasterContract"""
+
+    __slots__ = ()
+
+    @property
+    def governor(self) -> Optional[str]:
+        return self._address(GOV_KEY)
+
+    @property
+    def template_pool_id(self) -> Optional[int]:
+        return self.get(POOL_ID_KEY)
+
+    @property
+    def shard_template_id(self) -> Optional[int]:
+        """Set only on a sharded master"""
+        return self.get(SHARD_ID_KEY)
+
+    @property
+    def sharded(self) -> bool:
+        return SHARD_ID_KEY in self
+
+    def shard(self, asset_a: int, asset_b: int) -> Optional[int]:
+        """Registry shard app for a pair, None until a pool of its shard exists"""
+        if asset_a > asset_b:
+            asset_a, asset_b = asset_b, asset_a
+        return self.get(shard_key(shard_index(asset_a, asset_b)))
+
+    def shards(self) -> Dict[int, int]:
+        """Shard index -> registry shard app id of every created shard"""
+        return {int.from_bytes(key, "big"): self[key] for key in self if len(key) == 8}
+
+    def pool(self, asset_a: int, asset_b: int) -> Optional[int]:
+        """Pool app id for a pair, in either order; always None on a sharded
+        master, see `operations.lookup_pool`"""
+        if asset_a > asset_b:
+            asset_a, asset_b = asset_b, asset_a
+        return self.get(pool_key(asset_a, asset_b))
+
+    def pools(self) -> Iterator[Tuple[Tuple[int, int], int]]:
+        """Every registered `((asset_a, asset_b), app_id)`, decoding all keys"""
+        for entry in self.raw:
+            pair = parse_pool_key(b64decode(entry["key"]))
+            if pair is not None:
+                yield pair, decode_value(entry["value"])
@@ -0,0 +1,161 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from .params import observe_round
+from .utils import PendingTxnResponse
+
+
+def _copy_result(source: Future, target: Future):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class Submitter:
+    """Pipelined group submission
+
+    Keeps up to `window` groups in flight at once. A single background thread
+    follows the chain with `status_after_block` and checks every in-flight
+    group once per round, resolving the future returned by `submit` with a
+    `PendingTxnResponse` when the group confirms. Groups that are rejected by
+    the pool or outlive their last valid round fail their future instead.
+
+    Node errors do not fail anything: the thread retries with a backoff of
+    `retry_delay` seconds, doubled on every consecutive failure up to
+    `max_retry_delay`, and counts them in `errors`.
+    """
+
+    def __init__(self, client: AlgodClient, window: int = 16, retry_delay: float = 1.0,
+                 max_retry_delay: float = 30.0) -> None:
+        self.client = client
+        self.window = window
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.errors = 0
+
+        self._slots = threading.BoundedSemaphore(window)
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Tuple[Future, int]] = {}
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "Submitter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def in_flight(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, signed_group: List[transaction.SignedTransaction]) -> Future:
+        """Send a signed group, blocking only while the window is full
+
+        A group that is already in flight is not sent again; its future is
+        returned instead.
+        """
+        if self._closed:
+            raise Exception("Submitter is closed")
+
+        # Every txn in a group confirms in the same round, track the first
+        txid = signed_group[0].get_txid()
+        with self._cond:
+            existing = self._pending.get(txid)
+        if existing is not None:
+            return existing[0]
+
+        self._slots.acquire()
+        fut: Future = Future()
+        fut.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            self.client.send_transactions(signed_group)
+        except Exception as e:
+            fut.set_exception(e)
+            return fut
+
+        last_valid = min(stx.transaction.last_valid_round for stx in signed_group)
+        with self._cond:
+            existing = self._pending.get(txid)
+            if existing is None:
+                self._pending[txid] = (fut, last_valid)
+                self._cond.notify()
+        if existing is not None:
+            # Sent concurrently by another caller, settle with its future
+            existing[0].add_done_callback(lambda done: _copy_result(done, fut))
+        return fut
+
+    def close(self, wait: bool = True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+    def _resolve(self, txid: str, result=None, error: Exception = None):
+        with self._cond:
+            fut, _ = self._pending.pop(txid)
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def _check(self, txid: str, last_valid: int, current_round: int):
+        """Settle `txid` if it was rejected, confirmed or has expired"""
+        try:
+            info = self.client.pending_transaction_info(txid)
+        except Exception as e:
+            # Looked up again next round, unless it can no longer confirm
+            self.errors += 1
+            print("Submitter failed to look up {}: {}".format(txid, e))
+            info = {}
+        if info.get("pool-error"):
+            self._resolve(txid, error=Exception(
+                "Transaction {} rejected: {}".format(txid, info["pool-error"])))
+        elif info.get("confirmed-round", 0) > 0:
+            self._resolve(txid, PendingTxnResponse(info))
+        elif current_round > last_valid:
+            self._resolve(txid, error=Exception(
+                "Transaction {} not confirmed by round {}".format(txid, last_valid)))
+
+    def _run(self):
+        current_round = None
+        delay = self.retry_delay
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                pending = list(self._pending.items())
+
+            try:
+                if current_round is None:
+                    current_round = self.client.status()["last-round"]
+
+                for txid, (_, last_valid) in pending:
+                    self._check(txid, last_valid, current_round)
+
+                with self._cond:
+                    if not self._pending:
+                        continue
+
+                current_round = self.client.status_after_block(current_round)["last-round"]
+                observe_round(self.client, current_round)
+                delay = self.retry_delay
+            except Exception as e:
+                # In-flight groups stay pending, they only fail on their own
+                # pool error or once their last valid round has passed
+                self.errors += 1
+                print("Submitter failed at round {}, retrying in {:.1f}s: {}".format(current_round, delay, e))
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
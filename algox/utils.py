@@ -3,35 +3,66 @@ from typing import Any, Dict, List, Optional, Union
 
 from algosdk.v2client.algod import AlgodClient
 
+from .algod import PooledAlgodClient
+from .params import observe_round
 
-def get_algod_client(url, api_key) -> AlgodClient:
+
+def get_algod_client(url, api_key, pool_size: int = 8) -> PooledAlgodClient:
     headers = {
         'X-API-Key': api_key
     }
-    return AlgodClient(api_key, url, headers)
+    return PooledAlgodClient(api_key, url, headers, pool_size=pool_size)
+
+
+class _Field:
+    """Read-only attribute backed by one key of the raw response"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+
+    def __get__(self, obj: Any, cls: Any = None) -> Any:
+        if obj is None:
+            return self
+        return obj.response.get(self.key)
 
 
 class PendingTxnResponse:
+    """Attribute view of a pending transaction response
+
+    Fields are read from the response dict when accessed rather than copied,
+    and logs are only base64-decoded the first time they are read.
+    """
+
+    __slots__ = ("response", "_logs")
+
     def __init__(self, response: Dict[str, Any]) -> None:
-        self.poolError: str = response["pool-error"]
-        self.txn: Dict[str, Any] = response["txn"]
-
-        self.application_index: Optional[int] = response.get(
-            "application-index")
-        self.asset_index: Optional[int] = response.get("asset-index")
-        self.close_rewards: Optional[int] = response.get("close-rewards")
-        self.closing_amount: Optional[int] = response.get("closing-amount")
-        self.confirmed_round: Optional[int] = response.get("confirmed-round")
-        self.global_state_delta: Optional[Any] = response.get(
-            "global-state-delta")
-        self.local_state_delta: Optional[Any] = response.get(
-            "local-state-delta")
-        self.receiver_rewards: Optional[int] = response.get("receiver-rewards")
-        self.sender_rewards: Optional[int] = response.get("sender-rewards")
-
-        self.inner_txns: List[Any] = response.get("inner-txns", [])
-        self.logs: List[bytes] = [b64decode(ll)
-                                  for ll in response.get("logs", [])]
+        self.response = response
+        self._logs: Optional[List[bytes]] = None
+
+    poolError = _Field("pool-error")
+    txn = _Field("txn")
+
+    application_index = _Field("application-index")
+    asset_index = _Field("asset-index")
+    close_rewards = _Field("close-rewards")
+    closing_amount = _Field("closing-amount")
+    confirmed_round = _Field("confirmed-round")
+    global_state_delta = _Field("global-state-delta")
+    local_state_delta = _Field("local-state-delta")
+    receiver_rewards = _Field("receiver-rewards")
+    sender_rewards = _Field("sender-rewards")
+
+    @property
+    def inner_txns(self) -> List[Any]:
+        return self.response.get("inner-txns", [])
+
+    @property
+    def logs(self) -> List[bytes]:
+        if self._logs is None:
+            self._logs = [b64decode(ll) for ll in self.response.get("logs", [])]
+        return self._logs
 
 
 def wait_for_transaction(
@@ -44,7 +75,9 @@ def wait_for_transaction(
         print("Waiting for confirmation...")
         last_round += 1
         client.status_after_block(last_round)
+        observe_round(client, last_round)
         pending_txn = client.pending_transaction_info(tx_id)
+    observe_round(client, pending_txn.get("confirmed-round"))
     print(
         "Transaction {} confirmed in round {}.".format(
             tx_id, pending_txn.get("confirmed-round")
@@ -53,25 +86,48 @@ def wait_for_transaction(
     return PendingTxnResponse(pending_txn)
 
 
+def decode_value(value: Dict[str, Any]) -> Union[int, bytes]:
+    value_type = value["type"]
+
+    if value_type == 2:
+        # value is uint64
+        return value.get("uint", 0)
+    elif value_type == 1:
+        # value is byte array
+        return b64decode(value.get("bytes", ""))
+    raise Exception(f"Unexpected state type: {value_type}")
+
+
 def decode_state(state_array: List[Any]) -> Dict[bytes, Union[int, bytes]]:
     state: Dict[bytes, Union[int, bytes]] = dict()
 
     for pair in state_array:
+        state[b64decode(pair["key"])] = decode_value(pair["value"])
+
+    return state
+
+
+def decode_state_delta(delta: Optional[List[Any]]) -> Dict[bytes, Optional[Union[int, bytes]]]:
+    """Decode a `global-state-delta`, deleted keys map to None"""
+    state: Dict[bytes, Optional[Union[int, bytes]]] = dict()
+
+    for pair in delta or []:
         key = b64decode(pair["key"])
 
         value = pair["value"]
-        value_type = value["type"]
-
-        if value_type == 2:
-            # value is uint64
-            value = value.get("uint", 0)
-        elif value_type == 1:
-            # value is byte array
-            value = b64decode(value.get("bytes", ""))
+        action = value["action"]
+
+        if action == 1:
+            # set byte array
+            state[key] = b64decode(value.get("bytes", ""))
+        elif action == 2:
+            # set uint64
+            state[key] = value.get("uint", 0)
+        elif action == 3:
+            # delete
+            state[key] = None
         else:
-            raise Exception(f"Unexpected state type: {value_type}")
-
-        state[key] = value
+            raise Exception(f"Unexpected delta action: {action}")
 
     return state
 
@@ -0,0 +1,236 @@
+import base64
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import msgpack
+from algosdk import encoding
+from algosdk.logic import get_application_address
+from algosdk.v2client.algod import AlgodClient
+
+from .params import observe_round
+from .registry import PoolRegistry
+
+POOL_EVENTS = {"mint", "burn", "swap", "multiswap", "boot", "fund", "update", "set"}
+MASTER_EVENTS = {"new_pool", "set_govener"}
+
+
+class Transfer(NamedTuple):
+    asset_id: int
+    amount: int
+    sender: str
+    receiver: str
+
+
+class PoolEvent(NamedTuple):
+    kind: str
+    round: int
+    app_id: int
+    sender: str
+    # Asset transfers into the app from its group, and the inner transfers it paid out
+    transfers_in: Tuple[Transfer, ...]
+    transfers_out: Tuple[Transfer, ...]
+    # Pool token for boot, pool app id for new_pool
+    created_id: int = 0
+
+
+Subscriber = Callable[[PoolEvent], None]
+
+
+def _addr(raw: Optional[bytes]) -> str:
+    return encoding.encode_address(raw) if raw else ""
+
+
+def _transfer(txn: Dict[str, Any]) -> Optional[Transfer]:
+    if txn.get("type") != "axfer":
+        return None
+    return Transfer(
+        txn.get("xaid", 0),
+        txn.get("aamt", 0),
+        _addr(txn.get("asnd") or txn.get("snd")),
+        _addr(txn.get("arcv")),
+    )
+
+
+def _state_delta(gd: Dict[bytes, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Block `gd` entries in the `global-state-delta` shape algod returns"""
+    delta = []
+    for key, value in gd.items():
+        action = value.get("at")
+        entry: Dict[str, Any] = {"action": action}
+        if action == 1:
+            entry["bytes"] = base64.b64encode(value.get("bs", b"")).decode()
+        elif action == 2:
+            entry["uint"] = value.get("ui", 0)
+        delta.append({"key": base64.b64encode(key).decode(), "value": entry})
+    return delta
+
+
+class Watcher:
+    """Follows blocks once and streams pool activity to subscribers
+
+    Every round is fetched with a single `block_info` call. App calls to the
+    master or to any watched pool are decoded into `PoolEvent`s and handed to
+    the subscribers in-process. New pools created through the master are
+    added to the registry and watched from then on.
+
+    `run` survives algod errors: it logs them, waits `retry_delay` seconds,
+    doubling up to `max_retry_delay` while they persist, and resumes from
+    the first round not yet processed. `errors` counts them.
+    """
+
+    def __init__(self, client: AlgodClient, master_app_id: int,
+                 registry: Optional[PoolRegistry] = None, start_round: Optional[int] = None,
+                 retry_delay: float = 1.0, max_retry_delay: float = 30.0) -> None:
+        self.client = client
+        self.master_app_id = master_app_id
+        self.registry = registry
+        self.pools: Set[int] = {app_id for _, app_id in registry} if registry is not None else set()
+        self.next_round = start_round
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.errors = 0
+
+        self._subscribers: List[Tuple[Subscriber, Optional[Set[str]]]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Subscriber, kinds: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call `callback` for every event, or only those of `kinds`; returns an unsubscribe function"""
+        entry = (callback, set(kinds) if kinds is not None else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def watch(self, app_id: int):
+        self.pools.add(app_id)
+
+    def block(self, round_num: int) -> Dict[str, Any]:
+        raw = self.client.block_info(round_num=round_num, response_format="msgpack")
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)["block"]
+
+    def events(self, block: Dict[str, Any]) -> List[PoolEvent]:
+        """Decode the master and pool calls in a block"""
+        round_num = block.get("rnd", 0)
+        txns = block.get("txns") or []
+
+        # Asset transfers of each group, to find what was sent to an app
+        grouped: Dict[bytes, List[Transfer]] = {}
+        for stxn in txns:
+            txn = stxn.get("txn", {})
+            t = _transfer(txn)
+            if t is not None and txn.get("grp"):
+                grouped.setdefault(txn["grp"], []).append(t)
+
+        events = []
+        for stxn in txns:
+            txn = stxn.get("txn", {})
+            app_id = txn.get("apid", 0)
+            if txn.get("type") != "appl" or (app_id != self.master_app_id and app_id not in self.pools):
+                continue
+
+            args = txn.get("apaa") or [b""]
+            kind = args[0].decode(errors="replace")
+            ad = stxn.get("dt", {})
+
+            app_addr = get_application_address(app_id)
+            transfers_in = [t for t in grouped.get(txn.get("grp"), []) if t.receiver == app_addr]
+
+            transfers_out = []
+            created = 0
+            for inner in ad.get("itx") or []:
+                t = _transfer(inner.get("txn", {}))
+                if t is not None and t.amount:
+                    transfers_out.append(t)
+                # A sharded master's `new_pool` may create a registry shard before the pool
+                created = inner.get("caid", 0) or inner.get("apid", 0) or created
+
+            if app_id == self.master_app_id:
+                self._apply_master(txn, ad)
+                if kind == "new_pool" and created:
+                    self.pools.add(created)
+
+            events.append(PoolEvent(
+                kind, round_num, app_id, _addr(txn.get("snd")),
+                tuple(transfers_in), tuple(transfers_out), created,
+            ))
+        return events
+
+    def _apply_master(self, txn: Dict[str, Any], ad: Dict[str, Any]):
+        if self.registry is None:
+            return
+        # Registry shard `put` calls of a sharded master are inner transactions
+        inner_txns = [
+            {
+                "txn": {"txn": {"apid": inner.get("txn", {}).get("apid", 0)}},
+                "global-state-delta": _state_delta(inner.get("dt", {}).get("gd") or {}),
+            }
+            for inner in ad.get("itx") or []
+        ]
+        self.registry.apply({
+            "txn": {"txn": {"apid": txn.get("apid", 0)}},
+            "global-state-delta": _state_delta(ad.get("gd") or {}),
+            "inner-txns": inner_txns,
+        })
+
+    def publish(self, event: PoolEvent):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, kinds in subscribers:
+            if kinds is None or event.kind in kinds:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print("Subscriber failed on {} in round {}: {}".format(event.kind, event.round, e))
+
+    def poll(self) -> int:
+        """Process every round up to the node's last round; returns the rounds processed"""
+        last = self.client.status()["last-round"]
+        if self.next_round is None:
+            self.next_round = last
+        count = 0
+        while self.next_round <= last and not self._stop.is_set():
+            self._process(self.next_round)
+            count += 1
+        return count
+
+    def _process(self, round_num: int):
+        for event in self.events(self.block(round_num)):
+            self.publish(event)
+        observe_round(self.client, round_num)
+        self.next_round = round_num + 1
+
+    def run(self):
+        """Follow the chain until `stop` is called"""
+        delay = self.retry_delay
+        while not self._stop.is_set():
+            try:
+                if self.next_round is None:
+                    self.next_round = self.client.status()["last-round"]
+                # Blocks until the round exists or algod times out
+                status = self.client.status_after_block(self.next_round - 1)
+                if self._stop.is_set() or status["last-round"] < self.next_round:
+                    continue
+                self._process(self.next_round)
+                delay = self.retry_delay
+            except Exception as e:
+                self.errors += 1
+                print("Watcher failed at round {}, retrying in {:.1f}s: {}".format(self.next_round, delay, e))
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def start(self) -> "Watcher":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
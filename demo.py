@@ -5,9 +5,12 @@ from algosdk import *
 from algosdk.future.transaction import *
 
 from algox.account import Account
+from algox.balances import BalanceCache
 from algox.operations import *
+from algox.params import suggested_params
+from algox.registry import PoolRegistry
 from algox.sandbox import get_genesis_accounts
-from algox.utils import get_algod_client, get_app_global_state
+from algox.utils import PendingTxnResponse, get_algod_client, get_app_global_state
 
 
 def demo(asset_a=None, asset_b=None):
@@ -41,12 +44,11 @@ def demo(asset_a=None, asset_b=None):
     
     assert asset_a < asset_b
     #Create pool for asset A and asset B in master app
-    create_pool(client, sender, master_app_id, template_pool_app_id, asset_a, asset_b)
+    registry = PoolRegistry(client, master_app_id).load()
+    create_pool(client, sender, master_app_id, template_pool_app_id, asset_a, asset_b, registry)
 
-    #Generates the pool name and get the pool id
-    master_app_state = get_app_global_state(client, master_app_id)
-    pool_name = asset_a.to_bytes(8, 'big') + b"_" + asset_b.to_bytes(8, 'big')
-    new_pool_id = master_app_state.get(pool_name)
+    #Look up the pool id
+    new_pool_id = registry.lookup(asset_a, asset_b)
     print(f"pool app id for asset {asset_a} and asset {asset_b}: {new_pool_id}")
     
     #Get pool app address
@@ -63,72 +65,34 @@ def demo(asset_a=None, asset_b=None):
     sender_pk = sender.get_private_key()
     print("Sender address: {}".format(sender_addr))
     
-    #Set govener
-    sp = client.suggested_params()
+    # Set govener, seed the pool with algos and bootstrap it in one group
+    sp = suggested_params(client)
     txn_group = assign_group_id(
-        [
-            get_app_call(
-                sender_addr, sp, master_app_id, app_args=["set_govener"], assets=[asset_a, asset_b], accounts=[sender_addr], apps=[new_pool_id]
-            ),
-        ]
+        get_boot_group(sender_addr, sp, new_pool_id, asset_a, asset_b, master_app_id=master_app_id)
     )
-    send(client, "set_govener", [txn.sign(sender_pk) for txn in txn_group])
-    
-    # If this is a new contract, we should fund it with algos
-    fund_if_needed(client, sender_addr, sender_pk, pool_app_addr)
-    
-    # Bootstrap Pool
-    sp = client.suggested_params()
-    txn_group = assign_group_id(
-        [
-            get_app_call(
-                sender_addr, sp, new_pool_id, app_args=["boot"], assets=[asset_a, asset_b]
-            ),
-        ]
-    )
-    result = send(client, "boot", [txn.sign(sender_pk) for txn in txn_group])
-    pool_token = result["inner-txns"][0]["asset-index"]
+    send(client, "boot", [txn.sign(sender_pk) for txn in txn_group])
+    # The group has confirmed; the pool token is in `boot`'s inner transactions
+    result = PendingTxnResponse(client.pending_transaction_info(txn_group[-1].get_txid()))
+    pool_token = result.inner_txns[0]["asset-index"]
 
     print("Created Pool Token: {}".format(pool_token))
-    # Opt addr into newly created Pool Token
-    sp = client.suggested_params()
-    txn_group = assign_group_id(
-       [
-           get_asset_xfer(sender_addr, sp, pool_token, pool_app_addr, 0),
-       ]
-    )
-    send(client, "optin", [txn.sign(sender_pk) for txn in txn_group])
-    print_balances(client, pool_app_addr, pool_app_addr, pool_token, asset_a, asset_b)
 
-    # Optin pool token to sender
-    sp = client.suggested_params()
-    txn_group = assign_group_id(
-       [
-           get_asset_xfer(sender_addr, sp, pool_token, sender_addr, 0),
-       ]
-    )
-    send(client, "optin", [txn.sign(sender_pk) for txn in txn_group])
-    
-    # Fund Pool with initial liquidity
-    sp = client.suggested_params()
+    # Fetch balances once, then keep them current from confirmed transactions
+    balances = BalanceCache(client).load(pool_app_addr, sender_addr)
+    print_balances(client, pool_app_addr, pool_app_addr, pool_token, asset_a, asset_b, balances)
+
+    # Opt sender into the Pool Token and fund the pool with initial liquidity in one group
+    sp = suggested_params(client)
     txn_group = assign_group_id(
-        [
-            get_app_call(
-                sender_addr,
-                sp,
-                new_pool_id,
-                app_args=["fund"],
-                assets=[asset_a, asset_b, pool_token],
-            ),
-            AssetTransferTxn(sender_addr, sp, pool_app_addr, 1000, asset_a),
-            AssetTransferTxn(sender_addr, sp, pool_app_addr, 3000, asset_b),
-        ]
+        get_fund_group(sender_addr, sp, new_pool_id, asset_a, asset_b, pool_token, 1000, 3000)
     )
     send(client, "fund", [txn.sign(sender_pk) for txn in txn_group])
-    print_balances(client, pool_app_addr, sender_addr, pool_token, asset_a, asset_b)
+    result = PendingTxnResponse(client.pending_transaction_info(txn_group[1].get_txid()))
+    balances.apply_group(txn_group, result)
+    print_balances(client, pool_app_addr, sender_addr, pool_token, asset_a, asset_b, balances)
 
     # Mint liquidity tokens
-    sp = client.suggested_params()
+    sp = suggested_params(client)
     txn_group = assign_group_id(
         [
             get_app_call(
@@ -143,8 +107,9 @@ def demo(asset_a=None, asset_b=None):
         ]
     )
 
-    send(client, "mint", [txn.sign(sender_pk) for txn in txn_group])
-    print_balances(client, pool_app_addr, sender_addr, pool_token, asset_a, asset_b)
+    result = send(client, "mint", [txn.sign(sender_pk) for txn in txn_group])
+    balances.apply_group(txn_group, result)
+    print_balances(client, pool_app_addr, sender_addr, pool_token, asset_a, asset_b, balances)
 
     # Get Account from sandbox for Swap
     account = get_genesis_accounts()[0]
@@ -152,39 +117,43 @@ def demo(asset_a=None, asset_b=None):
     sk = account.get_private_key()
     
     print("Using {}".format(addr))
+    balances.load(addr)
     
     # Swap A for B by user
-    sp = client.suggested_params()
+    sp = suggested_params(client)
     txn_group = assign_group_id(
         [
             get_app_call(addr, sp, new_pool_id, ["swap"], [asset_a, asset_b]),
             get_asset_xfer(addr, sp, asset_a, pool_app_addr, 5),
         ]
     )
-    send(client, "swap_a_b", [txn.sign(sk) for txn in txn_group])
-    print_balances(client, pool_app_addr, addr, pool_token, asset_a, asset_b)
+    result = send(client, "swap_a_b", [txn.sign(sk) for txn in txn_group])
+    balances.apply_group(txn_group, result)
+    print_balances(client, pool_app_addr, addr, pool_token, asset_a, asset_b, balances)
 
     # Swap B for A by user
-    sp = client.suggested_params()
+    sp = suggested_params(client)
     txn_group = assign_group_id(
         [
             get_app_call(addr, sp, new_pool_id, ["swap"], [asset_a, asset_b]),
             get_asset_xfer(addr, sp, asset_b, pool_app_addr, 5),
         ]
     )
-    send(client, "swap_b_a", [txn.sign(sk) for txn in txn_group])
-    print_balances(client, pool_app_addr, addr, pool_token, asset_a, asset_b)
+    result = send(client, "swap_b_a", [txn.sign(sk) for txn in txn_group])
+    balances.apply_group(txn_group, result)
+    print_balances(client, pool_app_addr, addr, pool_token, asset_a, asset_b, balances)
 
     # Burn liq tokens
-    sp = client.suggested_params()
+    sp = suggested_params(client)
     txn_group = assign_group_id(
         [
             get_app_call(sender_addr, sp, new_pool_id, ["burn"], [asset_a, asset_b, pool_token]),
             get_asset_xfer(sender_addr, sp, pool_token, pool_app_addr, 1000),
         ]
     )
-    send(client, "burn", [txn.sign(sender_pk) for txn in txn_group])
-    print_balances(client, pool_app_addr, sender_addr, pool_token, asset_a, asset_b)
+    result = send(client, "burn", [txn.sign(sender_pk) for txn in txn_group])
+    balances.apply_group(txn_group, result)
+    print_balances(client, pool_app_addr, sender_addr, pool_token, asset_a, asset_b, balances)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import os
+import dotenv
+from algox.account import Account
+from algox.deploy import deploy_pairs
+from algox.operations import create_asset
+
+from algox.utils import get_algod_client
+
+
+if __name__ == '__main__':
+    dotenv.load_dotenv('.env')
+
+    algod_url = os.environ.get("ALGOD_URL")
+    algod_api_key = os.environ.get("ALGOD_API_KEY")
+
+    client = get_algod_client(algod_url, algod_api_key)
+
+    sender = Account.from_mnemonic(os.environ.get("CREATOR_MN"))
+
+    assets = [create_asset(client, sender, "T{}".format(i)) for i in range(8)]
+    print("Created assets: {}".format(assets))
+
+    # Template and master apps are created too, then every pair goes live in the same rounds
+    pairs = [(assets[i], assets[i + 1]) for i in range(0, len(assets), 2)]
+    for pair, deployment in deploy_pairs(client, sender, pairs).items():
+        print(deployment)
@@ -2,6 +2,7 @@ import os
 import dotenv
 from algox.account import Account
 from algox.operations import create_asset, create_master_app, create_pool, create_pool_app
+from algox.registry import PoolRegistry
 
 from algox.utils import get_algod_client, get_app_global_state
 
@@ -28,11 +29,10 @@ if __name__ == '__main__':
     asset_b = create_asset(client, sender, "B")
     print("Created asset b with id: {}".format(asset_b))
     
-    create_pool(client, sender, master_app_id, template_pool_app_id, asset_a, asset_b)
+    registry = PoolRegistry(client, master_app_id).load()
+    create_pool(client, sender, master_app_id, template_pool_app_id, asset_a, asset_b, registry)
     
-    master_app_state = get_app_global_state(client, master_app_id)
-    pool_name = asset_a.to_bytes(8, 'big') + b"_" + asset_b.to_bytes(8, 'big')
-    new_pool_id = master_app_state.get(pool_name)
+    new_pool_id = registry.lookup(asset_a, asset_b)
     print(f"pool app id for asset {asset_a} and asset {asset_b}: {new_pool_id}")
     
     new_pool_state = get_app_global_state(client, new_pool_id)